@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+bench_cli_startup.py — 各命令行工具的启动开销测试
+
+对 upload_to_telegram.py、qiangke.py、split_chapters.py 分别多次运行 --help：
+    1. 整个进程的墙钟耗时中位数（含解释器启动），与预算比较；
+    2. python -X importtime 下脚本导入了哪些模块，检查 aiohttp、tqdm、bs4、pypdf
+       等重依赖一个都没有加载（它们经 lazyimport.lazy_import 延迟到第一次使用）。
+
+用法:
+    python bench_cli_startup.py
+    python bench_cli_startup.py --runs 10 --budget 150
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+
+from bench_upload_startup import importtime  # noqa: E402
+
+# 脚本 → --help 时不应加载的模块
+TOOLS = {
+    "upload_to_telegram.py": ("aiohttp", "tqdm", "requests"),
+    "qiangke.py": ("aiohttp", "yarl", "bs4", "requests"),
+    "split_chapters.py": ("pypdf", "pikepdf"),
+}
+
+
+def wall_ms(argv: list[str]) -> float:
+    """运行 python <argv>，返回墙钟耗时（毫秒）"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *argv], stdout=subprocess.DEVNULL, check=True, cwd=HERE)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="命令行工具启动开销测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--runs", type=int, default=7, help="每个脚本运行次数")
+    parser.add_argument("--budget", type=float, default=200, help="--help 墙钟耗时预算（毫秒）")
+    args = parser.parse_args()
+
+    baseline = statistics.median(wall_ms(["-c", "pass"]) for _ in range(args.runs))
+    print(f"== 空解释器启动 {baseline:.0f}ms")
+
+    ok = True
+    for script, heavy in TOOLS.items():
+        times = [wall_ms([script, "--help"]) for _ in range(args.runs)]
+        loaded = {name.strip().split(".")[0] for _, _, name in importtime([script, "--help"])}
+        leaked = sorted(set(heavy) & loaded)
+        median = statistics.median(times)
+        passed = median <= args.budget and not leaked
+        ok &= passed
+        print(f"== {script}")
+        print(f"  --help 中位 {median:.0f}ms（扣除解释器 {median - baseline:.0f}ms），"
+              f"范围 [{min(times):.0f}, {max(times):.0f}]，预算 {args.budget:.0f}ms")
+        print(f"  导入模块 {len(loaded)} 个，重依赖: {', '.join(leaked) or '未加载'}")
+        print(f"  {'通过' if passed else '失败'}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+bench_qiangke_monitor.py — qiangke.py 余量监控测试
+
+启动 qiangke_mock_server.py 子进程，课程容量为 1：
+    1. 开放时刻由另一个账号（占位者）先选走唯一的名额；
+    2. qiangke.py --monitor 以 user1 身份在随后的 target_time 抢课，名额已满，进入余量监控；
+    3. 监控 --hold 秒后占位者退课，空位出现；
+    4. 等 qiangke.py 退出，检查 user1 是否选上。
+
+报告：退课到选上的延迟、监控期间的课程列表请求数与 304 比例、实际接收的列表字节数
+（与每次都取完整页面相比）、监控期间的选课请求数、客户端进程监控期间的 CPU 时间及
+折算的每小时 CPU 秒数。
+
+加 --full-link 时服务器对已满的课程仍显示选择链接：监控一开始会试选一轮（返回已满），
+之后该行不变就不应再发选课请求，检查监控期间的选课请求不超过一轮的连接数。
+
+用法:
+    python bench_qiangke_monitor.py
+    python bench_qiangke_monitor.py --hold 60 --max-interval 10 --latency 40
+    python bench_qiangke_monitor.py --full-link
+"""
+
+import argparse
+import http.cookiejar
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlencode
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+
+from bench_qiangke_timing import fetch_stats, free_port  # noqa: E402
+from qiangke_mock_server import PREFIX  # noqa: E402
+
+COURSE = "音乐社"
+BURST_CONNECTIONS = 4  # 写入配置的 [burst] connections，即一轮选课的请求数
+CLIENT, HOLDER = ("user1", "pass1"), ("user2", "pass2")
+
+
+def start_server(args, port: int) -> subprocess.Popen:
+    cmd = [
+        sys.executable, str(HERE / "qiangke_mock_server.py"),
+        "--port", str(port),
+        "--open-in", str(args.open_in),
+        "--latency", str(args.latency),
+        "--courses", f"{COURSE}:1",
+        "--users", "2",
+    ]
+    if args.full_link:
+        cmd.append("--full-link")
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            fetch_stats(port)
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("模拟服务器启动失败")
+
+
+def holder_session(base: str):
+    """占位者登录，返回带 Cookie 的 opener"""
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+    )
+    data = urlencode({"username": HOLDER[0], "password": HOLDER[1]}).encode()
+    opener.open(f"{base}/login.php", data=data, timeout=5).read()
+    return opener
+
+
+def cpu_seconds(pid: int) -> float | None:
+    """读取 /proc/<pid>/stat 中进程已用的用户态 + 内核态 CPU 秒数（非 Linux 返回 None）"""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def write_config(path: Path, args, port: int, target: float) -> None:
+    lines = [
+        "[course]",
+        "type = 2024-2025学年度下期选修课(初中)",
+        f"name = {COURSE}",
+        f"target_time = {datetime.fromtimestamp(target).strftime('%Y-%m-%d-%H:%M:%S')}",
+        "",
+        "[credentials]",
+        f"username = {CLIENT[0]}",
+        f"password = {CLIENT[1]}",
+        "",
+        "[server]",
+        f"base_url = http://127.0.0.1:{port}{PREFIX}",
+        "",
+        "[session]",
+        "persist = False",
+        "",
+        "[timing]",
+        "sync = False",
+        "",
+        "[burst]",
+        f"connections = {BURST_CONNECTIONS}",
+        "",
+        "[monitor]",
+        f"min_interval = {args.min_interval}",
+        f"max_interval = {args.max_interval}",
+        f"backoff = {args.backoff}",
+        f"duration = {args.hold + 60}",
+        "",
+    ]
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="qiangke.py 余量监控测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--hold", type=float, default=30, help="进入监控后多少秒退课")
+    parser.add_argument("--min-interval", type=float, default=0.5, help="监控最短间隔（秒）")
+    parser.add_argument("--max-interval", type=float, default=4, help="监控最长间隔（秒）")
+    parser.add_argument("--backoff", type=float, default=1.5, help="无变化时间隔乘数")
+    parser.add_argument("--latency", type=float, default=20, help="往返延迟（毫秒）")
+    parser.add_argument("--open-in", type=float, default=3, help="几秒后开放")
+    parser.add_argument(
+        "--full-link", action="store_true", help="服务器对已满的课程仍显示选择链接"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="显示 qiangke 日志")
+    args = parser.parse_args()
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}{PREFIX}"
+    server = start_server(args, port)
+    ok = False
+    try:
+        open_at = fetch_stats(port)["open_at"]
+        holder = holder_session(base)
+        with tempfile.TemporaryDirectory() as tmp:
+            config, log = Path(tmp) / "monitor.ini", Path(tmp) / "qiangke.log"
+            # qiangke 的触发时刻晚于开放时刻，占位者先选走唯一的名额
+            write_config(config, args, port, open_at + 2)
+            with open(log, "w", encoding="utf-8") as log_file:
+                client = subprocess.Popen(
+                    [sys.executable, str(HERE / "qiangke.py"), "-c", str(config), "--monitor"],
+                    stdout=log_file, stderr=subprocess.STDOUT,
+                )
+                time.sleep(max(0.0, open_at + 0.1 - time.time()))
+                holder.open(f"{base}/select.php?id=1", timeout=5).read()
+
+                # 抢课失败后 qiangke 会重试获取课程链接，之后才进入监控
+                time.sleep(max(0.0, open_at + 2 - time.time()))
+                while "进入余量监控" not in log.read_text(encoding="utf-8"):
+                    if client.poll() is not None:
+                        break
+                    time.sleep(0.1)
+                monitor_start, startup_cpu = time.time(), cpu_seconds(client.pid)
+                before = fetch_stats(port)["counts"]
+                time.sleep(args.hold)
+                holder.open(f"{base}/cancel.php?id=1", timeout=5).read()
+
+                _, status, usage = os.wait4(client.pid, 0)
+                client.returncode = os.waitstatus_to_exitcode(status)
+                wall = time.time() - monitor_start
+            if args.verbose or client.returncode != 0:
+                print(log.read_text(encoding="utf-8"))
+        stats = fetch_stats(port)
+    finally:
+        server.terminate()
+        server.wait()
+
+    counts = stats["counts"]
+    lists = counts["list"] - before["list"]
+    not_modified = counts["not_modified"] - before["not_modified"]
+    received = counts["list_bytes"] - before["list_bytes"]
+    selects = counts["select"] - before["select"]
+    full = received / max(1, lists - not_modified) * lists
+    cancel_at = stats["cancels"][0]["at"] if stats["cancels"] else None
+    picked_at = stats["ok_at_by_user"].get(CLIENT[0])
+    cpu = usage.ru_utime + usage.ru_stime
+    monitor_cpu = cpu - startup_cpu if startup_cpu is not None else cpu
+
+    print(f"== 余量监控：占位 {args.hold:.0f}s 后退课，间隔 "
+          f"{args.min_interval}~{args.max_interval}s ×{args.backoff}")
+    print(f"  监控期间列表请求 {lists} 次，其中 304 {not_modified} 次"
+          f"（{not_modified / max(1, lists):.0%}）")
+    print(f"  接收列表字节 {received}，每次取完整页面约 {full:.0f}")
+    # 退课后选上的那一轮最多再发 connections 个
+    select_bound = 2 * BURST_CONNECTIONS if args.full_link else BURST_CONNECTIONS
+    print(f"  监控期间选课请求 {selects} 次（上限 {select_bound}）")
+    print(f"  客户端 CPU 共 {cpu:.2f}s，其中监控期间 {monitor_cpu:.2f}s / {wall:.1f}s，"
+          f"折合每小时约 {monitor_cpu / wall * 3600:.0f} CPU 秒")
+    if cancel_at is not None and picked_at is not None:
+        delay = picked_at - cancel_at
+        bound = args.max_interval * 1.1 + 1
+        ok = client.returncode == 0 and delay <= bound and selects <= select_bound
+        print(f"  退课到选上 {delay * 1000:.0f}ms（上限 {bound:.1f}s）")
+    print(f"  {'通过' if ok else '失败'}: {CLIENT[0]} "
+          f"{'选上' if picked_at else '未选上'} {COURSE}，qiangke 退出码 {client.returncode}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+bench_qiangke_parse.py — 课程表解析基准测试
+
+对比 qiangke.py 中定向字节扫描（scan_course_row）与 BeautifulSoup 完整解析
+（parse_course_row_bs4）以及 lxml（若已安装）在课程列表页上的耗时，单位微秒。
+
+可传入从浏览器“另存为”的真实 s_course.php 页面（GB2312 原始字节），
+未传入时合成 N 行课程表。
+
+用法:
+    python bench_qiangke_parse.py                          # 合成 50 / 200 / 1000 行
+    python bench_qiangke_parse.py page1.html page2.html --course 音乐社
+    python bench_qiangke_parse.py --rows 500 --number 2000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import qiangke as q
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+COLUMNS = 13
+
+
+def make_page(rows: int, target: str) -> bytes:
+    """合成与 s_course.php 结构一致的 GB2312 页面，目标课程位于最后一行"""
+    header = "".join(f"<td>列{i}</td>" for i in range(COLUMNS))
+    out = [f"<tr>{header}</tr>"]
+    for i in range(rows):
+        name = target if i == rows - 1 else f"课程{i:04d}"
+        cells = [f"<td>{i}</td>", f'<td align="center">&nbsp;{name}&nbsp;</td>']
+        cells += [f"<td>第{i % 7}节 教室{i}</td>"] * (COLUMNS - 3)
+        cells.append(f'<td><a href="select.php?id={i}">选择</a></td>')
+        out.append("<tr>" + "".join(cells) + "</tr>")
+    body = "".join(out)
+    html = (
+        '<html><head><meta http-equiv="Content-Type" content="text/html; charset=gb2312">'
+        f'<title>选课</title></head><body><table border="1">{body}</table></body></html>'
+    )
+    return html.encode("gb2312")
+
+
+def parse_lxml(content: bytes, name: str):
+    doc = lxml_html.fromstring(content, parser=lxml_html.HTMLParser(encoding="gb2312"))
+    for row in doc.iter("tr"):
+        cols = row.findall("td")
+        if len(cols) > q.ACTION_COL and cols[q.NAME_COL].text_content().strip() == name:
+            link = cols[q.ACTION_COL].find(".//a")
+            if link is not None:
+                return link.text_content().strip(), link.get("href")
+    return None
+
+
+def parsers():
+    yield "scan", lambda content, name: q.scan_course_row(content, name)
+    # bs4 路径计入解码，与 qiangke.py 旧实现一致
+    yield "bs4", lambda content, name: q.parse_course_row_bs4(
+        content.decode("gb2312", "replace"), name
+    )
+    if lxml_html is not None:
+        yield "lxml", parse_lxml
+
+
+def time_us(fn, content: bytes, name: str, number: int, repeat: int) -> float:
+    """取 repeat 轮中位数，每轮 number 次，返回单次微秒"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn(content, name)
+        samples.append((time.perf_counter_ns() - start) / number / 1000)
+    return statistics.median(samples)
+
+
+def calibrate(fn, content: bytes, name: str, budget: float = 0.2) -> int:
+    """按单次耗时估算每轮次数，使一轮约 budget 秒"""
+    once = max(time_us(fn, content, name, 1, 1), 0.1)
+    return max(1, int(budget * 1e6 / once))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="课程表解析基准测试")
+    parser.add_argument("pages", nargs="*", help="保存的课程列表页（原始字节）")
+    parser.add_argument("--course", default="音乐社", help="要查找的课程名")
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[50, 200, 1000], help="合成页面行数"
+    )
+    parser.add_argument("--number", type=int, default=0, help="每轮次数（默认自动）")
+    parser.add_argument("--repeat", type=int, default=5, help="轮数")
+    args = parser.parse_args()
+
+    if args.pages:
+        cases = [(p, Path(p).read_bytes()) for p in args.pages]
+    else:
+        cases = [(f"synthetic-{n}", make_page(n, args.course)) for n in args.rows]
+
+    names = [name for name, _ in parsers()]
+    print(f"{'页面':<24}{'大小':>10}" + "".join(f"{n + ' µs':>14}" for n in names))
+    for label, content in cases:
+        results = {}
+        expected = None
+        for name, fn in parsers():
+            found = fn(content, args.course)
+            if expected is None:
+                expected = found
+            elif found != expected:
+                print(f"[警告] {label}: {name} 结果 {found!r} 与 scan {expected!r} 不一致")
+            number = args.number or calibrate(fn, content, args.course)
+            results[name] = time_us(fn, content, args.course, number, args.repeat)
+        row = f"{label:<24}{len(content):>10}" + "".join(f"{results[n]:>14.1f}" for n in names)
+        print(row)
+        if expected is None:
+            print(f"  (未找到课程 {args.course})")
+
+
+if __name__ == "__main__":
+    main()
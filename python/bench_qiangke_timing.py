@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+bench_qiangke_timing.py — qiangke.py 定时精度与竞争成功率基准测试
+
+每轮启动一个 qiangke_mock_server.py 子进程（独立进程，避免与客户端争用 GIL），
+按给定的延迟、抖动、时钟偏差与课程容量配置，让 N 个账号同时抢课，
+从模拟服务器的 /stats 读取：
+
+    - 首个选课请求相对开放时刻的到达偏差（毫秒，越接近 0 越好，负数即早到）
+    - 每个账号首个请求的到达偏差
+    - 开放前到达的请求数（过早）
+    - 抢到课程的账号比例、抢到第一志愿的比例
+
+结果保存为 JSON，可用 --compare 与旧结果对比定时改动前后的表现。
+
+用法:
+    python bench_qiangke_timing.py
+    python bench_qiangke_timing.py --accounts 6 --courses 音乐社:2,美术社:2 --trials 5
+    python bench_qiangke_timing.py --latency 40 --jitter 15 --skew -2.5
+    python bench_qiangke_timing.py -o after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+
+import qiangke as q
+from qiangke_mock_server import PREFIX, parse_courses
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fetch_stats(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5) as r:
+        return json.loads(r.read().decode("utf-8"))
+
+
+def start_server(args, port: int) -> subprocess.Popen:
+    cmd = [
+        sys.executable, str(HERE / "qiangke_mock_server.py"),
+        "--port", str(port),
+        "--open-in", str(args.open_in),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--skew", str(args.skew),
+        "--courses", args.courses,
+        "--users", str(args.accounts),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            fetch_stats(port)
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("模拟服务器启动失败")
+
+
+def write_config(path: str, args, port: int, open_at: float, courses: list) -> None:
+    target = datetime.fromtimestamp(open_at).strftime("%Y-%m-%d-%H:%M:%S")
+    lines = [
+        "[course]",
+        "type = 2024-2025学年度下期选修课(初中)",
+        f"name = {', '.join(courses)}",
+        f"target_time = {target}",
+        "",
+        "[server]",
+        f"base_url = http://127.0.0.1:{port}{PREFIX}",
+        "",
+        "[timing]",
+        f"sync = {'False' if args.no_sync else 'True'}",
+        f"sync_probes = {args.sync_probes}",
+        f"lead_ms = {args.lead_ms}",
+        "",
+        "[burst]",
+        f"connections = {args.connections}",
+        f"window = {args.window}",
+        f"max_requests = {args.max_requests}",
+        "",
+    ]
+    for i in range(1, args.accounts + 1):
+        lines += [f"[account:user{i}]", f"username = user{i}", f"password = pass{i}", ""]
+    Path(path).write_text("\n".join(lines), encoding="utf-8")
+
+
+def run_trial(args, courses: list) -> dict:
+    port = free_port()
+    proc = start_server(args, port)
+    try:
+        open_at = fetch_stats(port)["open_at"]
+        with tempfile.TemporaryDirectory() as tmp:
+            config = os.path.join(tmp, "bench.ini")
+            write_config(config, args, port, open_at, courses)
+            asyncio.run(q.run_all_async(config))
+        stats = fetch_stats(port)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    winners = {}
+    for course in stats["courses"].values():
+        for user in course["taken"]:
+            winners.setdefault(user, course["name"])
+    by_user = stats["first_after_open_ms_by_user"]
+    return {
+        "first_ms": stats["first_after_open_ms"],
+        "per_user_ms": sorted(by_user.values()),
+        "early": stats["early_selects"],
+        "selects": stats["selects"],
+        "success": len(winners) / args.accounts,
+        "top_choice": sum(1 for c in winners.values() if c == courses[0]) / args.accounts,
+        "results": stats["results"],
+    }
+
+
+def summarize(trials: list) -> dict:
+    firsts = [t["first_ms"] for t in trials if t["first_ms"] is not None]
+    per_user = [v for t in trials for v in t["per_user_ms"]]
+
+    def dist(values):
+        if not values:
+            return None
+        values = sorted(values)
+        return {
+            "min": values[0],
+            "median": statistics.median(values),
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            "max": values[-1],
+        }
+
+    return {
+        "first_ms": dist(firsts),
+        "per_user_ms": dist(per_user),
+        "early": sum(t["early"] for t in trials),
+        "selects": sum(t["selects"] for t in trials),
+        "success": statistics.mean(t["success"] for t in trials),
+        "top_choice": statistics.mean(t["top_choice"] for t in trials),
+    }
+
+
+def print_summary(summary: dict, label: str = "") -> None:
+    def fmt(d):
+        if d is None:
+            return "-"
+        return f"中位 {d['median']:.1f}  p95 {d['p95']:.1f}  [{d['min']:.1f}, {d['max']:.1f}]"
+
+    print(f"== {label or '结果'}")
+    print(f"  首个请求到达偏差(ms): {fmt(summary['first_ms'])}")
+    print(f"  各账号首请求偏差(ms): {fmt(summary['per_user_ms'])}")
+    print(f"  过早到达: {summary['early']} / {summary['selects']} 个请求")
+    print(f"  成功率: {summary['success']:.0%}  第一志愿: {summary['top_choice']:.0%}")
+
+
+def compare(current: dict, baseline_file: str) -> None:
+    baseline = json.loads(Path(baseline_file).read_text(encoding="utf-8"))["summary"]
+    print(f"== 对比 {baseline_file}")
+    for key in ("first_ms", "per_user_ms"):
+        old, new = baseline.get(key), current.get(key)
+        if old and new:
+            print(f"  {key} 中位: {old['median']:.1f} → {new['median']:.1f} ms "
+                  f"({new['median'] - old['median']:+.1f})")
+    for key in ("success", "top_choice"):
+        print(f"  {key}: {baseline[key]:.0%} → {current[key]:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="qiangke.py 定时精度与竞争成功率基准测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--trials", type=int, default=3, help="轮数（默认 3）")
+    parser.add_argument("--accounts", type=int, default=4, help="并发账号数")
+    parser.add_argument(
+        "--courses", default="音乐社:1,美术社:2", help="课程:容量，逗号分隔，按志愿顺序"
+    )
+    parser.add_argument("--latency", type=float, default=20, help="往返延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=5, help="延迟抖动（毫秒）")
+    parser.add_argument("--skew", type=float, default=0.7, help="服务器时钟偏差（秒）")
+    parser.add_argument(
+        "--open-in", type=float, default=15, help="每轮启动后几秒开放（需大于校时耗时）"
+    )
+    parser.add_argument("--no-sync", action="store_true", help="关闭校时")
+    parser.add_argument("--sync-probes", type=int, default=q.DEFAULT_SYNC_PROBES)
+    parser.add_argument("--lead-ms", type=float, default=0)
+    parser.add_argument("--connections", type=int, default=q.DEFAULT_BURST_CONNECTIONS)
+    parser.add_argument("--window", type=float, default=q.DEFAULT_BURST_WINDOW)
+    parser.add_argument("--max-requests", type=int, default=q.DEFAULT_BURST_MAX_REQUESTS)
+    parser.add_argument("-o", "--output", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    parser.add_argument("-v", "--verbose", action="store_true", help="显示 qiangke 日志")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.ERROR,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    courses = [name for name, _ in parse_courses(args.courses)]
+
+    trials = []
+    for i in range(args.trials):
+        trial = run_trial(args, courses)
+        trials.append(trial)
+        print(
+            f"第 {i + 1}/{args.trials} 轮: 首请求 {trial['first_ms']} ms, "
+            f"过早 {trial['early']}, 成功率 {trial['success']:.0%}, 结果 {trial['results']}"
+        )
+
+    summary = summarize(trials)
+    print_summary(summary)
+    if args.compare:
+        compare(summary, args.compare)
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps(
+                {"params": vars(args), "trials": trials, "summary": summary},
+                ensure_ascii=False,
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
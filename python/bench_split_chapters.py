@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+bench_split_chapters.py — split_chapters.py 基准测试 / 性能剖析
+
+生成可配置规模的合成 PDF（页数、书签深度、资源共享比例），
+分阶段计时：打开解析 → 书签解析 → 章节计划 → 写出章节，并记录峰值 RSS。
+合成 PDF 在父进程中生成，每个用例的计时在独立子进程中运行，峰值 RSS 只包含
+切分本身，与缓存一样互不干扰。结果保存为 JSON，
+可用 --compare 与旧结果对比（例如升级 pypdf 前后）。
+
+用法:
+    python bench_split_chapters.py                          # 默认用例集
+    python bench_split_chapters.py --pages 2000 --depth 3 --fanout 6
+    python bench_split_chapters.py -o after.json --compare before.json
+    python bench_split_chapters.py --profile cprofile       # 剖析写出阶段
+    python bench_split_chapters.py --profile pyinstrument
+    python bench_split_chapters.py --shared-ratio 0 --pages 2000 --max-size 5M  # 体积预算切分
+    python bench_split_chapters.py --linearize -o lin.json --compare plain.json # 线性化开销
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_mod
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+try:
+    import pypdf
+    from pypdf import PdfWriter
+    from pypdf.generic import (
+        DictionaryObject,
+        NameObject,
+        NumberObject,
+        StreamObject,
+    )
+except ImportError:
+    sys.exit("[错误] 缺少依赖: pip install pypdf")
+
+import split_chapters as sc
+
+# 默认用例：(名称, 页数, 书签深度, 每层分支数, 共享资源比例, 图片字节数)
+DEFAULT_CASES = [
+    ("small", 200, 2, 5, 1.0, 4096),
+    ("medium-shared", 2000, 3, 6, 1.0, 16384),
+    ("medium-unique", 2000, 3, 6, 0.0, 16384),
+    ("large-deep", 8000, 4, 6, 0.8, 8192),
+]
+
+
+# ──────────────────────────────────────────────
+# 合成 PDF
+# ──────────────────────────────────────────────
+
+
+def _image_xobject(writer: PdfWriter, nbytes: int, seed: int):
+    side = max(1, int(nbytes**0.5))
+    img = StreamObject()
+    img.set_data(bytes((seed + i) & 0xFF for i in range(side * side)))
+    img.update(
+        {
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(side),
+            NameObject("/Height"): NumberObject(side),
+            NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+            NameObject("/BitsPerComponent"): NumberObject(8),
+        }
+    )
+    return writer._add_object(img)
+
+
+def make_synthetic_pdf(
+    path: Path,
+    pages: int,
+    depth: int,
+    fanout: int,
+    shared_ratio: float,
+    image_bytes: int,
+):
+    """
+    生成合成 PDF：每页一段文字 + 一张图片。
+    shared_ratio 比例的页面共用同一字体与图片对象，其余页面各自持有副本，
+    用于模拟“资源高度共享”与“每页独立资源”两类书。
+    书签为 depth 层、每层 fanout 个分支的均匀树。
+    """
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    shared_img = _image_xobject(writer, image_bytes, 0)
+    shared_pages = int(pages * shared_ratio)
+
+    for i in range(pages):
+        page = writer.add_blank_page(612, 792)
+        img = shared_img if i < shared_pages else _image_xobject(writer, image_bytes, i)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {
+                NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+                NameObject("/XObject"): DictionaryObject({NameObject("/Im1"): img}),
+            }
+        )
+        content = StreamObject()
+        content.set_data(
+            f"BT /F1 12 Tf 72 720 Td (Synthetic page {i + 1}) Tj ET "
+            f"q 200 0 0 200 72 400 cm /Im1 Do Q".encode()
+        )
+        page[NameObject("/Contents")] = writer._add_object(content)
+
+    def add_level(parent, first: int, last: int, level: int, prefix: str):
+        span = last - first
+        if level >= depth or span < 1:
+            return
+        n = min(fanout, span)
+        for k in range(n):
+            start = first + span * k // n
+            end = first + span * (k + 1) // n
+            title = f"{prefix}{k + 1}"
+            item = writer.add_outline_item(f"Section {title}", start, parent=parent)
+            add_level(item, start, end, level + 1, f"{title}.")
+
+    add_level(None, 0, pages, 0, "")
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+# ──────────────────────────────────────────────
+# 分阶段计时
+# ──────────────────────────────────────────────
+
+
+def _profile_call(kind: str | None, out_base: Path, func):
+    if kind == "cprofile":
+        import cProfile
+
+        prof = cProfile.Profile()
+        result = prof.runcall(func)
+        prof.dump_stats(str(out_base) + ".prof")
+        return result
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("[警告] 未安装 pyinstrument，跳过剖析", file=sys.stderr)
+            return func()
+        profiler = Profiler()
+        profiler.start()
+        try:
+            return func()
+        finally:
+            profiler.stop()
+            Path(str(out_base) + ".html").write_text(
+                profiler.output_html(), encoding="utf-8"
+            )
+    return func()
+
+
+def generate_case(case: dict, workdir: str) -> tuple[Path, float]:
+    """在父进程中生成用例的合成 PDF，返回路径与耗时"""
+    pdf_path = Path(workdir) / f"{case['name']}.pdf"
+    t0 = time.perf_counter()
+    make_synthetic_pdf(
+        pdf_path,
+        case["pages"],
+        case["depth"],
+        case["fanout"],
+        case["shared_ratio"],
+        case["image_bytes"],
+    )
+    return pdf_path, time.perf_counter() - t0
+
+
+def run_case(case: dict, workdir: str, profile: str | None, profile_dir: str) -> dict:
+    """在子进程中执行单个用例，返回计时与峰值 RSS（PDF 已由父进程生成）"""
+    pdf_path = Path(workdir) / f"{case['name']}.pdf"
+    timings = {}
+    t0 = time.perf_counter()
+    reader = pypdf.PdfReader(str(pdf_path))
+    _ = len(reader.pages)
+    timings["open"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    outline = sc.get_outline_items(reader)
+    timings["outline"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    chapters = sc.plan_chapters(
+        reader,
+        level=case["level"],
+        min_pages=1,
+        outline_items=outline,
+        max_size=case.get("max_size"),
+    )
+    timings["plan"] = time.perf_counter() - t0
+
+    out_dir = Path(workdir) / f"{case['name']}_chapters"
+    t0 = time.perf_counter()
+    results = _profile_call(
+        profile,
+        Path(profile_dir) / f"{case['name']}_write",
+        lambda: sc.execute_split(
+            reader,
+            chapters,
+            out_dir,
+            outline_items=None if case["no_bookmarks"] else outline,
+            overwrite=True,
+            linearize=case.get("linearize", False),
+        ),
+    )
+    timings["write"] = time.perf_counter() - t0
+
+    failed = [r for r in results if r["status"] == "failed"]
+    largest = max((r["bytes"] or 0 for r in results), default=0)
+    over = [
+        r for r in results
+        if case.get("max_size") and (r["bytes"] or 0) > case["max_size"] and not r.get("oversize")
+    ]
+    return {
+        "name": case["name"],
+        "params": case,
+        "input_bytes": pdf_path.stat().st_size,
+        "output_bytes": sum(p.stat().st_size for p in out_dir.glob("*.pdf")),
+        "outline_items": len(outline),
+        "chapters": len(chapters),
+        "failed": len(failed),
+        "largest_output_bytes": largest,
+        "over_budget": len(over),
+        "timings": {k: round(v, 6) for k, v in timings.items()},
+        # Linux 下 ru_maxrss 单位为 KB，macOS 为字节
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        // (1024 if sys.platform == "darwin" else 1),
+    }
+
+
+def _child(case, workdir, profile, profile_dir, queue):
+    try:
+        queue.put(run_case(case, workdir, profile, profile_dir))
+    except Exception as e:
+        queue.put({"name": case["name"], "params": case, "error": repr(e)})
+
+
+def run_isolated(case: dict, workdir: str, profile: str | None, profile_dir: str) -> dict:
+    # spawn 而非 fork：子进程不继承父进程生成 PDF 时的内存，峰值 RSS 只反映切分
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(
+        target=_child, args=(case, workdir, profile, profile_dir, queue)
+    )
+    proc.start()
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except queue_mod.Empty:
+            if proc.is_alive():
+                continue
+            # 子进程已退出：结果可能刚好在退出前写入，再取一次
+            try:
+                result = queue.get(timeout=1)
+            except queue_mod.Empty:
+                result = {
+                    "name": case["name"],
+                    "params": case,
+                    "error": f"子进程异常退出（exitcode {proc.exitcode}）",
+                }
+    proc.join()
+    return result
+
+
+# ──────────────────────────────────────────────
+# 结果对比
+# ──────────────────────────────────────────────
+
+PHASES = ("open", "outline", "plan", "write")
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """打印与基线的比值，超过 threshold 的阶段标记为回归；返回回归数"""
+    base_cases = {c["name"]: c for c in baseline.get("cases", [])}
+    regressions = 0
+    print(f"\n对比基线（pypdf {baseline['meta'].get('pypdf')} → {current['meta']['pypdf']}）：")
+    for case in current["cases"]:
+        base = base_cases.get(case["name"])
+        if not base or "timings" not in base or "timings" not in case:
+            continue
+        cells = []
+        for phase in PHASES + ("peak_rss_kb",):
+            if phase == "peak_rss_kb":
+                old, new = base.get(phase), case.get(phase)
+            else:
+                old, new = base["timings"].get(phase), case["timings"].get(phase)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = " ▲"
+                regressions += 1
+            cells.append(f"{phase}={ratio:.2f}x{flag}")
+        print(f"  {case['name']:<16} " + "  ".join(cells))
+    return regressions
+
+
+# ──────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="bench_split_chapters",
+        description="split_chapters.py 基准测试与性能剖析",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--pages", type=int, help="自定义用例：页数")
+    parser.add_argument("--depth", type=int, default=3, help="书签深度（默认 3）")
+    parser.add_argument("--fanout", type=int, default=6, help="每层书签分支数（默认 6）")
+    parser.add_argument(
+        "--shared-ratio",
+        type=float,
+        default=1.0,
+        help="共用字体/图片对象的页面比例 0~1（默认 1.0）",
+    )
+    parser.add_argument(
+        "--image-bytes", type=int, default=16384, help="每张图片字节数（默认 16384）"
+    )
+    parser.add_argument(
+        "-l",
+        "--level",
+        type=int,
+        default=0,
+        help="切分使用的书签层级，0=顶级章节（默认），-1=所有层级",
+    )
+    parser.add_argument(
+        "--no-bookmarks", action="store_true", help="写出时不保留书签/链接"
+    )
+    parser.add_argument(
+        "--linearize", action="store_true", help="写出线性化 PDF（需要 pikepdf 或 qpdf）"
+    )
+    parser.add_argument(
+        "--max-size",
+        type=sc.parse_size,
+        default=None,
+        help="按体积预算切分（如 5M），并检查输出是否超出预算",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=1, help="每个用例重复次数，取各阶段最小值"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=("cprofile", "pyinstrument"),
+        default=None,
+        help="剖析写出阶段，结果保存到 --profile-dir",
+    )
+    parser.add_argument(
+        "--profile-dir", default=".", help="剖析结果输出目录（默认当前目录）"
+    )
+    parser.add_argument(
+        "-o", "--output", default="bench_split_chapters.json", help="结果 JSON 路径"
+    )
+    parser.add_argument("--compare", metavar="BASELINE.json", help="与基线结果对比")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="对比时视为回归的变慢比例（默认 0.15 即 15%%）",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    common = {
+        "level": None if args.level == -1 else args.level,
+        "no_bookmarks": args.no_bookmarks,
+        "max_size": args.max_size,
+        "linearize": args.linearize,
+    }
+    if args.pages:
+        cases = [
+            {
+                "name": f"custom-{args.pages}",
+                "pages": args.pages,
+                "depth": args.depth,
+                "fanout": args.fanout,
+                "shared_ratio": args.shared_ratio,
+                "image_bytes": args.image_bytes,
+                **common,
+            }
+        ]
+    else:
+        cases = [
+            {
+                "name": name,
+                "pages": pages,
+                "depth": depth,
+                "fanout": fanout,
+                "shared_ratio": shared,
+                "image_bytes": img,
+                **common,
+            }
+            for name, pages, depth, fanout, shared, img in DEFAULT_CASES
+        ]
+
+    Path(args.profile_dir).mkdir(parents=True, exist_ok=True)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_split_") as workdir:
+        for case in cases:
+            _, generate = generate_case(case, workdir)
+            runs = [
+                run_isolated(case, workdir, args.profile, args.profile_dir)
+                for _ in range(max(1, args.repeat))
+            ]
+            ok_runs = [r for r in runs if "timings" in r]
+            if not ok_runs:
+                results.append(runs[0])
+                print(f"  {case['name']:<16} [失败: {runs[0].get('error')}]")
+                continue
+            best = dict(ok_runs[0])
+            best["timings"] = {
+                k: min(r["timings"][k] for r in ok_runs) for k in best["timings"]
+            }
+            best["timings"]["generate"] = round(generate, 6)
+            best["peak_rss_kb"] = max(r["peak_rss_kb"] for r in ok_runs)
+            results.append(best)
+            t = best["timings"]
+            print(
+                f"  {case['name']:<16} {case['pages']:>6}p  "
+                f"open {t['open'] * 1000:8.1f}ms  outline {t['outline'] * 1000:8.1f}ms  "
+                f"plan {t['plan'] * 1000:6.2f}ms  write {t['write'] * 1000:9.1f}ms  "
+                f"({best['chapters']} 章)  RSS {best['peak_rss_kb'] / 1024:.0f}MB"
+            )
+            if args.max_size:
+                print(
+                    f"  {'':<16} 最大输出 {sc.format_size(best['largest_output_bytes'])}，"
+                    f"预算 {sc.format_size(args.max_size)}，超出 {best['over_budget']} 个"
+                )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pypdf": pypdf.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "cases": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+bench_split_engines.py — split_chapters.py 的 pypdf / pikepdf 引擎一致性检查与对比
+
+为每个用例生成合成 PDF（复用 bench_split_chapters 的生成器），再加上几类链接：
+章节内跳转、跨章跳转、命名目标跳转与外部 URI。然后分别用两种引擎：
+    1. 读取书签，生成 层级 0 / 1 / 全部 / 显式页范围 四种章节计划，要求完全一致；
+    2. 按层级 0 写出全部章节（保留书签并重写链接），用 pypdf 读回每个输出文件，
+       比较页数、书签（标题与页码）、链接目标与丢弃的跨章链接数，要求完全一致；
+    3. 给出 --max-size 时比较两边拆分出的部分，并检查实际输出不超出预算；
+    4. 报告各阶段耗时与 pikepdf 相对 pypdf 的加速比。
+任何不一致都会列出并以非零状态退出。
+
+用法:
+    python bench_split_engines.py
+    python bench_split_engines.py --pages 3000 --max-size 2M
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.annotations import Link
+    from pypdf.generic import (
+        ArrayObject,
+        DictionaryObject,
+        NameObject,
+        NumberObject,
+        TextStringObject,
+    )
+except ImportError:
+    sys.exit("[错误] 缺少依赖: pip install pypdf")
+
+import bench_split_chapters as bench
+import split_chapters as sc
+
+# 默认用例：(名称, 页数, 书签深度, 每层分支数, 共享资源比例, 图片字节数)
+DEFAULT_CASES = [
+    ("small", 200, 2, 5, 1.0, 4096),
+    ("medium-unique", 2000, 3, 6, 0.0, 8192),
+    ("large-shared", 6000, 3, 6, 0.9, 4096),
+]
+ENGINE_NAMES = ("pypdf", "pikepdf")
+PHASES = ("open", "outline", "plan", "write")
+
+
+def add_links(path: Path):
+    """每页一个指向后一页的链接；每 7 页一个命名目标链接；首页一个外部 URI 链接"""
+    writer = PdfWriter(clone_from=str(path))
+    total = len(writer.pages)
+    for k in range(0, total, 50):
+        writer.add_named_destination(f"dest-{k}", k)
+    for i in range(total):
+        writer.add_annotation(i, Link(rect=(50, 50, 150, 70), target_page_index=(i + 1) % total))
+        if i % 7 == 0:
+            link = DictionaryObject(
+                {
+                    NameObject("/Type"): NameObject("/Annot"),
+                    NameObject("/Subtype"): NameObject("/Link"),
+                    NameObject("/Rect"): ArrayObject(
+                        [NumberObject(x) for x in (50, 80, 150, 100)]
+                    ),
+                    NameObject("/Dest"): TextStringObject(f"dest-{(i // 50) * 50}"),
+                }
+            )
+            writer.add_annotation(i, link)
+    writer.add_annotation(0, Link(rect=(50, 110, 150, 130), url="https://example.com/"))
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def describe_output(path: Path) -> dict:
+    """用 pypdf 读回输出文件：页数、书签与链接目标（章节内页码）"""
+    reader = PdfReader(str(path))
+    resolver = sc.LinkResolver(reader)
+    links = []
+    for i, page in enumerate(reader.pages):
+        for ref in page.get("/Annots") or []:
+            annot = ref.get_object()
+            dest = resolver.goto_dest(annot)
+            if dest is not None:
+                resolved = resolver.resolve(dest)
+                links.append((i, resolved[0] if resolved else None))
+            elif annot.get("/Subtype") == "/Link":
+                links.append((i, "external"))
+    return {
+        "pages": len(reader.pages),
+        "outline": sc.get_outline_items(reader),
+        "links": sorted(links, key=str),
+    }
+
+
+def run_engine(engine: str, pdf: Path, workdir: Path, max_size: int | None) -> dict:
+    timings = {}
+    t0 = time.perf_counter()
+    book = sc.open_book(pdf, engine)
+    timings["open"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    outline = book.outline_items()
+    timings["outline"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    plans = {
+        f"level={level}": sc.plan_chapters(book, level=level, outline_items=outline)
+        for level in (0, 1, None)
+    }
+    plans["ranges"] = sc.plan_chapters(
+        book, ranges=f"1-10:前言,11-{book.page_count // 2},{book.page_count // 2 + 1}-"
+    )
+    timings["plan"] = time.perf_counter() - t0
+
+    sized = None
+    if max_size:
+        t0 = time.perf_counter()
+        sized = sc.plan_chapters(book, level=0, outline_items=outline, max_size=max_size)
+        timings["size-plan"] = time.perf_counter() - t0
+
+    out_dir = workdir / f"{pdf.stem}_{engine}"
+    t0 = time.perf_counter()
+    results = sc.execute_split(
+        book, sized or plans["level=0"], out_dir, outline_items=outline, overwrite=True
+    )
+    timings["write"] = time.perf_counter() - t0
+    return {
+        "engine": book.engine,
+        "timings": timings,
+        "outline": outline,
+        "plans": plans,
+        "sized": sized,
+        "results": results,
+        "outputs": {r["file"]: describe_output(Path(r["path"])) for r in results},
+    }
+
+
+def strip_estimates(chapters):
+    # 体积估算随引擎的序列化方式略有差异，只比较拆分位置
+    return [{k: v for k, v in ch.items() if k != "est_bytes"} for ch in chapters]
+
+
+def compare_runs(a: dict, b: dict, max_size: int | None) -> list[str]:
+    problems = []
+    if a["outline"] != b["outline"]:
+        problems.append(f"书签不一致：{len(a['outline'])} 条 vs {len(b['outline'])} 条")
+    for name, plan in a["plans"].items():
+        if plan != b["plans"][name]:
+            problems.append(f"章节计划 {name} 不一致")
+    if max_size:
+        pa, pb = strip_estimates(a["sized"]), strip_estimates(b["sized"])
+        if pa != pb:
+            problems.append(f"--max-size 拆分不一致：{len(pa)} 个部分 vs {len(pb)} 个部分")
+        for run in (a, b):
+            over = [
+                r["file"] for r in run["results"]
+                if r["bytes"] > max_size and not r.get("oversize")
+            ]
+            if over:
+                problems.append(f"{run['engine']} 有 {len(over)} 个输出超出预算: {over[:3]}")
+    if a["outputs"].keys() != b["outputs"].keys():
+        problems.append("输出文件名不一致")
+    for name in sorted(a["outputs"].keys() & b["outputs"].keys()):
+        for field in ("pages", "outline", "links"):
+            if a["outputs"][name][field] != b["outputs"][name][field]:
+                problems.append(f"{name}: {field} 不一致")
+    dropped_a = [r["dropped_links"] for r in a["results"]]
+    dropped_b = [r["dropped_links"] for r in b["results"]]
+    if dropped_a != dropped_b:
+        problems.append(f"丢弃的跨章链接数不一致：{sum(dropped_a)} vs {sum(dropped_b)}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="bench_split_engines",
+        description="split_chapters.py 引擎一致性检查与性能对比",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--pages", type=int, help="自定义用例：页数")
+    parser.add_argument("--depth", type=int, default=3, help="书签深度（默认 3）")
+    parser.add_argument("--fanout", type=int, default=6, help="每层书签分支数（默认 6）")
+    parser.add_argument(
+        "--shared-ratio", type=float, default=0.5, help="共用字体/图片对象的页面比例 0~1"
+    )
+    parser.add_argument("--image-bytes", type=int, default=8192, help="每张图片字节数")
+    parser.add_argument(
+        "--max-size", type=sc.parse_size, default=None, help="同时比较按体积拆分（如 2M）"
+    )
+    args = parser.parse_args()
+
+    if not sc.have_pikepdf():
+        sys.exit("[错误] 未安装 pikepdf，无法对比：pip install pikepdf")
+
+    if args.pages:
+        cases = [(f"custom-{args.pages}", args.pages, args.depth, args.fanout,
+                  args.shared_ratio, args.image_bytes)]
+    else:
+        cases = DEFAULT_CASES
+
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix="bench_engines_") as tmp:
+        workdir = Path(tmp)
+        for name, pages, depth, fanout, shared, image_bytes in cases:
+            pdf = workdir / f"{name}.pdf"
+            bench.make_synthetic_pdf(pdf, pages, depth, fanout, shared, image_bytes)
+            add_links(pdf)
+            runs = [run_engine(e, pdf, workdir, args.max_size) for e in ENGINE_NAMES]
+            problems = compare_runs(*runs, args.max_size)
+            failures += bool(problems)
+
+            print(f"== {name}: {pages} 页，{len(runs[0]['outline'])} 条书签，"
+                  f"写出 {len(runs[0]['results'])} 个文件")
+            phases = PHASES + (("size-plan",) if args.max_size else ())
+            for run in runs:
+                t = run["timings"]
+                print(f"  {run['engine']:<8} " + "  ".join(
+                    f"{p} {t[p] * 1000:8.1f}ms" for p in phases
+                ))
+            base, fast = runs[0]["timings"], runs[1]["timings"]
+            print("  加速比   " + "  ".join(
+                f"{p} {base[p] / fast[p]:6.2f}x" if fast[p] else f"{p}    -"
+                for p in phases
+            ))
+            if problems:
+                print("  失败：")
+                for problem in problems:
+                    print(f"    - {problem}")
+            else:
+                print("  通过：书签、章节计划与输出内容一致")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
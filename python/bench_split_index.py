@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+bench_split_index.py — split_chapters.py 章节索引（--index）测试
+
+生成每页若干行文字的合成 PDF，比较两种得到“章节文件 + 索引”的做法：
+    两遍：先切分，再逐个重新打开章节文件提取正文、计算 sha256（原先的独立任务）；
+    一遍：切分时同时写索引，正文分别由 1 个进程和 --workers 个进程按页提取。
+检查一遍得到的每条索引与两遍的结果一致（文件名、页数、字节数、正文），sha256 与
+本次写出的文件一致（输出的 /ID 每次不同，两种做法的文件内容不能逐字节比较），
+报告各做法耗时与相对两遍的加速比。
+
+用法:
+    python bench_split_index.py
+    python bench_split_index.py --pages 2000 --lines 60 --workers 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import DictionaryObject, NameObject, StreamObject
+except ImportError:
+    sys.exit("[错误] 缺少依赖: pip install pypdf")
+
+import split_chapters as sc
+
+
+def make_text_pdf(path: Path, pages: int, lines: int, depth: int, fanout: int):
+    """每页 lines 行文字，书签为 depth 层、每层 fanout 个分支的均匀树"""
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for i in range(pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        ops = ["BT /F1 10 Tf 12 TL 72 740 Td"]
+        for k in range(lines):
+            ops.append(f"(Page {i + 1} line {k + 1}: the quick brown fox jumps over the lazy dog) '")
+        ops.append("ET")
+        content = StreamObject()
+        content.set_data(" ".join(ops).encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+
+    def add_level(parent, first: int, last: int, level: int, prefix: str):
+        span = last - first
+        if level >= depth or span < 1:
+            return
+        n = min(fanout, span)
+        for k in range(n):
+            start = first + span * k // n
+            end = first + span * (k + 1) // n
+            title = f"{prefix}{k + 1}"
+            item = writer.add_outline_item(f"Section {title}", start, parent=parent)
+            add_level(item, start, end, level + 1, f"{title}.")
+
+    add_level(None, 0, pages, 0, "")
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def two_pass(pdf: Path, engine: str, out_dir: Path) -> tuple[float, list[dict]]:
+    t0 = time.perf_counter()
+    book = sc.open_book(pdf, engine)
+    outline = book.outline_items()
+    chapters = sc.plan_chapters(book, level=1, outline_items=outline)
+    results = sc.execute_split(book, chapters, out_dir, outline_items=outline, overwrite=True)
+    records = []
+    for r in results:
+        data = Path(r["path"]).read_bytes()
+        reader = PdfReader(r["path"])
+        records.append(
+            {
+                "file": r["file"],
+                "pages": len(reader.pages),
+                "bytes": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "text": sc.PAGE_SEPARATOR.join(sc._page_text(p) for p in reader.pages),
+            }
+        )
+    return time.perf_counter() - t0, records
+
+
+def one_pass(pdf: Path, engine: str, out_dir: Path, workers: int) -> tuple[float, list[dict]]:
+    index_path = out_dir.with_suffix(".jsonl")
+    t0 = time.perf_counter()
+    book = sc.open_book(pdf, engine)
+    outline = book.outline_items()
+    chapters = sc.plan_chapters(book, level=1, outline_items=outline)
+    index = sc.open_index(index_path, str(pdf))
+    try:
+        sc.execute_split(
+            book, chapters, out_dir, outline_items=outline, overwrite=True,
+            index=index, text_workers=workers,
+        )
+    finally:
+        index.close()
+    elapsed = time.perf_counter() - t0
+    with open(index_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    for r in records:
+        r["disk_sha256"] = hashlib.sha256(Path(r["path"]).read_bytes()).hexdigest()
+    return elapsed, records
+
+
+def compare(expected: list[dict], actual: list[dict]) -> list[str]:
+    problems = []
+    if len(expected) != len(actual):
+        return [f"条目数 {len(actual)}，应为 {len(expected)}"]
+    for want, got in zip(expected, actual):
+        for key in ("file", "pages", "bytes", "text"):
+            if want[key] != got[key]:
+                problems.append(f"{want['file']}: {key} 不一致")
+        if got["sha256"] != got["disk_sha256"]:
+            problems.append(f"{want['file']}: sha256 与写出的文件不一致")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="split_chapters.py 章节索引测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--pages", type=int, default=600, help="页数")
+    parser.add_argument("--lines", type=int, default=40, help="每页文字行数")
+    parser.add_argument("--depth", type=int, default=2, help="书签层数")
+    parser.add_argument("--fanout", type=int, default=6, help="每层书签分支数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="并行提取进程数")
+    parser.add_argument("--engine", choices=sc.ENGINES, default="auto", help="切分引擎")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = Path(tmp) / "book.pdf"
+        make_text_pdf(pdf, args.pages, args.lines, args.depth, args.fanout)
+        base, expected = two_pass(pdf, args.engine, Path(tmp) / "two")
+        runs = {"一遍 1 进程": one_pass(pdf, args.engine, Path(tmp) / "one1", 1)}
+        if args.workers > 1:
+            runs[f"一遍 {args.workers} 进程"] = one_pass(
+                pdf, args.engine, Path(tmp) / "oneN", args.workers
+            )
+
+    print(f"== {args.pages} 页 × {args.lines} 行，{len(expected)} 个章节，引擎 {args.engine}")
+    print(f"  两遍（切分后重新解析）  {base * 1000:8.0f}ms")
+    problems = []
+    for label, (elapsed, records) in runs.items():
+        print(f"  {label:<20}{elapsed * 1000:8.0f}ms  加速比 {base / elapsed:.2f}x")
+        problems += [f"{label}: {p}" for p in compare(expected, records)]
+    for p in problems:
+        print(f"  [不一致] {p}")
+    print(f"  {'失败' if problems else '通过：索引与重新解析章节文件的结果一致'}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
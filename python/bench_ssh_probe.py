@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+bench_ssh_probe.py — ssh-config-gen.py --probe 的本地假监听测试
+
+在本机开一批只 accept 即关闭的假监听端口，合成 N 台主机的清单：
+大部分主机各自指向一个假监听（可达），一部分指向 127.1.x.y 上无人监听的端口
+（被拒），每台主机地址都不同，探测不会因去重而变少；
+另有三台候选跳板机 bastion-fast / bastion-slow / bastion-dead。
+
+回环地址上无法制造不同的握手延迟，因此 fast / slow 两台的延迟通过预先写入
+探测缓存给定（同时验证缓存命中），bastion-dead 指向关闭端口、由真实探测得出不可达。
+运行两轮生成：
+    1. 首轮：实际探测所有主机，检查 ProxyJump 都是 bastion-fast
+    2. 把缓存中 bastion-fast 改成不可达，检查 ProxyJump 改选 bastion-slow
+并报告每轮耗时。
+
+用法:
+    python bench_ssh_probe.py                      # 10000 台主机
+    python bench_ssh_probe.py --hosts 20000 --concurrency 2000 --refused-pct 30
+"""
+
+import argparse
+import json
+import re
+import resource
+import selectors
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+SCRIPT = HERE / "ssh-config-gen.py"
+BACKLOG = 4096
+
+
+def raise_fd_limit(need: int) -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < need:
+        if hard != resource.RLIM_INFINITY and hard < need:
+            sys.exit(f"[错误] 文件描述符上限 {hard} 不足 {need}，请减少 --hosts")
+        resource.setrlimit(resource.RLIMIT_NOFILE, (need, hard))
+
+
+def start_listeners(count: int) -> tuple[list[int], threading.Event]:
+    """count 个监听端口，在一个线程里 accept 后立即关闭"""
+    sel = selectors.DefaultSelector()
+    ports = []
+    for _ in range(count):
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(BACKLOG)
+        sock.setblocking(False)
+        sel.register(sock, selectors.EVENT_READ)
+        ports.append(sock.getsockname()[1])
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            for key, _ in sel.select(timeout=0.2):
+                while True:
+                    try:
+                        conn, _ = key.fileobj.accept()
+                    except (BlockingIOError, ConnectionAbortedError):
+                        break
+                    conn.close()
+        for key in list(sel.get_map().values()):
+            key.fileobj.close()
+
+    threading.Thread(target=loop, daemon=True).start()
+    return ports, stop
+
+
+def closed_port() -> int:
+    """绑定后立即关闭得到的端口，连接会被拒绝"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_inventory(path: Path, args, ports: list[int], dead_port: int) -> None:
+    hosts = [
+        {"host": "bastion-fast", "hostname": "127.0.0.1", "port": ports[0]},
+        {"host": "bastion-slow", "hostname": "127.0.0.1", "port": ports[1]},
+        {"host": "bastion-dead", "hostname": "127.0.0.1", "port": dead_port},
+    ]
+    listening = iter(ports[2:])
+    for i in range(args.hosts):
+        if i % 100 < args.refused_pct:
+            hostname, port = f"127.1.{i // 250 % 250}.{i % 250 + 1}", dead_port
+        else:
+            hostname, port = "127.0.0.1", next(listening)
+        hosts.append({
+            "host": f"node-{i:05d}",
+            "hostname": hostname,
+            "port": port,
+            "groups": ["fleet"],
+        })
+    inventory = {
+        "groups": {"fleet": {"options": {
+            "jump_candidates": ["bastion-dead", "bastion-slow", "bastion-fast"],
+        }}},
+        "hosts": hosts,
+    }
+    path.write_text(json.dumps(inventory), encoding="utf-8")
+
+
+def set_bastion_rtt(cache: Path, ports: list[int], fast, slow) -> None:
+    """在探测缓存中写入 fast / slow 两台跳板机的往返毫秒（None 为不可达）"""
+    entries = json.loads(cache.read_text(encoding="utf-8")) if cache.exists() else {}
+    now = time.time()
+    entries[f"127.0.0.1:{ports[0]}"] = [fast, now]
+    entries[f"127.0.0.1:{ports[1]}"] = [slow, now]
+    cache.write_text(json.dumps(entries), encoding="utf-8")
+
+
+def run_generator(inventory: Path, output: Path, cache: Path, args) -> tuple[float, str]:
+    cmd = [
+        sys.executable, str(SCRIPT), str(inventory), "-o", str(output),
+        "--probe", "--probe-cache", str(cache),
+        "--probe-concurrency", str(args.concurrency),
+        "--probe-timeout", str(args.timeout),
+    ]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        sys.exit(f"[错误] ssh-config-gen.py 失败:\n{proc.stderr}")
+    return elapsed, proc.stderr
+
+
+def jump_counts(output: Path) -> dict:
+    counts: dict[str, int] = {}
+    for jump in re.findall(r"^\s+ProxyJump (\S+)$", output.read_text(encoding="utf-8"), re.M):
+        counts[jump] = counts.get(jump, 0) + 1
+    return counts
+
+
+def check(label: str, output: Path, expected: str, hosts: int) -> bool:
+    counts = jump_counts(output)
+    ok = counts == {expected: hosts}
+    print(f"  {'通过' if ok else '失败'}: {label} ProxyJump 分布 {counts}，期望全部为 {expected}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="ssh-config-gen.py --probe 本地假监听测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--hosts", type=int, default=10000, help="主机数（默认 10000）")
+    parser.add_argument("--refused-pct", type=int, default=10, help="指向关闭端口的主机百分比")
+    parser.add_argument("--concurrency", type=int, default=1000, help="探测并发数")
+    parser.add_argument("--timeout", type=float, default=1.0, help="探测超时秒数")
+    args = parser.parse_args()
+
+    reachable = sum(1 for i in range(args.hosts) if i % 100 >= args.refused_pct)
+    raise_fd_limit(reachable + 2 + 256)
+    ports, stop = start_listeners(reachable + 2)
+    dead_port = closed_port()
+    ok = True
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            inventory, output, cache = tmp / "hosts.json", tmp / "out.conf", tmp / "probe.json"
+            write_inventory(inventory, args, ports, dead_port)
+            set_bastion_rtt(cache, ports, fast=3.0, slow=40.0)
+
+            print(f"== 第 1 轮：{args.hosts} 台主机，{len(ports)} 个假监听")
+            elapsed, log = run_generator(inventory, output, cache, args)
+            print(log.rstrip())
+            print(f"  总耗时 {elapsed:.2f}s")
+            ok &= check("延迟最低", output, "bastion-fast", args.hosts)
+
+            set_bastion_rtt(cache, ports, fast=None, slow=40.0)
+            print("== 第 2 轮：bastion-fast 不可达（缓存），其余地址命中缓存")
+            elapsed, log = run_generator(inventory, output, cache, args)
+            print(log.rstrip())
+            print(f"  总耗时 {elapsed:.2f}s")
+            ok &= check("跳过不可达", output, "bastion-slow", args.hosts)
+    finally:
+        stop.set()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
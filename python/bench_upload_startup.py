@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+bench_upload_startup.py — upload_to_telegram.py 启动开销测试
+
+1. 导入耗时：多次运行 python -X importtime -c "import upload_to_telegram"，
+   取累计耗时的中位数与预算比较，并列出最慢的顶层导入；
+   同时检查 --help 不会加载 aiohttp / tqdm / requests。
+2. 短任务端到端：在本进程内启动 telegram_mock_server，用一个有效 token
+   和一个无效 token 上传几张小图两次（共用一个临时 token 缓存）：
+       首轮：两个 token 在首次使用时各验证一次，无效 token 被移出
+       次轮：两个 token 的验证结果都命中缓存，不再调用 getMe
+   报告每轮耗时与 getMe 次数。
+
+用法:
+    python bench_upload_startup.py
+    python bench_upload_startup.py --runs 10 --budget 150
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+SCRIPT = HERE / "upload_to_telegram.py"
+MODULE = "upload_to_telegram"
+LAZY_MODULES = ("aiohttp", "tqdm", "requests")
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+VALID_TOKEN, INVALID_TOKEN = "1:valid", "2:revoked"
+
+sys.path.insert(0, str(HERE))
+import telegram_mock_server  # noqa: E402
+
+
+def importtime(argv: list[str]) -> list[tuple[int, int, str]]:
+    """运行 python -X importtime，返回 [(自身微秒, 累计微秒, 缩进+模块名)]"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        capture_output=True, text=True, cwd=HERE,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            rows.append((int(match[1]), int(match[2]), match[3] + match[4]))
+    return rows
+
+
+def bench_import(args) -> bool:
+    totals, last = [], []
+    for _ in range(args.runs):
+        last = importtime(["-c", f"import {MODULE}"])
+        totals.append(next(cum for _, cum, name in last if name.strip() == MODULE))
+    median = statistics.median(totals) / 1000
+    ok = median <= args.budget
+    print(f"== 导入耗时（{args.runs} 次）")
+    print(f"  中位数 {median:.1f}ms，最快 {min(totals) / 1000:.1f}ms，预算 {args.budget:.0f}ms")
+    # -X importtime 按导入深度每层缩进两个空格，只看 upload_to_telegram 直接导入的模块
+    depth = next(len(name) - len(name.lstrip()) for _, _, name in last if name.strip() == MODULE)
+    children = [row for row in last if len(row[2]) - len(row[2].lstrip()) == depth + 2]
+    top = sorted(children, key=lambda row: row[1], reverse=True)[:args.top]
+    for _, cum, name in top:
+        print(f"  {cum / 1000:8.1f}ms  {name.strip()}")
+    print(f"  {'通过' if ok else '失败'}: 导入耗时在预算内")
+
+    loaded = {name.strip() for _, _, name in importtime([str(SCRIPT), "--help"])}
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    print(f"  {'失败' if eager else '通过'}: --help 未加载 {', '.join(LAZY_MODULES)}"
+          + (f"（实际加载了 {', '.join(eager)}）" if eager else ""))
+    return ok and not eager
+
+
+def stats(base: str) -> dict:
+    with urllib.request.urlopen(f"{base}/stats") as response:
+        return json.load(response)
+
+
+def run_upload(base: str, image_dir: Path, cache: Path) -> float:
+    cmd = [
+        sys.executable, str(SCRIPT), "-t", f"{INVALID_TOKEN},{VALID_TOKEN}",
+        "-c", "-100", "-d", str(image_dir), "--api_url", base, "--no_detect_local",
+        "--token_cache", str(cache),
+    ]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        sys.exit(f"[错误] upload_to_telegram.py 失败:\n{proc.stderr}")
+    return elapsed
+
+
+def bench_run(args) -> bool:
+    server = telegram_mock_server.make_server(telegram_mock_server.parse_args([
+        "--port", "0", "--latency", str(args.latency), "--invalid-tokens", INVALID_TOKEN,
+    ]))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    ok = True
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            image_dir, cache = tmp / "imgs", tmp / "tokens.json"
+            image_dir.mkdir()
+            for i in range(args.images):
+                (image_dir / f"{i:03d}.jpg").write_bytes(b"\xff\xd8" + bytes(1024) + b"\xff\xd9")
+
+            print(f"== 短任务：{args.images} 张图片，模拟延迟 {args.latency:.0f}ms")
+            for label, expected in (("首轮（无缓存）", 2), ("次轮（命中缓存）", 0)):
+                before = stats(base)["get_me"]
+                elapsed = run_upload(base, image_dir, cache)
+                calls = stats(base)["get_me"] - before
+                passed = calls == expected
+                ok &= passed
+                print(f"  {label}: {elapsed * 1000:.0f}ms，getMe {calls} 次"
+                      f" —— {'通过' if passed else '失败'}（期望 {expected} 次）")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="upload_to_telegram.py 启动开销测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--runs", type=int, default=5, help="导入耗时测量次数")
+    parser.add_argument("--budget", type=float, default=200, help="导入耗时预算（毫秒）")
+    parser.add_argument("--top", type=int, default=8, help="列出最慢的几个顶层导入")
+    parser.add_argument("--images", type=int, default=3, help="短任务的图片数")
+    parser.add_argument("--latency", type=float, default=100, help="模拟服务器延迟（毫秒）")
+    args = parser.parse_args()
+
+    ok = bench_import(args)
+    ok &= bench_run(args)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+httpkit.py — upload_to_telegram.py、qiangke.py 等脚本共用的异步 HTTP 核心
+
+    lazy_import   模块占位，第一次访问属性时才真正导入（见 lazyimport.py，此处转出）
+    proxy_for     按 HTTPS_PROXY / HTTP_PROXY 与 NO_PROXY 为单个 URL 选择代理，本机地址总是直连
+    Retry         重试策略：指数退避 + 随机抖动，遵守响应的 Retry-After；
+                  retrying(Retry(...)) 把它用作异步函数的装饰器
+    HttpMetrics   基于 aiohttp TraceConfig 的请求计时，按主机统计次数、错误与延迟分位数
+    HttpClient    一个连接池会话（keep-alive、DNS 缓存），request() 自动选代理并按 Retry 重试
+
+本模块只依赖标准库；aiohttp 在第一次建立会话时才导入，asyncio、urllib.request、email 等
+较慢的标准库模块也只在用到时导入，本模块自身的导入开销在几毫秒内。
+"""
+
+import ipaddress
+import logging
+import random
+import time
+from functools import wraps
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from lazyimport import lazy_import  # noqa: F401  供 qiangke.py 等沿用 httpkit.lazy_import
+
+DEFAULT_LIMIT = 100           # 连接池总连接数
+DEFAULT_LIMIT_PER_HOST = 10   # 每个主机的连接数
+DEFAULT_TIMEOUT = 300         # 单个请求总超时（秒），与 aiohttp 默认值相同
+DNS_CACHE_TTL = 300           # DNS 结果缓存时间（秒）
+KEEPALIVE_TIMEOUT = 30        # 空闲连接保留时间（秒）
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+_logged_proxies: set = set()
+
+
+def proxy_for(url: str) -> Optional[str]:
+    """
+    按环境变量为 url 选择代理：https 用 HTTPS_PROXY，http 用 HTTP_PROXY（大小写均可）；
+    本机地址与 NO_PROXY 中的主机直连，返回 None。
+    """
+    import urllib.request
+
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    if _is_loopback(host) or urllib.request.proxy_bypass(host):
+        return None
+    proxy = urllib.request.getproxies().get(parts.scheme)
+    if proxy and proxy not in _logged_proxies:
+        _logged_proxies.add(proxy)
+        logging.info(f"使用系统代理: {proxy}")
+    return proxy
+
+
+class Retry:
+    """
+    重试策略：最多 attempts 次（含第一次），第 n 次重试前等待
+    min(delay * backoff ** (n - 1), max_delay)，再乘以 1 ± jitter 的随机因子；
+    服务器给出 Retry-After 时至少等待该时长。
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        delay: float = 1.0,
+        backoff: float = 2.0,
+        max_delay: float = 60.0,
+        jitter: float = 0.1,
+        statuses: tuple = RETRY_STATUSES,
+    ):
+        self.attempts = max(1, attempts)
+        self.delay = delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.statuses = statuses
+
+    def delay_for(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """第 retry 次重试（从 1 开始）前的等待秒数"""
+        wait = min(self.delay * self.backoff ** (retry - 1), self.max_delay)
+        if self.jitter:
+            wait *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(wait, retry_after or 0)
+
+
+def retrying(policy: Retry):
+    """
+    异步函数重试装饰器：函数抛出任何异常都按 policy 等待后重新调用，
+    最后一次仍失败时原样抛出。运行时可通过 wrapper.retry 修改策略。
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            import asyncio
+
+            retry = wrapper.retry
+            for attempt in range(1, retry.attempts + 1):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == retry.attempts:
+                        logging.error(f"重试{retry.attempts - 1}次后仍然失败: {e}")
+                        raise
+                    wait = retry.delay_for(attempt)
+                    logging.warning(f"操作失败，{wait:.1f}秒后进行第{attempt}次重试: {e}")
+                    await asyncio.sleep(wait)
+
+        wrapper.retry = policy
+        return wrapper
+
+    return decorator
+
+
+def _retry_after(headers) -> Optional[float]:
+    """解析 Retry-After（秒数或 HTTP 日期）"""
+    from email.utils import parsedate_to_datetime
+
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpMetrics:
+    """
+    请求计时，基于 aiohttp 的 TraceConfig 钩子，任何会话都可挂上 trace_config()。
+    每个请求记录从开始到收到响应头的耗时与状态码；连接或超时错误计为错误。
+    """
+
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = {}  # 主机 → 耗时（秒）
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[int, int] = {}
+
+    def record(self, host: str, elapsed: float, status: Optional[int]) -> None:
+        if status is None:
+            self.errors[host] = self.errors.get(host, 0) + 1
+            return
+        self.latency.setdefault(host, []).append(elapsed)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def trace_config(self):
+        import aiohttp
+
+        config = aiohttp.TraceConfig()
+
+        async def on_start(session, ctx, params) -> None:
+            ctx.http_started = time.perf_counter()
+
+        async def on_end(session, ctx, params) -> None:
+            elapsed = time.perf_counter() - ctx.http_started
+            self.record(params.url.host or "", elapsed, params.response.status)
+
+        async def on_exception(session, ctx, params) -> None:
+            elapsed = time.perf_counter() - ctx.http_started
+            self.record(params.url.host or "", elapsed, None)
+
+        config.on_request_start.append(on_start)
+        config.on_request_end.append(on_end)
+        config.on_request_exception.append(on_exception)
+        return config
+
+    @property
+    def requests(self) -> int:
+        return sum(map(len, self.latency.values())) + sum(self.errors.values())
+
+    def summary(self) -> str:
+        """每个主机一段：请求数、错误数与响应头延迟的中位数 / p95"""
+        import statistics
+
+        parts = []
+        for host in sorted(set(self.latency) | set(self.errors)):
+            samples = sorted(self.latency.get(host, []))
+            text = f"{host} 请求 {len(samples) + self.errors.get(host, 0)} 次"
+            if self.errors.get(host):
+                text += f"，错误 {self.errors[host]} 次"
+            if samples:
+                p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+                text += (
+                    f"，延迟中位 {statistics.median(samples) * 1000:.0f}ms"
+                    f" p95 {p95 * 1000:.0f}ms"
+                )
+            parts.append(text)
+        return "；".join(parts) or "没有请求"
+
+
+class Response:
+    """已读完响应体的响应"""
+
+    __slots__ = ("status", "headers", "body", "elapsed", "url")
+
+    def __init__(self, status: int, headers, body: bytes, elapsed: float, url: str):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.elapsed = elapsed
+        self.url = url
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="replace")
+
+    def json(self) -> Any:
+        import json
+
+        return json.loads(self.body)
+
+
+_DEFAULT = object()
+
+
+def connector(limit: int = DEFAULT_LIMIT, limit_per_host: int = DEFAULT_LIMIT_PER_HOST):
+    """连接池：keep-alive 复用连接并缓存 DNS，多个会话可共用（需在事件循环内调用）"""
+    import aiohttp
+
+    return aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+
+
+class HttpClient:
+    """
+    共用的 HTTP 客户端：一个连接池会话，首次使用时在当前事件循环内创建。
+
+    request() 读完整个响应体后返回 Response；use_proxy 为 True 时按 proxy_for 选择代理
+    （单次请求可用 direct=True 强制直连）。连接错误、超时与 retry.statuses 中的状态码
+    按 Retry 重试，最后一次的状态码原样返回，连接错误原样抛出。
+    请求体为 aiohttp.FormData 时不能重发，应传 retry=None，由调用方整体重试。
+    其余关键字参数（cookie_jar、trace_configs 等）原样传给 aiohttp.ClientSession。
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: int = DEFAULT_LIMIT,
+        limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        retry: Optional[Retry] = None,
+        use_proxy: bool = True,
+        metrics: Optional[HttpMetrics] = None,
+        connector=None,
+        connector_owner: bool = True,
+        **session_kwargs,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.retry = retry or Retry()
+        self.use_proxy = use_proxy
+        self.metrics = metrics
+        self._connector = connector
+        self._connector_owner = connector_owner if connector is not None else True
+        self._trace_configs = list(session_kwargs.pop("trace_configs", None) or [])
+        self._session_kwargs = session_kwargs
+        self._session = None
+
+    @property
+    def session(self):
+        """底层 aiohttp.ClientSession（需在事件循环内访问）"""
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            trace_configs = list(self._trace_configs)
+            if self.metrics is not None:
+                trace_configs.append(self.metrics.trace_config())
+            self._session = aiohttp.ClientSession(
+                connector=self._connector or connector(self.limit, self.limit_per_host),
+                connector_owner=self._connector_owner,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=trace_configs or None,
+                **self._session_kwargs,
+            )
+        return self._session
+
+    async def request(
+        self,
+        method: str,
+        url,
+        *,
+        retry: Optional[Retry] = _DEFAULT,  # type: ignore[assignment]
+        direct: bool = False,
+        **kwargs,
+    ) -> Response:
+        import asyncio
+
+        import aiohttp
+
+        policy = self.retry if retry is _DEFAULT else retry or Retry(attempts=1)
+        if "proxy" not in kwargs and self.use_proxy and not direct:
+            kwargs["proxy"] = proxy_for(str(url))
+        session = self.session
+        attempt = 1
+        while True:
+            started = time.perf_counter()
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    body = await response.read()
+                    result = Response(
+                        response.status, response.headers, body,
+                        time.perf_counter() - started, str(response.url),
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= policy.attempts:
+                    raise
+                wait = policy.delay_for(attempt)
+                logging.warning(f"{method} {url} 失败: {e!r}，{wait:.1f}秒后重试")
+            else:
+                if result.status not in policy.statuses or attempt >= policy.attempts:
+                    return result
+                wait = policy.delay_for(attempt, _retry_after(result.headers))
+                logging.warning(f"{method} {url} 返回 {result.status}，{wait:.1f}秒后重试")
+            await asyncio.sleep(wait)
+            attempt += 1
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "HttpClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
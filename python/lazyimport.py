@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+lazyimport.py — 各脚本共用的延迟导入
+
+    lazy_import   模块占位，第一次访问属性时才真正导入。aiohttp、tqdm、bs4、pypdf
+                  各要几十到上百毫秒，--help、参数或配置出错时不必加载
+
+只依赖标准库，不含任何 HTTP 代码；不需要 httpkit 的脚本（如 split_chapters.py）
+直接导入本模块。httpkit.lazy_import 即本模块的 lazy_import。
+"""
+
+import importlib
+from typing import Any, Optional
+
+
+class _LazyModule:
+    """lazy_import 返回的占位对象"""
+
+    def __init__(self, name: str, install: Optional[str]):
+        self.__dict__["_name"] = name
+        self.__dict__["_install"] = install
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            name = self.__dict__["_name"]
+            try:
+                module = importlib.import_module(name)
+            except ImportError as e:
+                install = self.__dict__["_install"] or f"pip install {name.split('.')[0]}"
+                raise ImportError(f"缺少依赖 {name}: {install}") from e
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "已加载" if self.__dict__["_module"] is not None else "未加载"
+        return f"<lazy module {self.__dict__['_name']!r}（{state}）>"
+
+
+def lazy_import(name: str, install: Optional[str] = None) -> Any:
+    """
+    返回模块 name 的占位对象，第一次访问其属性时才导入；
+    未安装时在那一刻抛出带安装提示 install 的 ImportError。
+    """
+    return _LazyModule(name, install)
@@ -2,25 +2,42 @@
 """
 双流中学抢课脚本
 支持自动登录、精确定时抢课、重试机制和通知功能
+
+基于 asyncio + aiohttp：登录、课程列表轮询、选课请求与通知在同一个事件循环上调度，
+通知经后台队列批量发送，不阻塞选课。
+
+开启余量监控（--monitor 或 [monitor] enable）时，抢课时段没选上也不退出，
+以自适应间隔继续监视各志愿的课程行，有人退课、出现“选择”链接时立即选课。
 """
 
+from __future__ import annotations
+
 import argparse
+import asyncio
 import configparser
+import hashlib
+import json
 import logging
 import os
+import random
+import re
 import time
 from datetime import datetime, time as time_obj
-from typing import Optional, Dict, Any, Tuple
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, List, Tuple, Callable, cast
+from urllib.parse import urlencode
 
-import requests
-from bs4 import BeautifulSoup, Tag
-from requests import Session
+import httpkit
+
+# aiohttp、bs4 导入较慢，第一次用到时才加载，--help 与配置错误时不必加载
+aiohttp = httpkit.lazy_import("aiohttp")
+yarl = httpkit.lazy_import("yarl", "pip install aiohttp")
 
 
 # 常量定义
-BASE_URL = "http://xuanke.shuangzhong.com/elective/student"
-LOGIN_URL = f"{BASE_URL}/login.php"
-COURSE_LIST_URL = f"{BASE_URL}/s_course.php"
+BASE_URL = "http://xuanke.shuangzhong.com/elective/student"  # 可在配置文件 [server] base_url 覆盖
+LOGIN_PATH = "login.php"
+COURSE_LIST_PATH = "s_course.php"
 
 DEFAULT_HEADERS = {
     "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/jxl,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
@@ -30,7 +47,48 @@ DEFAULT_HEADERS = {
 
 # 重试配置
 MAX_URL_RETRIES = 5
-MAX_SELECT_RETRIES = 10
+# 触发后获取课程 URL 的重试间隔：0.5 秒起，每次乘 1.5
+URL_RETRY = httpkit.Retry(attempts=MAX_URL_RETRIES, delay=0.5, backoff=1.5, jitter=0)
+# 登录遇到连接错误或 5xx 时的重试
+LOGIN_RETRY = httpkit.Retry(attempts=3, delay=1.0)
+
+# 并发选课配置（可在配置文件 [burst] 中覆盖）
+DEFAULT_BURST_CONNECTIONS = 4    # 并发会话 / 连接数
+DEFAULT_BURST_WINDOW = 3.0       # 选课请求分布的时间窗口（秒）
+DEFAULT_BURST_MAX_REQUESTS = 20  # 请求总数硬上限，避免给服务器造成过大压力
+SELECT_TIMEOUT = 5               # 单个选课请求超时（秒）
+REQUEST_TIMEOUT = 10             # 登录、课程列表等普通请求超时（秒）
+# 选课响应中出现这些词视为名额已满，立即转向下一志愿（[burst] full_keywords 可覆盖）
+DEFAULT_FULL_KEYWORDS = ("已满", "满员", "名额不足")
+
+# 定时配置（可在配置文件 [timing] 中覆盖）
+DEFAULT_SYNC_PROBES = 8      # 校时探测次数
+DEFAULT_SPIN_MS = 20         # 最后多少毫秒改为忙等
+DEFAULT_RESYNC_BEFORE = 60   # 目标时间前多少秒重新校时
+
+# 预热配置
+PREARM_WINDOW = 120          # 目标前多少秒开始轮询课程列表
+PREARM_INTERVAL = 10         # 预热期间轮询间隔（秒），同时充当 keep-alive
+PREARM_FINAL = 2             # 最后一次预热轮询距触发的秒数
+POOL_SIZE = 4                # 每个账号除并发选课外保留的连接数
+
+# 会话保持配置（可在配置文件 [session] 中覆盖）
+DEFAULT_KEEPALIVE_INTERVAL = 300  # 预热窗口之前，每隔多少秒检查一次会话是否有效
+LOGGED_IN_MARKER = "注销"          # 页面出现该词视为已登录
+
+# 余量监控配置（可在配置文件 [monitor] 中覆盖）
+DEFAULT_MONITOR_MIN_INTERVAL = 2.0   # 课程行刚有变化时的轮询间隔（秒）
+DEFAULT_MONITOR_MAX_INTERVAL = 30.0  # 长时间无变化时退避到的最长间隔（秒）
+DEFAULT_MONITOR_BACKOFF = 1.5        # 每轮无变化时间隔乘以该系数
+DEFAULT_MONITOR_DURATION = 4 * 3600  # 最长监控时间（秒），0 表示不限
+MONITOR_JITTER = 0.1                 # 间隔随机抖动比例，避免多个账号同时轮询
+
+# 通知队列配置
+NOTICE_BATCH_WINDOW = 0.5    # 收到第一条后再等多久合并后续消息（秒）
+NOTICE_MAX_BATCH = 20        # 单次合并的最大消息数
+NOTICE_TIMEOUT = 5           # 通知请求超时（秒）
+NOTICE_ATTEMPTS = 3          # 通知请求最多尝试次数
+NOTICE_FLUSH_TIMEOUT = 10    # 退出时等待队列发完的最长时间（秒）
 
 
 class ConfigError(Exception):
@@ -38,30 +96,780 @@ class ConfigError(Exception):
     pass
 
 
+async def sleep_until(deadline: float, spin: float = DEFAULT_SPIN_MS / 1000) -> None:
+    """
+    睡眠到本地墙钟时间 deadline（time.time() 秒）。
+    先粗睡到 deadline - spin，最后一段用 perf_counter 忙等，误差在亚毫秒级。
+    忙等期间每轮让出一次事件循环，同一循环上的其他账号、通知任务照常运行。
+    """
+    # 换算到单调时钟，避免等待期间系统校时导致跳变
+    target = time.perf_counter() + (deadline - time.time())
+    while True:
+        remaining = target - time.perf_counter()
+        if remaining <= spin:
+            break
+        await asyncio.sleep(min(remaining - spin, 1.0))
+    while time.perf_counter() < target:
+        await asyncio.sleep(0)
+
+
+def _decode(content: bytes) -> str:
+    return content.decode("gb2312", errors="replace")
+
+
+class Notifier:
+    """
+    后台通知队列。
+
+    send() 只入队、立即返回；后台任务收到第一条消息后再等 batch_window 秒，
+    把期间到达的消息合并成一条发出，慢速或失败的 webhook 不会拖慢选课。
+    未配置 url 时只写日志。
+    """
+
+    def __init__(
+        self,
+        url: Optional[str],
+        batch_window: float = NOTICE_BATCH_WINDOW,
+        max_batch: int = NOTICE_MAX_BATCH,
+    ):
+        self.url = url
+        self.batch_window = batch_window
+        self.max_batch = max(1, max_batch)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.url and self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    def send(self, message: str) -> None:
+        if self._queue is None:
+            logging.info(f"[通知] {message}")
+            return
+        self._queue.put_nowait(message)
+
+    async def _run(self) -> None:
+        # 通知使用独立的客户端（按环境变量走代理、失败重试），不占用选课连接池
+        async with httpkit.HttpClient(
+            timeout=NOTICE_TIMEOUT,
+            retry=httpkit.Retry(attempts=NOTICE_ATTEMPTS, delay=0.5),
+        ) as client:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = time.monotonic() + self.batch_window
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                await self._post(client, "\n".join(batch))
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _post(self, client: httpkit.HttpClient, message: str) -> None:
+        try:
+            response = await client.request("POST", self.url, json={"msg": message})
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"发送通知时出错: {e}")
+            return
+        if response.status == 200:
+            logging.info(f"发送通知成功: {response.text()}")
+        else:
+            logging.warning(f"发送通知失败，状态码: {response.status}")
+
+    async def close(self, timeout: float = NOTICE_FLUSH_TIMEOUT) -> None:
+        """等待队列中的通知发完（最多 timeout 秒）后停止后台任务"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"仍有 {self._queue.qsize()} 条通知未发送")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._queue = None
+
+
+class Timeline:
+    """
+    请求时间线记录器，基于 aiohttp 的 TraceConfig 钩子。
+
+    对每个请求记录单调时钟纳秒时间戳：开始、排队等连接、DNS、建连（或复用连接）、
+    请求头发出、收到响应头（首字节）、读完响应体（完整响应），以及当时估计的
+    服务器时钟偏移。请求通过 trace_request_ctx 标注类型（login/list/select…）与账号。
+    退出时 write() 输出 Chrome trace 格式 JSON（chrome://tracing 或 Perfetto 打开）。
+    """
+
+    # 记录字段 → 钩子
+    _STAMPS = {
+        "queued_start": "on_connection_queued_start",
+        "queued_end": "on_connection_queued_end",
+        "dns_start": "on_dns_resolvehost_start",
+        "dns_end": "on_dns_resolvehost_end",
+        "connect_start": "on_connection_create_start",
+        "connect_end": "on_connection_create_end",
+        "reused": "on_connection_reuseconn",
+        "sent": "on_request_headers_sent",
+        "first_byte": "on_request_end",
+        "full": "on_response_chunk_received",  # 最后一次为准
+    }
+
+    def __init__(self):
+        self.t0_ns = time.perf_counter_ns()
+        self.wall0_ns = time.time_ns()  # 与 t0_ns 对应的墙钟时间，用于换算
+        self.clock: Optional["ServerClock"] = None
+        self.records: List[Dict[str, Any]] = []
+        self.marks: List[Dict[str, Any]] = []
+        self._config: Optional[aiohttp.TraceConfig] = None
+
+    def _offset_ms(self) -> Optional[float]:
+        if self.clock is None or self.clock.uncertainty is None:
+            return None
+        return round(self.clock.offset * 1000, 3)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        if self._config is not None:
+            return self._config
+        config = aiohttp.TraceConfig()
+
+        async def on_start(session, ctx, params) -> None:
+            ctx.record = {
+                "start": time.perf_counter_ns(),
+                "method": params.method,
+                "url": str(params.url),
+                "offset_ms": self._offset_ms(),
+                **(ctx.trace_request_ctx or {}),
+            }
+            self.records.append(ctx.record)
+
+        def stamper(key: str):
+            async def handler(session, ctx, params) -> None:
+                record = getattr(ctx, "record", None)
+                if record is not None:
+                    record[key] = time.perf_counter_ns()
+                    if key == "first_byte":
+                        record["status"] = params.response.status
+            return handler
+
+        async def on_exception(session, ctx, params) -> None:
+            record = getattr(ctx, "record", None)
+            if record is not None:
+                record["error_at"] = time.perf_counter_ns()
+                record["error"] = repr(params.exception)
+
+        config.on_request_start.append(on_start)
+        for key, signal in self._STAMPS.items():
+            getattr(config, signal).append(stamper(key))
+        config.on_request_exception.append(on_exception)
+        config.freeze()
+        self._config = config
+        return config
+
+    def mark(self, name: str, **args: Any) -> None:
+        """记录一个瞬时事件（如触发时刻、校时结果）"""
+        self.marks.append({"name": name, "at": time.perf_counter_ns(), **args})
+
+    def _us(self, ns: int) -> float:
+        return (ns - self.t0_ns) / 1000
+
+    @staticmethod
+    def _phases(r: Dict[str, Any]) -> List[Tuple[str, int, int]]:
+        """拆出各阶段 (名称, 开始 ns, 结束 ns)"""
+        phases = []
+
+        def add(name, a, b):
+            if r.get(a) and r.get(b) and r[b] >= r[a]:
+                phases.append((name, r[a], r[b]))
+
+        add("queue", "queued_start", "queued_end")
+        add("dns", "dns_start", "dns_end")
+        if r.get("connect_start") and r.get("connect_end"):
+            begin = r.get("dns_end") or r["connect_start"]
+            phases.append(("connect", begin, r["connect_end"]))
+        add("wait", "sent", "first_byte")  # 请求发出到首字节
+        add("download", "first_byte", "full")
+        return phases
+
+    def summary(self, r: Dict[str, Any]) -> Dict[str, Any]:
+        """单个请求的可读摘要（毫秒，本地墙钟与估计服务器时钟）"""
+        end = r.get("full") or r.get("first_byte") or r.get("error_at") or r["start"]
+        out = {k: v for k, v in r.items() if not isinstance(v, int) or k in ("n", "conn", "status")}
+        out["start_ns"] = r["start"]
+        out["start_wall"] = (self.wall0_ns + r["start"] - self.t0_ns) / 1e9
+        if r.get("offset_ms") is not None:
+            out["start_server"] = out["start_wall"] + r["offset_ms"] / 1000
+        out["total_ms"] = (end - r["start"]) / 1e6
+        for name, a, b in self._phases(r):
+            out[f"{name}_ms"] = (b - a) / 1e6
+        out["reused"] = bool(r.get("reused"))
+        return out
+
+    def write(self, path: str) -> None:
+        """输出 Chrome trace JSON：每个账号一条轨道，请求及其阶段为嵌套区间"""
+        tids: Dict[str, int] = {}
+        events: List[Dict[str, Any]] = []
+        for r in self.records:
+            track = str(r.get("account") or "-")
+            tid = tids.setdefault(track, len(tids) + 1)
+            end = r.get("full") or r.get("first_byte") or r.get("error_at") or r["start"]
+            name = r.get("kind", r["method"])
+            if "n" in r:
+                name = f"{name}#{r['n'] + 1}"
+            events.append({
+                "name": name, "cat": r.get("kind", "http"), "ph": "X",
+                "ts": self._us(r["start"]), "dur": (end - r["start"]) / 1000,
+                "pid": 1, "tid": tid, "args": self.summary(r),
+            })
+            for phase, a, b in self._phases(r):
+                events.append({
+                    "name": phase, "cat": "phase", "ph": "X",
+                    "ts": self._us(a), "dur": (b - a) / 1000, "pid": 1, "tid": tid,
+                })
+        for m in self.marks:
+            track = str(m.get("account") or "-")
+            tid = tids.setdefault(track, len(tids) + 1)
+            args = {k: v for k, v in m.items() if k not in ("name", "at")}
+            events.append({
+                "name": m["name"], "ph": "i", "s": "p",
+                "ts": self._us(m["at"]), "pid": 1, "tid": tid, "args": args,
+            })
+        for track, tid in tids.items():
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                "args": {"name": track},
+            })
+        trace = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "wall_clock_at_zero": self.wall0_ns / 1e9,
+                "server_offset_ms": self._offset_ms(),
+                "requests": len(self.records),
+            },
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, ensure_ascii=False)
+        logging.info(f"请求时间线已写入 {path}（{len(self.records)} 个请求）")
+
+
+class ServerClock:
+    """
+    通过 Date 响应头估计服务器时钟偏移与单程延迟。
+
+    Date 只有秒级精度：每次探测得到约束 D <= 本地中点 + offset < D + 1，
+    把探测均匀错开在一秒内的不同相位上，多个约束的交集即可把 offset
+    收窄到约 1/probes 秒（再加上 RTT 抖动）。
+    """
+
+    def __init__(
+        self, session: aiohttp.ClientSession, url: str, probes: int = DEFAULT_SYNC_PROBES
+    ):
+        self.session = session
+        self.url = url
+        self.probes = max(1, probes)
+        self.offset = 0.0        # 服务器时间 - 本地时间（秒）
+        self.one_way = 0.0       # 估计单程延迟（秒）
+        self.uncertainty = None  # offset 区间宽度的一半（秒），None 表示未校时
+        self._lock = asyncio.Lock()
+        self._synced_at: Optional[float] = None
+        self.trace_tag = {"kind": "sync", "account": "clock"}
+
+    async def _probe(self) -> Optional[Tuple[float, float, float]]:
+        """返回 (本地发送时间, 本地接收时间, 服务器 Date 秒)"""
+        t0 = time.time()
+        async with self.session.get(
+            self.url,
+            headers=DEFAULT_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=5),
+            trace_request_ctx=self.trace_tag,
+        ) as response:
+            t1 = time.time()  # 收到响应头即可，Date 不依赖响应体
+            date = response.headers.get("Date")
+            await response.read()
+        if not date:
+            return None
+        return t0, t1, parsedate_to_datetime(date).timestamp()
+
+    async def sync(self) -> bool:
+        """执行校时，成功返回 True；服务器不返回 Date 时保持 offset=0"""
+        lower, upper = float("-inf"), float("inf")
+        rtts: List[float] = []
+        for i in range(self.probes):
+            # 把第 i 次探测对齐到本地秒内 i/probes 的相位
+            now = time.time()
+            phase = i / self.probes
+            wait = (phase - (now % 1.0)) % 1.0
+            await sleep_until(now + wait)
+            try:
+                sample = await self._probe()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.warning(f"校时探测失败: {e}")
+                continue
+            if sample is None:
+                logging.warning("服务器响应缺少 Date 头，无法校时")
+                return False
+            t0, t1, server_sec = sample
+            mid = (t0 + t1) / 2
+            rtts.append(t1 - t0)
+            lower = max(lower, server_sec - mid)
+            upper = min(upper, server_sec + 1 - mid)
+
+        if not rtts:
+            return False
+        if lower > upper:
+            # RTT 抖动导致约束矛盾时，退化为取中点
+            lower, upper = upper, lower
+        self.offset = (lower + upper) / 2
+        self.uncertainty = (upper - lower) / 2
+        self.one_way = min(rtts) / 2
+        logging.info(
+            f"校时完成: 偏移 {self.offset * 1000:+.1f}ms "
+            f"(±{self.uncertainty * 1000:.1f}ms), "
+            f"单程延迟 {self.one_way * 1000:.1f}ms, 最小 RTT {min(rtts) * 1000:.1f}ms"
+        )
+        return True
+
+    async def sync_once(self, max_age: float) -> None:
+        """多个账号共用一个时钟时，max_age 秒内只校时一次，其余调用方等待结果"""
+        async with self._lock:
+            if self._synced_at is None or time.time() - self._synced_at > max_age:
+                await self.sync()
+                self._synced_at = time.time()
+
+    def send_time_for(self, server_target: float) -> float:
+        """为使请求在服务器时间 server_target 到达，返回本地应发送的时间"""
+        return server_target - self.offset - self.one_way
+
+
+# 课程表定向扫描：按字节在 GB2312 原文上匹配，不解码整页、不构建 DOM
+_ROW_START = b"<tr"
+_ROW_END = b"</tr"
+_CELL_RE = re.compile(rb"<td\b[^>]*>(.*?)</td\s*>", re.S)
+_LINK_RE = re.compile(rb"<a\b[^>]*?href\s*=\s*[\"']?([^\"'\s>]+)[^>]*>(.*?)</a\s*>", re.S)
+_TAG_RE = re.compile(rb"<[^>]*>")
+NAME_COL = 1    # 课程名所在列
+ACTION_COL = 12  # 选择/取消链接所在列
+
+
+class TableNotFound(Exception):
+    """课程列表页中没有课程表格"""
+    pass
+
+
+def _cell_text(raw: bytes) -> bytes:
+    return _TAG_RE.sub(b"", raw).replace(b"&nbsp;", b" ").strip()
+
+
+def find_course_row(
+    content: bytes, name: str, encoding: str = "gb2312"
+) -> Optional[Tuple[int, int, List[Tuple[int, int]]]]:
+    """
+    在课程列表页原始字节中定位课程名所在行，返回 (行起点, 行终点, 各单元格内容的字节区间)。
+    
+    只在课程名出现的位置附近截取该行做正则匹配，复杂度与页面大小近似线性且常数很小。
+    未找到返回 None；页面没有 <table> 时抛出 TableNotFound。
+    """
+    # 标签名大小写不敏感；bytes.lower() 只改 ASCII，GB2312 双字节均 >= 0xA1 不受影响
+    lower = content.lower()
+    if b"<table" not in lower:
+        raise TableNotFound("未找到课程表格")
+    needle = name.encode(encoding)
+    pos = lower.find(needle)
+    while pos != -1:
+        row_start = lower.rfind(_ROW_START, 0, pos)
+        row_end = lower.find(_ROW_END, pos)
+        if row_start != -1:
+            if row_end == -1:
+                row_end = len(lower)
+            cells = [m.span(1) for m in _CELL_RE.finditer(lower, row_start, row_end)]
+            if (
+                len(cells) > ACTION_COL
+                and _cell_text(content[slice(*cells[NAME_COL])]) == needle
+            ):
+                return row_start, row_end, cells
+        # 可能是别的单元格或跨字符的字节巧合，继续找下一处
+        pos = lower.find(needle, pos + 1)
+    return None
+
+
+def row_action(
+    content: bytes, cells: List[Tuple[int, int]], encoding: str = "gb2312"
+) -> Optional[Tuple[str, str]]:
+    """取 find_course_row 找到的行中第 ACTION_COL 列链接的 (文字, href)，没有链接返回 None"""
+    cell = content[slice(*cells[ACTION_COL])]
+    link = _LINK_RE.search(cell.lower())
+    if link is None:
+        return None
+    href = cell[slice(*link.span(1))].decode(encoding, "replace")
+    text = _cell_text(cell[slice(*link.span(2))]).decode(encoding, "replace")
+    return text, href
+
+
+def scan_course_row(
+    content: bytes, name: str, encoding: str = "gb2312"
+) -> Optional[Tuple[str, str]]:
+    """
+    定向扫描课程名所在行，返回第 ACTION_COL 列链接的 (文字, href)。
+    
+    未找到课程或该行没有链接返回 None；页面没有 <table> 时抛出 TableNotFound。
+    """
+    row = find_course_row(content, name, encoding)
+    if row is None:
+        return None
+    return row_action(content, row[2], encoding)
+
+
+def parse_course_row_bs4(text: str, name: str) -> Optional[Tuple[str, str]]:
+    """BeautifulSoup 兜底解析：定向扫描失败但页面里确有该课程名时使用"""
+    from bs4 import BeautifulSoup, Tag
+
+    soup = BeautifulSoup(text, "html.parser")
+    table = soup.find("table")
+    if not table:
+        raise TableNotFound("未找到课程表格")
+    for row in cast(Tag, table).find_all("tr")[1:]:  # 跳过表头
+        cols = cast(Tag, row).find_all("td")
+        if len(cols) <= ACTION_COL or cols[NAME_COL].text.strip() != name:
+            continue
+        course_link = cast(Tag, cols[ACTION_COL]).find("a")
+        if course_link and isinstance(course_link, Tag) and "href" in course_link.attrs:
+            return course_link.text.strip(), str(course_link["href"])
+    return None
+
+
+def parse_course_list(value: str) -> List[str]:
+    """解析逗号（中英文均可）分隔的列表，保留顺序"""
+    return [v.strip() for v in value.replace("，", ",").split(",") if v.strip()]
+
+
+def load_accounts(config_file: str) -> List[Dict[str, Any]]:
+    """
+    读取所有账号：[credentials] 视为一个账号，另可有多个 [account:名字] 段，
+    每段含 username、password，可选 courses（逗号分隔的志愿列表，覆盖 [course] name）。
+    section 记录账号来自哪一段。username 或 password 缺失、为空时抛出 ConfigError。
+    """
+    config = configparser.ConfigParser()
+    config.read(config_file, encoding="utf-8")
+    accounts = []
+    for section in config.sections():
+        if section == "credentials" or section.startswith("account:"):
+            sec = config[section]
+            name = section.split(":", 1)[1] if ":" in section else sec.get("username", "")
+            for field in ("username", "password"):
+                if not sec.get(field):
+                    raise ConfigError(f"配置文件 [{section}] 中缺少 {field}")
+            accounts.append(
+                {
+                    "name": name,
+                    "section": section,
+                    "username": sec.get("username"),
+                    "password": sec.get("password"),
+                    "courses": parse_course_list(sec.get("courses", "")),
+                }
+            )
+    return accounts
+
+
+class RowWatch:
+    """
+    余量监控中一门课程的轮询状态。
+
+    优先用 GET（查询参数与 _find_course 的表单相同）请求课程列表，服务器给出 ETag
+    （或 Last-Modified）时下次带上条件头，页面未变只收到没有响应体的 304；
+    收到完整页面时只对目标行的原始字节求哈希，与上次相同即视为无变化，不再解析链接。
+    GET 返回的页面里找不到该课程时改用 POST 查询。
+
+    选课未成功时保留行哈希：名额已满（服务器仍显示“选择”链接）时等该行真正变化再选；
+    其他失败（网络错误、无法识别的响应）按 pickup_failed 的退避间隔重试。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.use_get = True
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.row_hash: Optional[bytes] = None
+        self.found: Optional[Tuple[str, str]] = None  # 目标行最近一次的 (动作, href)
+        self.retry_at: Optional[float] = None  # 行未变化时再次选课的时刻
+        self.pickup_delay = 0.0
+
+    def conditional_headers(self) -> Dict[str, str]:
+        if self.etag:
+            return {"If-None-Match": self.etag}
+        if self.last_modified:
+            return {"If-Modified-Since": self.last_modified}
+        return {}
+
+    def reset(self) -> None:
+        """丢弃验证器与行哈希，下次轮询必定重新判断该行"""
+        self.etag = self.last_modified = None
+        self.row_hash = None
+
+    def update(self, content: bytes, row: Tuple[int, int, List[Tuple[int, int]]]) -> bool:
+        """记录目标行哈希，返回该行是否变化；变化时解析其操作链接"""
+        digest = hashlib.blake2b(content[row[0]:row[1]], digest_size=8).digest()
+        if digest == self.row_hash:
+            return False
+        self.row_hash = digest
+        self.found = row_action(content, row[2])
+        self.retry_at = None  # 行变化后按新内容判断
+        return True
+
+    def pickup_failed(self, outcome: Optional[str], min_delay: float, max_delay: float,
+                      backoff: float) -> None:
+        """
+        记录一次未成功的选课。"full" 时只等该行变化；其他失败在 min_delay 起、
+        每次乘以 backoff、最长 max_delay 的间隔后重试（行先变化则立即重试）。
+        """
+        if outcome == "full":
+            self.retry_at = None
+            return
+        self.pickup_delay = min(max_delay, self.pickup_delay * backoff or min_delay)
+        self.retry_at = time.time() + self.pickup_delay
+
+    def retry_due(self) -> bool:
+        return self.retry_at is not None and time.time() >= self.retry_at
+
+
+class SelectBurst:
+    """
+    多连接并发选课。
+
+    connections 个 worker 共用账号的会话（Cookie）与连接池，各自占用一条预热的
+    keep-alive 连接。触发时每个 worker 立即发出第一个请求，其余请求在 window 秒内
+    均匀排开，总数不超过 max_requests；任一响应判定为成功/已选即全部停止。
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        warm_url: str,
+        connections: int = DEFAULT_BURST_CONNECTIONS,
+        window: float = DEFAULT_BURST_WINDOW,
+        max_requests: int = DEFAULT_BURST_MAX_REQUESTS,
+        account: Optional[str] = None,
+    ):
+        self.session = session
+        self.warm_url = warm_url
+        self.account = account  # 时间线中的账号标注
+        self.connections = max(1, connections)
+        self.window = window
+        self.max_requests = max(1, max_requests)
+        self.timeout = aiohttp.ClientTimeout(total=SELECT_TIMEOUT)
+        self.url: Optional[str] = None
+        self._url: Optional[yarl.URL] = None  # 预先解析好的 URL，触发时不再解析
+        self._done = asyncio.Event()
+        self._next = 0
+        self._limit = self.max_requests
+        self.outcome: Optional[str] = None
+        self.sent = 0
+
+    async def warm(self) -> None:
+        """并行发 connections 个轻量请求，让连接池里保有同样多的活跃连接"""
+        async def touch() -> None:
+            try:
+                async with self.session.get(
+                    self.warm_url,
+                    headers=DEFAULT_HEADERS,
+                    timeout=self.timeout,
+                    trace_request_ctx={"kind": "warm", "account": self.account},
+                ) as response:
+                    await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.warning(f"预热连接失败: {e}")
+        await asyncio.gather(*(touch() for _ in range(self.connections)))
+
+    def arm(self, url: str) -> None:
+        """设置选课 URL"""
+        if url != self.url:
+            self.url = url
+            self._url = yarl.URL(url, encoded=True)
+
+    @property
+    def remaining(self) -> int:
+        """总上限内还能发出的请求数"""
+        return max(0, self.max_requests - self.sent)
+
+    async def _worker(self, k: int, t0: float, check, on_fail) -> None:
+        interval = self.window / self._limit
+        while not self._done.is_set():
+            if self._next >= self._limit:
+                return
+            n = self._next
+            self._next += 1
+            # 前 connections 个请求立即发出，之后按 interval 均匀排开
+            due = t0 + max(0, n - self.connections + 1) * interval
+            delay = due - time.perf_counter()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._done.wait(), delay)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                async with self.session.get(
+                    self._url,
+                    headers=DEFAULT_HEADERS,
+                    timeout=self.timeout,
+                    trace_request_ctx={
+                        "kind": "select", "account": self.account, "conn": k, "n": n
+                    },
+                ) as response:
+                    status, body = response.status, await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.warning(f"[连接 {k}] 第 {n + 1} 个选课请求失败: {e!r}")
+                on_fail()
+                continue
+            finally:
+                self.sent += 1
+            if self._done.is_set():
+                return  # 其他连接已有结果，在途的响应不再处理
+            outcome = check(status, body)
+            if outcome:
+                if self.outcome is None:
+                    self.outcome = outcome
+                self._done.set()
+                return
+            on_fail()
+
+    async def fire(
+        self,
+        check: Callable[[int, bytes], Optional[str]],
+        on_fail: Callable[[], None] = lambda: None,
+        budget: Optional[int] = None,
+    ) -> Optional[str]:
+        """
+        发起并发选课，直到有结果或本轮请求用尽。
+        check(status, body) 返回非空结果表示可以停止；on_fail() 在每次失败后回调。
+        budget 为本轮最多发出的请求数，多轮累计不超过 max_requests。
+        """
+        if not self.url:
+            raise ValueError("未设置选课 URL")
+        self._limit = min(self.remaining, budget or self.remaining)
+        if self._limit <= 0:
+            return None
+        self._done.clear()
+        self._next = 0
+        self.outcome = None
+        t0 = time.perf_counter()
+        await asyncio.gather(
+            *(self._worker(k, t0, check, on_fail) for k in range(self.connections))
+        )
+        logging.info(
+            f"并发选课结束: 共发出 {self.sent} 个请求, "
+            f"耗时 {(time.perf_counter() - t0) * 1000:.0f}ms, 结果 {self.outcome}"
+        )
+        return self.outcome
+
+
 class CourseSelector:
     """选课器主类"""
     
-    def __init__(self, config_file: str, dry_run: bool = False):
+    def __init__(
+        self,
+        config_file: str,
+        dry_run: bool = False,
+        account: Optional[Dict[str, Any]] = None,
+        monitor: bool = False,
+    ):
         """
-        初始化选课器
+        初始化选课器（只读取配置；会话、时钟与通知队列在事件循环内由 open() 建立）
         
         Args:
             config_file: 配置文件路径
             dry_run: 是否为测试模式（不实际选课）
+            account: 账号（见 load_accounts），None 表示使用 [credentials]
+            monitor: 抢课未成功时进入余量监控（也可由 [monitor] enable 开启）
         """
         self.config_file = config_file
         self.dry_run = dry_run
-        self.session: Optional[Session] = None
+        self.account = account
+        self.monitor = monitor
+        self.http: Optional[httpkit.HttpClient] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.clock: Optional[ServerClock] = None
+        self.notifier: Optional[Notifier] = None
+        self.timeline: Optional[Timeline] = None
+        self._owns_notifier = False
         self.config: Dict[str, Any] = {}
+        self.course_urls: Dict[str, str] = {}  # 预热阶段缓存的选课 URL（课程名 → URL）
+        self.current_course: Optional[str] = None
+        self.selected_course: Optional[str] = None  # 预热时发现已选中的志愿
+        self.burst: Optional[SelectBurst] = None
+        self.session_expired = False  # 课程列表页显示未登录时置位，由预热/保活重新登录
+        self._login_lock: Optional[asyncio.Lock] = None
+        self._keeper: Optional[asyncio.Task] = None
+        self.monitor_stats = {"polls": 0, "not_modified": 0, "bytes": 0}
         
         # 初始化日志
         self._setup_logging()
         
         # 加载配置
         self._load_config()
+
+    @property
+    def pool_size(self) -> int:
+        """本账号需要的连接数"""
+        return self.config["burst_connections"] + POOL_SIZE
+
+    def open(
+        self,
+        connector: Optional[aiohttp.BaseConnector] = None,
+        clock: Optional[ServerClock] = None,
+        notifier: Optional[Notifier] = None,
+        timeline: Optional[Timeline] = None,
+        metrics: Optional[httpkit.HttpMetrics] = None,
+    ) -> None:
+        """
+        在事件循环内建立会话
         
-        # 初始化会话
-        self.session = requests.Session()
+        Args:
+            connector: 多账号共用的连接池，None 表示独立连接池
+            clock: 多账号共用的服务器时钟，None 表示自行校时
+            notifier: 多账号共用的通知队列，None 表示独立队列
+            timeline: 请求时间线记录器，None 表示不记录
+            metrics: 请求计时统计，None 表示不统计
+        """
+        self.timeline = timeline
+        # keep-alive 连接池，触发时复用已建立的 TCP 连接；
+        # 每个账号独立的 Cookie jar（unsafe=True 允许 IP 地址的 Cookie，便于本地测试）。
+        # 选课服务器直连，不走环境变量里的代理，避免给定时请求多加一跳
+        self.http = httpkit.HttpClient(
+            connector=connector or httpkit.connector(limit_per_host=self.pool_size),
+            connector_owner=connector is None,
+            timeout=REQUEST_TIMEOUT,
+            retry=LOGIN_RETRY,
+            use_proxy=False,
+            metrics=metrics,
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            trace_configs=[timeline.trace_config()] if timeline else None,
+        )
+        self.session = self.http.session
+        self._login_lock = asyncio.Lock()
+        self.clock = clock or ServerClock(
+            self.session, self.config["login_url"], self.config["sync_probes"]
+        )
+        self._owns_notifier = notifier is None
+        if notifier is None:
+            notifier = Notifier(self.config["notice_url"] if self.config["notice_enable"] else None)
+            notifier.start()
+        self.notifier = notifier
+
+    async def close(self) -> None:
+        if self._keeper is not None:
+            self._keeper.cancel()
+        if self.http is not None:
+            await self.http.close()
+        if self.notifier is not None and self._owns_notifier:
+            await self.notifier.close()
     
     def _setup_logging(self) -> None:
         """配置日志"""
@@ -78,18 +886,21 @@ class CourseSelector:
         config = configparser.ConfigParser()
         config.read(self.config_file, encoding="utf-8")
         
-        # 验证并读取凭证配置
-        if "credentials" not in config:
+        # 验证并读取凭证配置（多账号时由 account 传入）
+        if self.account is not None:
+            cred = self.account
+        elif "credentials" not in config:
             raise ConfigError("配置文件中缺少 [credentials] 部分")
-        
-        cred = config["credentials"]
+        else:
+            cred = config["credentials"]
         required_creds = ["username", "password"]
         for field in required_creds:
-            if field not in cred:
+            if not cred.get(field):
                 raise ConfigError(f"配置文件中缺少 {field}")
         
         self.config["username"] = cred["username"]
         self.config["password"] = cred["password"]
+        self.config["account_name"] = (self.account or {}).get("name")
         
         # 验证并读取课程配置
         if "course" not in config:
@@ -101,7 +912,12 @@ class CourseSelector:
             if field not in course:
                 raise ConfigError(f"配置文件中缺少 {field}")
         
-        self.config["course_name"] = course["name"]
+        # name 可为逗号分隔的志愿列表，按优先级排列；账号可单独指定 courses
+        courses = (self.account or {}).get("courses") or parse_course_list(course["name"])
+        if not courses:
+            raise ConfigError("配置文件中课程 name 为空")
+        self.config["courses"] = courses
+        self.config["course_name"] = courses[0]
         self.config["course_type"] = course["type"]
         
         # 解析目标时间
@@ -115,6 +931,79 @@ class CourseSelector:
                 f"期望格式: 2025-03-01-15:00:00, "
                 f"错误: {e}"
             )
+
+        # 读取服务器配置（可选，如指向本地模拟服务器 qiangke_mock_server.py）
+        server = config["server"] if "server" in config else {}
+        base_url = server.get("base_url", BASE_URL).strip().strip('"').strip("'").rstrip("/")
+        self.config["base_url"] = base_url
+        self.config["login_url"] = f"{base_url}/{LOGIN_PATH}"
+        self.config["course_list_url"] = f"{base_url}/{COURSE_LIST_PATH}"
+
+        # 读取会话保持配置（可选）：Cookie 保存到磁盘，下次启动时直接复用
+        session = config["session"] if "session" in config else {}
+        try:
+            self.config["persist_session"] = str(session.get("persist", "True")).strip() == "True"
+            self.config["keepalive_interval"] = float(
+                session.get("keepalive_interval", DEFAULT_KEEPALIVE_INTERVAL)
+            )
+        except ValueError as e:
+            raise ConfigError(f"配置文件 [session] 部分格式错误: {e}")
+        cookie_dir = session.get("cookie_dir") or os.path.dirname(
+            os.path.abspath(self.config_file)
+        )
+        self.config["cookie_file"] = os.path.join(
+            cookie_dir, f".qiangke_{self.config['username']}.cookies"
+        )
+
+        # 读取定时配置（可选）
+        timing = config["timing"] if "timing" in config else {}
+        try:
+            self.config["sync_enable"] = str(timing.get("sync", "True")).strip() == "True"
+            self.config["sync_probes"] = int(timing.get("sync_probes", DEFAULT_SYNC_PROBES))
+            self.config["spin_ms"] = float(timing.get("spin_ms", DEFAULT_SPIN_MS))
+            self.config["lead_ms"] = float(timing.get("lead_ms", 0))
+        except ValueError as e:
+            raise ConfigError(f"配置文件 [timing] 部分格式错误: {e}")
+
+        # 读取并发选课配置（可选）
+        burst = config["burst"] if "burst" in config else {}
+        try:
+            self.config["burst_connections"] = int(
+                burst.get("connections", DEFAULT_BURST_CONNECTIONS)
+            )
+            self.config["burst_window"] = float(burst.get("window", DEFAULT_BURST_WINDOW))
+            self.config["burst_max_requests"] = int(
+                burst.get("max_requests", DEFAULT_BURST_MAX_REQUESTS)
+            )
+            self.config["full_keywords"] = (
+                parse_course_list(burst["full_keywords"])
+                if "full_keywords" in burst
+                else list(DEFAULT_FULL_KEYWORDS)
+            )
+        except ValueError as e:
+            raise ConfigError(f"配置文件 [burst] 部分格式错误: {e}")
+        
+        # 读取余量监控配置（可选）
+        monitor = config["monitor"] if "monitor" in config else {}
+        try:
+            self.config["monitor_enable"] = (
+                self.monitor or str(monitor.get("enable", "False")).strip() == "True"
+            )
+            self.config["monitor_min_interval"] = float(
+                monitor.get("min_interval", DEFAULT_MONITOR_MIN_INTERVAL)
+            )
+            self.config["monitor_max_interval"] = max(
+                self.config["monitor_min_interval"],
+                float(monitor.get("max_interval", DEFAULT_MONITOR_MAX_INTERVAL)),
+            )
+            self.config["monitor_backoff"] = max(
+                1.0, float(monitor.get("backoff", DEFAULT_MONITOR_BACKOFF))
+            )
+            self.config["monitor_duration"] = float(
+                monitor.get("duration", DEFAULT_MONITOR_DURATION)
+            )
+        except ValueError as e:
+            raise ConfigError(f"配置文件 [monitor] 部分格式错误: {e}")
         
         # 读取通知配置（可选）
         self.config["notice_enable"] = False
@@ -125,28 +1014,30 @@ class CourseSelector:
             if "enable" in notice_config and "url" in notice_config:
                 self.config["notice_enable"] = notice_config["enable"].strip() == "True"
                 if self.config["notice_enable"]:
-                    self.config["notice_url"] = notice_config["url"].strip()
+                    self.config["notice_url"] = notice_config["url"].strip().strip('"').strip("'")
             
             if not self.config["notice_enable"]:
                 logging.warning("未启用通知配置")
     
+    @property
+    def label(self) -> str:
+        """日志与时间线中的账号名"""
+        return self.config.get("account_name") or self.config["username"]
+
+    def _tag(self, kind: str) -> Dict[str, Any]:
+        """时间线标注：请求类型与账号"""
+        return {"kind": kind, "account": self.label}
+
     def _send_notification(self, message: str) -> None:
-        """发送通知"""
-        if not self.config["notice_enable"] or not self.config["notice_url"]:
+        """发送通知（入队后立即返回，由后台任务批量发送）"""
+        if self.config.get("account_name"):
+            message = f"[{self.config['account_name']}] {message}"
+        if self.notifier is None:
             logging.info(f"[通知] {message}")
             return
-        
-        try:
-            url = self.config["notice_url"].strip('"').strip("'")
-            response = requests.post(url, json={"msg": message}, timeout=5)
-            if response.status_code == 200:
-                logging.info(f"发送通知成功: {response.text}")
-            else:
-                logging.warning(f"发送通知失败，状态码: {response.status_code}")
-        except requests.RequestException as e:
-            logging.error(f"发送通知时出错: {e}")
+        self.notifier.send(message)
     
-    def login(self) -> bool:
+    async def login(self) -> bool:
         """
         登录系统
         
@@ -164,138 +1055,338 @@ class CourseSelector:
         }
         
         try:
-            response = self.session.post(LOGIN_URL, data=payload, headers=DEFAULT_HEADERS)
-            response.encoding = "gb2312"
+            # 登录不是定时请求，网络错误与 5xx 按 LOGIN_RETRY 自动重试
+            response = await self.http.request(
+                "POST",
+                self.config["login_url"],
+                data=urlencode(payload),
+                headers=DEFAULT_HEADERS,
+                trace_request_ctx=self._tag("login"),
+            )
+            status, text = response.status, _decode(response.body)
             
-            if response.status_code == 200 and "注销" in response.text:
-                logging.info(f"登录成功, Cookie: {dict(self.session.cookies)}")
+            if status == 200 and LOGGED_IN_MARKER in text:
+                cookies = {c.key: c.value for c in self.session.cookie_jar}
+                logging.info(f"登录成功, Cookie: {cookies}")
                 self._send_notification("登录成功")
+                self.session_expired = False
+                self._save_cookies()
                 return True
             else:
                 logging.error("登录失败，响应中未找到登录标识")
                 self._send_notification("登录失败")
                 return False
-        except requests.RequestException as e:
-            logging.error(f"登录请求失败: {e}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"登录请求失败: {e!r}")
             self._send_notification("登录失败")
             return False
     
-    def _get_course_url(self) -> Optional[str]:
+    def _load_cookies(self) -> bool:
+        """从磁盘读取上次保存的 Cookie，成功返回 True"""
+        path = self.config["cookie_file"]
+        if not self.config["persist_session"] or not os.path.exists(path):
+            return False
+        # 旧版 aiohttp 以 pickle 保存，只加载本人所有、他人不可读写的文件
+        st = os.stat(path)
+        if hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o077):
+            logging.warning(f"已保存的会话 {path} 不属于当前用户或权限过宽（应为 600），忽略")
+            return False
+        try:
+            self.session.cookie_jar.load(path)
+        except Exception as e:
+            logging.warning(f"读取已保存的会话失败: {e!r}")
+            return False
+        return len(self.session.cookie_jar) > 0
+
+    def _save_cookies(self) -> None:
+        """把当前 Cookie 保存到磁盘（仅本人可读）"""
+        if not self.config["persist_session"]:
+            return
+        path = self.config["cookie_file"]
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            # 先以 600 创建（或收紧已有文件），写入前就不会被他人读到
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600))
+            os.chmod(path, 0o600)
+            self.session.cookie_jar.save(path)
+        except OSError as e:
+            logging.warning(f"保存会话失败: {e}")
+
+    async def _session_valid(self) -> Optional[bool]:
         """
-        获取课程选课 URL
+        轻量请求课程列表页判断会话是否有效，同时让连接保持活跃。
         
         Returns:
-            选课 URL，如果未找到则返回 None
+            True 有效，False 已失效，None 网络错误无法判断
+        """
+        try:
+            async with self.session.get(
+                self.config["course_list_url"],
+                headers=DEFAULT_HEADERS,
+                trace_request_ctx=self._tag("keepalive"),
+            ) as response:
+                status, content = response.status, await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.warning(f"会话检查请求失败: {e!r}")
+            return None
+        return status == 200 and LOGGED_IN_MARKER in _decode(content)
+
+    async def _relogin(self) -> bool:
+        """会话失效时重新登录；并发调用只登录一次"""
+        async with self._login_lock:
+            if not self.session_expired:
+                return True
+            logging.warning("会话已失效，重新登录")
+            self.session.cookie_jar.clear()
+            return await self.login()
+
+    async def ensure_session(self) -> bool:
+        """优先复用磁盘上保存且仍有效的会话，否则登录"""
+        if self._load_cookies():
+            if await self._session_valid():
+                logging.info("复用已保存的会话")
+                self._send_notification("复用已保存的会话")
+                return True
+            logging.info("已保存的会话失效")
+            self.session.cookie_jar.clear()
+        return await self.login()
+
+    async def _keepalive(self) -> None:
+        """
+        后台保活：预热窗口开始前每隔 keepalive_interval 秒检查一次会话，
+        失效则立即重新登录。预热窗口内由课程列表轮询接手，这里退出，
+        不与触发时刻的请求争用连接。
+        """
+        interval = self.config["keepalive_interval"]
+        if interval <= 0:
+            return
+        stop_at = self._target_timestamp() - PREARM_WINDOW
+        while time.time() + interval < stop_at:
+            await asyncio.sleep(interval)
+            valid = await self._session_valid()
+            if valid is False:
+                self.session_expired = True
+                await self._relogin()
+
+    async def _find_course(
+        self, name: str, notify: bool = True
+    ) -> Optional[Tuple[str, str]]:
+        """
+        查询课程并返回其操作链接
+        
+        Args:
+            name: 课程名
+            notify: 是否发送通知（预热轮询时关闭，避免刷屏）
+        
+        Returns:
+            (动作, URL)：动作为 "选择" 或 "取消"（已选）；未找到则返回 None
         """
         if not self.session:
             return None
         
         payload = {
-            "select": self.config["course_type"].encode("gb2312"),
-            "key": self.config["course_name"].encode("gb2312"),
-            "Submit": " 查询 ".encode("gb2312"),
+            "select": self.config["course_type"],
+            "key": name,
+            "Submit": " 查询 ",
         }
         
         try:
-            response = self.session.post(COURSE_LIST_URL, data=payload, headers=DEFAULT_HEADERS)
-            if response.status_code != 200:
+            async with self.session.post(
+                self.config["course_list_url"],
+                data=urlencode(payload, encoding="gb2312"),
+                headers=DEFAULT_HEADERS,
+                trace_request_ctx=self._tag("list"),
+            ) as response:
+                status, content = response.status, await response.read()
+            if status != 200:
                 logging.error("获取课程列表失败")
-                self._send_notification("获取课程列表失败")
+                if notify:
+                    self._send_notification("获取课程列表失败")
                 return None
             
-            response.encoding = "gb2312"
-            text = response.text.encode("utf-8").decode("utf-8")
-            soup = BeautifulSoup(text, "html.parser")
-            table = soup.find("table")
-            
-            if not table:
+            try:
+                found = scan_course_row(content, name)
+                if found is None and name.encode("gb2312") in content:
+                    # 标记不规范时退回完整解析
+                    found = parse_course_row_bs4(_decode(content), name)
+            except TableNotFound:
+                if LOGGED_IN_MARKER not in _decode(content):
+                    logging.warning("课程列表页显示未登录")
+                    self.session_expired = True
+                    return None
                 logging.error("未找到课程表格")
-                self._send_notification("未找到课程表格")
+                if notify:
+                    self._send_notification("未找到课程表格")
                 return None
             
-            # 解析表格
-            table_tag = cast(Tag, table)
-            rows = table_tag.find_all("tr")[1:]  # 跳过表头
-            
-            for row in rows:
-                try:
-                    row_tag = cast(Tag, row)
-                    cols = row_tag.find_all("td")
-                    
-                    if len(cols) <= 12:
-                        continue
-                    
-                    course_name = cols[1].text.strip()
-                    logging.info(f"发现课程: {course_name}")
-                    
-                    if course_name == self.config["course_name"]:
-                        action_col = cast(Tag, cols[12])
-                        course_link = action_col.find("a")
-                        
-                        if course_link and isinstance(course_link, Tag) and "href" in course_link.attrs:
-                            action = course_link.text.strip()
-                            
-                            if action == "取消":
-                                logging.info(f"课程 {self.config['course_name']} 已选")
-                                self._send_notification(f"课程 {self.config['course_name']} 已选")
-                                exit()
-                            elif action == "选择":
-                                full_url = f"{BASE_URL}/{course_link['href']}"
-                                logging.info(f"找到选课 URL: {full_url}")
-                                self._send_notification(f"找到课程 {self.config['course_name']}")
-                                return full_url
-                except Exception as e:
-                    logging.warning(f"处理课程行时出错: {e}")
-                    continue
+            if found:
+                action, href = found
+                full_url = f"{self.config['base_url']}/{href}"
+                if action == "取消":
+                    logging.info(f"课程 {name} 已选")
+                    if notify:
+                        self._send_notification(f"课程 {name} 已选")
+                    return action, full_url
+                elif action == "选择":
+                    logging.info(f"找到选课 URL: {full_url}")
+                    if notify:
+                        self._send_notification(f"找到课程 {name}")
+                    return action, full_url
             
-            logging.error(f"未找到课程 {self.config['course_name']}")
-            self._send_notification(f"未找到课程 {self.config['course_name']}")
+            logging.error(f"未找到课程 {name}")
+            if notify:
+                self._send_notification(f"未找到课程 {name}")
             return None
             
         except Exception as e:
-            logging.error(f"获取课程 URL 时出错: {e}")
-            self._send_notification(f"获取课程 URL 失败: {e}")
+            logging.error(f"获取课程 URL 时出错: {e!r}")
+            if notify:
+                self._send_notification(f"获取课程 URL 失败: {e}")
             return None
     
-    def _select_course(self, course_url: str) -> bool:
+    async def _get_course_url(self, notify: bool = True) -> Optional[str]:
+        """获取当前志愿课程的选课 URL（已选或未找到时返回 None）"""
+        found = await self._find_course(self.current_course or self.config["course_name"], notify)
+        if found and found[0] == "选择":
+            return found[1]
+        return None
+    
+    def _select_outcome(self, status: int, content: bytes) -> Optional[str]:
         """
-        执行选课操作
+        判断选课响应
         
-        Args:
-            course_url: 选课 URL
-            
         Returns:
-            是否选课成功
+            "success" 选课成功，"selected" 课程已选（响应含“取消”），
+            "full" 名额已满（应转向下一志愿），None 表示失败
         """
-        if not self.session:
-            return False
-        
-        try:
-            response = self.session.get(course_url, headers=DEFAULT_HEADERS)
-            response.encoding = "gb2312"
-            
-            if response.status_code == 200:
-                if "选择课程成功" in response.text:
-                    timestamp = time.strftime('%H:%M:%S')
-                    message = f"抢课成功！{self.config['course_name']} @ {timestamp}"
-                    logging.info(message)
-                    self._send_notification(message)
-                    return True
-                else:
-                    timestamp = time.strftime('%H:%M:%S')
-                    logging.warning(f"抢课失败，响应: {response.text[:100]} @ {timestamp}")
-                    return False
-            else:
-                timestamp = time.strftime('%H:%M:%S')
-                logging.warning(f"抢课失败，状态码: {response.status_code} @ {timestamp}")
-                return False
-                
-        except requests.RequestException as e:
-            timestamp = time.strftime('%H:%M:%S')
-            logging.error(f"选课请求失败: {e} @ {timestamp}")
-            return False
+        course_name = self.current_course or self.config["course_name"]
+        timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+        if status != 200:
+            logging.warning(f"抢课失败，状态码: {status} @ {timestamp}")
+            return None
+        text = _decode(content)
+        if "选择课程成功" in text:
+            message = f"抢课成功！{course_name} @ {timestamp}"
+            logging.info(message)
+            self._send_notification(message)
+            return "success"
+        if "取消" in text:
+            message = f"课程 {course_name} 已选 @ {timestamp}"
+            logging.info(message)
+            self._send_notification(message)
+            return "selected"
+        if any(k in text for k in self.config["full_keywords"]):
+            logging.warning(f"课程 {course_name} 名额已满 @ {timestamp}")
+            return "full"
+        logging.warning(f"抢课失败，响应: {text[:100]} @ {timestamp}")
+        return None
     
-    def _wait_and_select(self) -> bool:
+    def _new_burst(self) -> SelectBurst:
+        return SelectBurst(
+            self.session,
+            self.config["course_list_url"],
+            self.config["burst_connections"],
+            self.config["burst_window"],
+            self.config["burst_max_requests"],
+            account=self.label,
+        )
+
+    async def _prearm(self) -> None:
+        """
+        预热：并行轮询所有志愿的课程列表，缓存各课程的选课链接；
+        轮询本身也让连接池里的连接保持活跃，触发时不必重新握手。
+        """
+        if self.session_expired and not await self._relogin():
+            return
+        courses = self.config["courses"]
+        results = await asyncio.gather(
+            *(self._find_course(name, notify=False) for name in courses),
+            return_exceptions=True,
+        )
+        for name, found in zip(courses, results):
+            if isinstance(found, BaseException):
+                logging.warning(f"预热轮询失败: {found!r}")
+                continue
+            if not found:
+                continue
+            action, url = found
+            if action == "取消":
+                # 已选中更高（或同等）志愿，无需再抢后面的课程
+                self.selected_course = name
+                break
+            if self.course_urls.get(name) != url:
+                logging.info(f"预热: 已缓存 {name} 选课 URL {url}")
+                self._send_notification(f"找到课程 {name}，已预热")
+            self.course_urls[name] = url
+        first = next((n for n in courses if n in self.course_urls), None)
+        if self.burst is None:
+            self.burst = self._new_burst()
+        await self.burst.warm()
+        if first:
+            self.burst.arm(self.course_urls[first])
+
+    def _target_timestamp(self) -> float:
+        """目标时间（当天的 target_time）对应的时间戳，按服务器时钟解释"""
+        target = datetime.combine(datetime.now().date(), self.config["target_time"])
+        return target.timestamp()
+
+    async def _wait_for_trigger(self) -> None:
+        """
+        校时后精确等待：让第一个请求在服务器时钟的目标时刻到达，
+        而不是在本地时钟的目标时刻才发出。
+        """
+        server_target = self._target_timestamp()
+        clock = self.clock
+        spin = self.config["spin_ms"] / 1000
+
+        if self.config["sync_enable"]:
+            # 等待时间较长时，在目标前 DEFAULT_RESYNC_BEFORE 秒再校时，减少漂移
+            sync_cost = self.config["sync_probes"] + 2
+            resync_at = server_target - DEFAULT_RESYNC_BEFORE
+            if resync_at - time.time() > sync_cost:
+                logging.info(f"将于目标前 {DEFAULT_RESYNC_BEFORE} 秒校时")
+                await sleep_until(resync_at, spin)
+            if server_target - time.time() > sync_cost:
+                await clock.sync_once(max_age=DEFAULT_RESYNC_BEFORE)
+                if self.timeline:
+                    self.timeline.mark(
+                        "clock-sync",
+                        account=self.label,
+                        offset_ms=clock.offset * 1000,
+                        uncertainty_ms=(clock.uncertainty or 0) * 1000,
+                        one_way_ms=clock.one_way * 1000,
+                    )
+            else:
+                logging.warning("距离目标时间过近，跳过校时")
+
+        send_at = clock.send_time_for(server_target) - self.config["lead_ms"] / 1000
+
+        # 预热窗口内定期轮询，最后一次轮询在触发前 PREARM_FINAL 秒
+        prearm_from = send_at - PREARM_WINDOW
+        if prearm_from > time.time():
+            await sleep_until(prearm_from, spin)
+        while send_at - time.time() > PREARM_FINAL:
+            await self._prearm()
+            next_poll = min(time.time() + PREARM_INTERVAL, send_at - PREARM_FINAL)
+            if next_poll > time.time():
+                await sleep_until(next_poll, spin)
+
+        if send_at > time.time():
+            await sleep_until(send_at, spin)
+        if self.timeline:
+            self.timeline.mark(
+                "trigger",
+                account=self.label,
+                local=time.time(),
+                server_estimate=time.time() + clock.offset,
+                server_target=server_target,
+            )
+        logging.info(
+            f"触发: 本地 {datetime.now().strftime('%H:%M:%S.%f')[:-3]}, "
+            f"预计服务器 {datetime.fromtimestamp(time.time() + clock.offset).strftime('%H:%M:%S.%f')[:-3]}"
+        )
+
+    async def _wait_and_select(self) -> bool:
         """
         等待目标时间并执行选课
         
@@ -305,73 +1396,326 @@ class CourseSelector:
         target_time = self.config["target_time"]
         logging.info(f"等待到 {target_time} 触发抢课...")
         self._send_notification(f"等待到 {target_time} 触发抢课...")
+
+        await self._wait_for_trigger()
+
+        if self.selected_course:
+            logging.info(f"课程 {self.selected_course} 已选，无需抢课")
+            self._send_notification(f"课程 {self.selected_course} 已选")
+            return True
+
+        if self.burst is None:
+            self.burst = self._new_burst()
+        # 按志愿顺序尝试，所有志愿共享同一个请求总上限
+        courses = self.config["courses"]
+        for i, name in enumerate(courses):
+            later = len(courses) - 1 - i
+            # 为后面的志愿至少保留每条连接一个请求
+            budget = self.burst.remaining - later * self.burst.connections
+            outcome = await self._select_one(name, max(budget, self.burst.connections))
+            if outcome in ("success", "selected", "dry-run"):
+                return True
+            if self.burst.remaining <= 0:
+                break
+            if i + 1 < len(courses):
+                logging.info(f"志愿 {name} 未选上，转向下一志愿 {courses[i + 1]}")
+
+        self._send_notification("所有志愿均未选上，抢课失败")
+        logging.error("所有志愿均未选上，抢课失败")
+        return False
+    
+    async def _select_one(self, name: str, budget: int) -> Optional[str]:
+        """
+        抢一个志愿：预热阶段已缓存链接时直接选课，否则在触发后获取课程 URL（带重试）
         
-        while True:
-            now = datetime.now().time()
-            
-            if now >= target_time:
-                # 获取课程 URL（带重试）
-                course_url = None
-                for attempt in range(1, MAX_URL_RETRIES + 1):
-                    try:
-                        logging.info(f"尝试获取课程 URL ({attempt}/{MAX_URL_RETRIES})")
-                        course_url = self._get_course_url()
-                        if course_url:
-                            break
-                    except Exception as e:
-                        logging.warning(f"第 {attempt} 次获取课程 URL 失败: {e}")
-                    
-                    if attempt < MAX_URL_RETRIES:
-                        retry_wait = 0.5 * attempt
-                        logging.info(f"等待 {retry_wait} 秒后重试...")
-                        time.sleep(retry_wait)
-                
-                if not course_url:
-                    self._send_notification("获取课程 URL 失败，抢课终止")
-                    logging.error("获取课程 URL 失败，抢课终止")
-                    return False
-                
-                # 执行选课（带重试）
-                if self.dry_run:
-                    self._send_notification("Dry run 模式，跳过实际选课")
-                    logging.info("Dry run 模式，跳过实际选课")
-                    return True
-                
-                for attempt in range(1, MAX_SELECT_RETRIES + 1):
-                    try:
-                        logging.info(f"尝试选课 ({attempt}/{MAX_SELECT_RETRIES})")
-                        if self._select_course(course_url):
-                            return True
-                    except Exception as e:
-                        logging.warning(f"第 {attempt} 次选课出错: {e}")
-                    
-                    if attempt < MAX_SELECT_RETRIES:
-                        retry_wait = 0.3 * attempt
-                        logging.info(f"等待 {retry_wait} 秒后重试...")
-                        time.sleep(retry_wait)
-                
-                self._send_notification("选课达到最大重试次数，抢课失败")
-                logging.error("选课达到最大重试次数，抢课失败")
-                return False
+        Returns:
+            _select_outcome 的结果，"missing" 表示获取 URL 失败，"dry-run" 表示测试模式
+        """
+        self.current_course = name
+        course_url = self.course_urls.get(name)
+        if course_url and self.dry_run:
+            logging.info(f"已缓存选课 URL: {course_url}")
+        for attempt in range(1, MAX_URL_RETRIES + 1):
+            if course_url:
+                break
+            try:
+                logging.info(f"尝试获取 {name} 课程 URL ({attempt}/{MAX_URL_RETRIES})")
+                found = await self._find_course(name)
+                if found and found[0] == "取消":
+                    return "selected"
+                if found:
+                    course_url = found[1]
+                    break
+            except Exception as e:
+                logging.warning(f"第 {attempt} 次获取课程 URL 失败: {e!r}")
             
-            time.sleep(0.1)  # 每 0.1 秒检查一次
+            if self.session_expired:
+                await self._relogin()
+            if attempt < MAX_URL_RETRIES:
+                retry_wait = URL_RETRY.delay_for(attempt)
+                logging.info(f"等待 {retry_wait} 秒后重试...")
+                await asyncio.sleep(retry_wait)
+        
+        if not course_url:
+            self._send_notification(f"获取课程 {name} URL 失败")
+            logging.error(f"获取课程 {name} URL 失败")
+            return "missing"
+        
+        # 执行选课
+        if self.dry_run:
+            self._send_notification(f"Dry run 模式，跳过实际选课: {name}")
+            logging.info(f"Dry run 模式，跳过实际选课: {name}")
+            return "dry-run"
+        
+        self.burst.arm(course_url)
+
+        # 缓存链接失败时才在后台并行重新获取课程列表，不阻塞并发请求
+        refresh: Optional[asyncio.Task] = None
+
+        def on_fail() -> None:
+            nonlocal refresh
+            if refresh is None:
+                refresh = asyncio.create_task(self._get_course_url(False))
+            elif refresh.done():
+                new_url = refresh.exception() is None and refresh.result()
+                if new_url and new_url != self.burst.url:
+                    logging.info(f"课程列表已更新，改用新 URL: {new_url}")
+                    self.burst.arm(new_url)
+                refresh = None
+
+        try:
+            return await self.burst.fire(self._select_outcome, on_fail, budget)
+        finally:
+            if refresh is not None and not refresh.done():
+                refresh.cancel()
     
-    def run(self) -> bool:
+    async def _poll_row(self, watch: RowWatch) -> Optional[bool]:
+        """
+        余量监控轮询一次课程列表
+        
+        Returns:
+            目标行是否变化；网络错误、会话失效或找不到课程时返回 None
+        """
+        payload = {
+            "select": self.config["course_type"],
+            "key": watch.name,
+            "Submit": " 查询 ",
+        }
+        form = urlencode(payload, encoding="gb2312")
+        url = self.config["course_list_url"]
+        try:
+            if watch.use_get:
+                request = self.session.get(
+                    yarl.URL(f"{url}?{form}", encoded=True),
+                    headers={**DEFAULT_HEADERS, **watch.conditional_headers()},
+                    trace_request_ctx=self._tag("monitor"),
+                )
+            else:
+                request = self.session.post(
+                    url, data=form, headers=DEFAULT_HEADERS,
+                    trace_request_ctx=self._tag("monitor"),
+                )
+            async with request as response:
+                status, content = response.status, await response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.warning(f"监控轮询失败: {e!r}")
+            return None
+        self.monitor_stats["polls"] += 1
+        self.monitor_stats["bytes"] += len(content)
+        if status == 304:
+            self.monitor_stats["not_modified"] += 1
+            return False
+        if status != 200:
+            logging.warning(f"监控轮询失败，状态码: {status}")
+            return None
+        
+        try:
+            row = find_course_row(content, watch.name)
+        except TableNotFound:
+            if LOGGED_IN_MARKER not in _decode(content):
+                logging.warning("课程列表页显示未登录")
+                self.session_expired = True
+                return None
+            row = None
+        if row is None:
+            if watch.use_get:
+                logging.info(f"GET 查询未返回课程 {watch.name}，改用 POST 查询")
+                watch.use_get = False
+                watch.reset()
+                return await self._poll_row(watch)
+            logging.warning(f"监控: 未找到课程 {watch.name}")
+            return None
+        if watch.use_get:
+            watch.etag, watch.last_modified = etag, last_modified
+        return watch.update(content, row)
+
+    async def _pickup(self, name: str, url: str) -> Optional[str]:
+        """监控中出现空位：按一轮 connections 个请求的预算立即并发选课"""
+        self.current_course = name
+        logging.info(f"课程 {name} 出现空位，立即选课: {url}")
+        if self.dry_run:
+            self._send_notification(f"Dry run 模式，跳过实际选课: {name}")
+            return "dry-run"
+        burst = self._new_burst()
+        burst.arm(url)
+        return await burst.fire(self._select_outcome, budget=burst.connections)
+
+    async def _monitor(self) -> bool:
+        """
+        余量监控：抢课时段结束后按志愿顺序轮询各课程行，出现“选择”链接即选课，
+        直到选上、发现已选或超过 monitor_duration。
+        
+        课程行有变化（如已选人数变动）时间隔回到 monitor_min_interval，
+        每轮无变化乘以 monitor_backoff，最长 monitor_max_interval。
+        选课未成功不算变化，何时再选见 RowWatch.pickup_failed。
+        """
+        cfg = self.config
+        watches = [RowWatch(name) for name in cfg["courses"]]
+        interval = cfg["monitor_min_interval"]
+        duration = cfg["monitor_duration"]
+        deadline = time.time() + duration if duration > 0 else float("inf")
+        logging.info(f"进入余量监控: {', '.join(cfg['courses'])}")
+        self._send_notification("抢课未成功，进入余量监控")
+        try:
+            while time.time() < deadline:
+                if self.session_expired:
+                    await self._relogin()
+                results = await asyncio.gather(*(self._poll_row(w) for w in watches))
+                changed = False
+                for watch, result in zip(watches, results):
+                    if result is None or not (result or watch.retry_due()):
+                        continue
+                    changed = changed or result
+                    if watch.found is None:
+                        continue  # 如已满时该列只有文字、没有链接
+                    action, href = watch.found
+                    if action == "取消":
+                        logging.info(f"课程 {watch.name} 已选，结束监控")
+                        self._send_notification(f"课程 {watch.name} 已选")
+                        return True
+                    if action != "选择":
+                        continue
+                    outcome = await self._pickup(watch.name, f"{cfg['base_url']}/{href}")
+                    if outcome in ("success", "selected", "dry-run"):
+                        return True
+                    # 没抢到：保留行哈希，不因此缩短轮询间隔；本轮继续看后面的志愿
+                    watch.pickup_failed(
+                        outcome, cfg["monitor_min_interval"], cfg["monitor_max_interval"],
+                        cfg["monitor_backoff"],
+                    )
+                if changed:
+                    interval = cfg["monitor_min_interval"]
+                else:
+                    interval = min(interval * cfg["monitor_backoff"], cfg["monitor_max_interval"])
+                delay = interval * random.uniform(1 - MONITOR_JITTER, 1 + MONITOR_JITTER)
+                await asyncio.sleep(min(delay, max(0.0, deadline - time.time())))
+            logging.error("余量监控超时，未选上课程")
+            self._send_notification("余量监控超时，未选上课程")
+            return False
+        finally:
+            st = self.monitor_stats
+            logging.info(
+                f"余量监控结束: 轮询 {st['polls']} 次，其中 304 {st['not_modified']} 次，"
+                f"共接收 {st['bytes']} 字节"
+            )
+
+    async def run(self) -> bool:
         """
-        运行选课流程
+        运行选课流程（需先调用 open()）
         
         Returns:
             是否成功完成选课
         """
-        # 登录
-        if not self.login():
+        # 登录（或复用已保存的会话），并在后台保活直到预热开始
+        if not await self.ensure_session():
             return False
+        self._keeper = asyncio.create_task(self._keepalive())
         
         # 等待并选课
-        return self._wait_and_select()
+        try:
+            if await self._wait_and_select():
+                return True
+        finally:
+            self._keeper.cancel()
+        
+        # 没选上时继续监控退课空位
+        if self.config["monitor_enable"]:
+            return await self._monitor()
+        return False
+
+
+async def run_all_async(
+    config_file: str,
+    dry_run: bool = False,
+    trace: Optional[str] = None,
+    monitor: bool = False,
+) -> bool:
+    """
+    多账号编排：所有账号在同一个事件循环上运行，共用一个连接池、
+    一个服务器时钟和一个通知队列，各自登录、预热后在同一触发时刻同时抢课。
+    trace 不为空时记录所有请求的时间线，结束时写入该文件。
+    monitor 为 True 时没选上的账号各自进入余量监控。
+    全部成功返回 True。
+    """
+    accounts = load_accounts(config_file)
+    if len(accounts) <= 1:
+        # 唯一的账号来自 [account:名字] 时仍要传入，否则会去找 [credentials] 并丢掉它的 courses
+        account = accounts[0] if accounts and accounts[0]["section"] != "credentials" else None
+        selectors = [CourseSelector(config_file, dry_run, account=account, monitor=monitor)]
+    else:
+        selectors = [
+            CourseSelector(config_file, dry_run, account=acc, monitor=monitor)
+            for acc in accounts
+        ]
+        logging.info(f"多账号模式: {len(selectors)} 个账号")
+
+    first = selectors[0]
+    # 连接池容量为所有账号的并发连接数之和
+    connector = httpkit.connector(
+        limit=0, limit_per_host=sum(sel.pool_size for sel in selectors)
+    )
+    metrics = httpkit.HttpMetrics()
+    notifier = Notifier(first.config["notice_url"] if first.config["notice_enable"] else None)
+    notifier.start()
+    timeline = Timeline() if trace else None
+    try:
+        first.open(connector, notifier=notifier, timeline=timeline, metrics=metrics)
+        for sel in selectors[1:]:
+            sel.open(
+                connector, clock=first.clock, notifier=notifier,
+                timeline=timeline, metrics=metrics,
+            )
+        if timeline:
+            timeline.clock = first.clock
+        results = await asyncio.gather(*(sel.run() for sel in selectors))
+    finally:
+        for sel in selectors:
+            await sel.close()
+        await connector.close()
+        await notifier.close()
+        if timeline:
+            timeline.write(trace)
+        if metrics.requests:
+            logging.info(f"HTTP 统计: {metrics.summary()}")
+    if len(selectors) > 1:
+        for acc, ok in zip(accounts, results):
+            logging.info(f"账号 {acc['name']}: {'成功' if ok else '失败'}")
+    return all(results)
 
 
-def parse_arguments() -> Tuple[str, bool]:
+def run_all(
+    config_file: str,
+    dry_run: bool = False,
+    trace: Optional[str] = None,
+    monitor: bool = False,
+) -> bool:
+    """同步入口，见 run_all_async"""
+    return asyncio.run(run_all_async(config_file, dry_run, trace, monitor))
+
+
+def parse_arguments() -> Tuple[str, bool, Optional[str], bool]:
     """解析命令行参数"""
     parser = argparse.ArgumentParser(
         description="双流中学抢课脚本 - 自动登录并精确定时抢课"
@@ -387,21 +1731,28 @@ def parse_arguments() -> Tuple[str, bool]:
         action="store_true",
         help="测试模式，跳过实际选课"
     )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="记录每个请求的时间线（DNS/建连/首字节/完整响应），结束时写入 Chrome trace JSON"
+    )
+    parser.add_argument(
+        "-m", "--monitor",
+        action="store_true",
+        help="抢课未成功时继续监控课程余量，出现空位立即选课（参数见 [monitor]）"
+    )
     
     args = parser.parse_args()
-    return args.config, args.dry_run
+    return args.config, args.dry_run, args.trace, args.monitor
 
 
 def main() -> None:
     """主函数"""
     try:
-        config_file, dry_run = parse_arguments()
-        
-        # 创建选课器实例
-        selector = CourseSelector(config_file, dry_run)
+        config_file, dry_run, trace, monitor = parse_arguments()
         
-        # 运行选课流程
-        success = selector.run()
+        # 运行选课流程（配置了多个账号时并行抢课）
+        success = run_all(config_file, dry_run, trace, monitor)
         
         if not success:
             exit(1)
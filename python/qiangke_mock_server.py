@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+qiangke_mock_server.py — 本地模拟选课服务器
+
+模拟 xuanke.shuangzhong.com 的 GB2312 登录页、s_course.php 课程表与选课接口，
+可配置网络延迟、抖动、服务器时钟偏差、课程容量与“T 时刻开放”行为，
+用于在真实选课窗口之外测试 qiangke.py 的定时与并发逻辑。
+
+课程已满时操作列只显示“已满”、没有选择链接；cancel.php 退课后重新出现。
+加 --full-link 时已满的课程仍显示选择链接，选课才返回“选课人数已满”（部分教务系统如此）。
+GET s_course.php 接受与查询表单相同的参数（select、key），响应带 ETag，
+请求带匹配的 If-None-Match 时返回 304，用于测试余量监控的条件请求。
+
+用法:
+    python qiangke_mock_server.py --port 8700 --open-in 30
+    python qiangke_mock_server.py --open-at 15:00:00 --latency 40 --jitter 15 --skew 1.5
+    python qiangke_mock_server.py --courses 音乐社:2,美术社:30 --users 4
+    python qiangke_mock_server.py --session-ttl 60   # 会话 60 秒后过期，测试重新登录
+    python qiangke_mock_server.py --full-link        # 已满仍显示选择链接
+
+配置 qiangke.py 使用模拟服务器：
+    [server]
+    base_url = http://127.0.0.1:8700/elective/student
+
+统计接口：
+    GET /stats   首个选课请求相对开放时刻的到达偏差、各课程余量等（JSON）
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PREFIX = "/elective/student"
+COLUMNS = 13  # 课程表列数，第 2 列为课程名，第 13 列为操作链接
+
+
+class MockState:
+    """服务器状态：账号、会话、课程容量与请求记录"""
+
+    def __init__(self, args):
+        self.latency = args.latency / 1000
+        self.jitter = args.jitter / 1000
+        self.skew = args.skew
+        self.open_at = args.open_at_ts
+        self.course_type = args.course_type
+        self.full_link = args.full_link
+        self.courses = {}  # id → {"name", "capacity", "taken": set()}
+        for i, (name, capacity) in enumerate(args.course_specs, start=1):
+            self.courses[str(i)] = {"name": name, "capacity": capacity, "taken": set()}
+        self.users = {
+            f"user{i}": f"pass{i}" for i in range(1, args.users + 1)
+        }
+        self.session_ttl = args.session_ttl
+        self.sessions = {}  # cookie → (username, 创建时间)
+        self.lock = threading.Lock()
+        self.select_log = []  # [(到达时间, 用户, 课程 id, 结果)]
+        self.cancel_log = []  # [(服务器时间, 用户, 课程 id)]
+        self.counts = {
+            "login": 0, "list": 0, "select": 0, "cancel": 0, "other": 0,
+            "not_modified": 0, "list_bytes": 0,
+        }
+
+    def now(self) -> float:
+        """服务器时钟（含偏差）"""
+        return time.time() + self.skew
+
+    def session_user(self, sid: str):
+        entry = self.sessions.get(sid)
+        if entry is None:
+            return None
+        user, created = entry
+        if self.session_ttl and time.time() - created > self.session_ttl:
+            del self.sessions[sid]
+            return None
+        return user
+
+    def is_open(self) -> bool:
+        return self.now() >= self.open_at
+
+    def delay(self) -> None:
+        """模拟单程网络延迟 + 抖动（请求方向与响应方向各一半）"""
+        d = self.latency + random.uniform(-self.jitter, self.jitter)
+        if d > 0:
+            time.sleep(d / 2)
+
+    def select(self, user: str, course_id: str) -> str:
+        arrival = self.now()
+        with self.lock:
+            course = self.courses.get(course_id)
+            if course is None:
+                result = "missing"
+            elif user in course["taken"]:
+                result = "already"
+            elif not self.is_open():
+                result = "closed"
+            elif len(course["taken"]) >= course["capacity"]:
+                result = "full"
+            else:
+                course["taken"].add(user)
+                result = "ok"
+            self.select_log.append((arrival, user, course_id, result))
+        return result
+
+    def cancel(self, user: str, course_id: str) -> bool:
+        with self.lock:
+            course = self.courses.get(course_id)
+            if course is None or user not in course["taken"]:
+                return False
+            course["taken"].discard(user)
+            self.cancel_log.append((self.now(), user, course_id))
+        return True
+
+    def stats(self) -> dict:
+        with self.lock:
+            log = list(self.select_log)
+            courses = {
+                cid: {"name": c["name"], "capacity": c["capacity"], "taken": sorted(c["taken"])}
+                for cid, c in self.courses.items()
+            }
+        after_open = [a for a, *_ in log if a >= self.open_at]
+        first_by_user = {}
+        for arrival, user, _, _ in log:
+            if arrival >= self.open_at and user not in first_by_user:
+                first_by_user[user] = round((arrival - self.open_at) * 1000, 3)
+        return {
+            "open_at": self.open_at,
+            "server_now": self.now(),
+            "counts": dict(self.counts),
+            "selects": len(log),
+            "early_selects": len(log) - len(after_open),
+            "first_after_open_ms": (
+                round((min(after_open) - self.open_at) * 1000, 3) if after_open else None
+            ),
+            "first_after_open_ms_by_user": first_by_user,
+            "cancels": [
+                {"at": at, "user": user, "course": cid} for at, user, cid in self.cancel_log
+            ],
+            "ok_at_by_user": {
+                user: arrival for arrival, user, _, res in log if res == "ok"
+            },
+            "results": {
+                r: sum(1 for *_, res in log if res == r)
+                for r in ("ok", "already", "closed", "full", "missing")
+            },
+            "courses": courses,
+        }
+
+
+def render_page(title: str, body: str) -> bytes:
+    html = (
+        '<html><head><meta http-equiv="Content-Type" content="text/html; charset=gb2312">'
+        f"<title>{title}</title></head><body>{body}</body></html>"
+    )
+    return html.encode("gb2312", errors="replace")
+
+
+def render_table(state: MockState, user: str, key: str) -> bytes:
+    header = "".join(f"<td>列{i}</td>" for i in range(COLUMNS))
+    rows = [f"<tr>{header}</tr>"]
+    for cid, course in state.courses.items():
+        if key and key not in course["name"]:
+            continue
+        cells = ["<td>%s</td>" % cid, f"<td>{course['name']}</td>"]
+        cells += [f"<td>{state.course_type}</td>"]
+        cells += [f"<td>{len(course['taken'])}/{course['capacity']}</td>"]
+        cells += ["<td>-</td>"] * (COLUMNS - 5)
+        if user in course["taken"]:
+            action = f'<a href="cancel.php?id={cid}">取消</a>'
+        elif len(course["taken"]) >= course["capacity"] and not state.full_link:
+            action = "已满"
+        else:
+            action = f'<a href="select.php?id={cid}">选择</a>'
+        cells.append(f"<td>{action}</td>")
+        rows.append("<tr>" + "".join(cells) + "</tr>")
+    nav = '<a href="logout.php">注销</a>'
+    return render_page("选课", f"{nav}<table>{''.join(rows)}</table>")
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive
+    state: MockState  # 由 main() 注入
+
+    def date_time_string(self, timestamp=None):
+        # Date 头按带偏差的服务器时钟给出，供客户端校时
+        return formatdate(self.state.now(), usegmt=True)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _user(self):
+        cookie = self.headers.get("Cookie", "")
+        for part in cookie.split(";"):
+            k, _, v = part.strip().partition("=")
+            if k == "PHPSESSID":
+                return self.state.session_user(v)
+        return None
+
+    def _send(
+        self, body: bytes, code: int = 200, cookie: str | None = None, etag: str | None = None
+    ):
+        self.state.delay()
+        self.send_response(code)
+        self.send_header("Content-Type", "text/html; charset=gb2312")
+        self.send_header("Content-Length", str(len(body)))
+        if cookie:
+            self.send_header("Set-Cookie", f"PHPSESSID={cookie}; path=/")
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_list(self, body: bytes, conditional: bool = False):
+        """课程列表；conditional 时带 ETag，与 If-None-Match 相同则返回 304"""
+        etag = None
+        if conditional:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                self.state.counts["not_modified"] += 1
+                self._send(b"", code=304, etag=etag)
+                return
+        self.state.counts["list_bytes"] += len(body)
+        self._send(body, etag=etag)
+
+    def _form(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("latin-1")
+        form = parse_qs(raw, encoding="gb2312", errors="replace")
+        return {k: v[0] for k, v in form.items()}
+
+    def do_GET(self):
+        self.state.delay()
+        url = urlparse(self.path)
+        path = url.path.removeprefix(PREFIX)
+        query = {
+            k: v[0] for k, v in parse_qs(url.query, encoding="gb2312", errors="replace").items()
+        }
+        if url.path == "/stats":
+            body = json.dumps(self.state.stats(), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        user = self._user()
+        if path == "/login.php":
+            self.state.counts["other"] += 1
+            self._send(render_page("登录", '<form method="post">用户名 密码 确定</form>'))
+        elif path == "/s_course.php":
+            self.state.counts["list"] += 1
+            if user is None:
+                self._send(render_page("登录", "请先登录"))
+            else:
+                key = query.get("key", "").strip()
+                self._send_list(render_table(self.state, user, key), conditional=True)
+        elif path == "/select.php":
+            self.state.counts["select"] += 1
+            if user is None:
+                self._send(render_page("错误", "请先登录"))
+                return
+            result = self.state.select(user, query.get("id", ""))
+            messages = {
+                "ok": "选择课程成功！",
+                "already": "该课程已选，如需退选请点击取消",
+                "closed": "选课尚未开始",
+                "full": "选课人数已满",
+                "missing": "课程不存在",
+            }
+            self._send(render_page("选课", messages[result]))
+        elif path == "/cancel.php":
+            self.state.counts["cancel"] += 1
+            if user is None:
+                self._send(render_page("错误", "请先登录"))
+            elif self.state.cancel(user, query.get("id", "")):
+                self._send(render_page("选课", "退选成功"))
+            else:
+                self._send(render_page("选课", "未选该课程"))
+        else:
+            self.state.counts["other"] += 1
+            self._send(render_page("404", "not found"), code=404)
+
+    def do_POST(self):
+        self.state.delay()
+        path = urlparse(self.path).path.removeprefix(PREFIX)
+        form = self._form()
+        if path == "/login.php":
+            self.state.counts["login"] += 1
+            if self.state.users.get(form.get("username")) == form.get("password"):
+                sid = uuid.uuid4().hex
+                self.state.sessions[sid] = (form["username"], time.time())
+                self._send(render_page("选课", '<a href="logout.php">注销</a>'), cookie=sid)
+            else:
+                self._send(render_page("登录", "用户名或密码错误"))
+        elif path == "/s_course.php":
+            self.state.counts["list"] += 1
+            user = self._user()
+            if user is None:
+                self._send(render_page("登录", "请先登录"))
+            else:
+                self._send_list(render_table(self.state, user, form.get("key", "").strip()))
+        else:
+            self.state.counts["other"] += 1
+            self._send(render_page("404", "not found"), code=404)
+
+
+def parse_open_at(args) -> float:
+    """
+    --open-at HH:MM:SS（服务器时钟当天）或 --open-in 秒 → 服务器时间戳。
+    --open-in 向上取整到整秒，与配置文件 target_time 的秒级精度对齐。
+    """
+    if args.open_at:
+        t = datetime.strptime(args.open_at, "%H:%M:%S").time()
+        return datetime.combine(datetime.now().date(), t).timestamp()
+    return float(math.ceil(time.time() + args.skew + args.open_in))
+
+
+def parse_courses(spec: str) -> list[tuple[str, int]]:
+    courses = []
+    for part in spec.split(","):
+        name, _, cap = part.strip().partition(":")
+        if name:
+            courses.append((name, int(cap) if cap else 1))
+    return courses
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="本地模拟选课服务器",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8700, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0, help="往返延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0, help="延迟抖动幅度（毫秒）")
+    parser.add_argument("--skew", type=float, default=0, help="服务器时钟比本机快多少秒")
+    parser.add_argument("--open-at", help="开放时刻 HH:MM:SS（服务器时钟）")
+    parser.add_argument("--open-in", type=float, default=10, help="几秒后开放（默认 10）")
+    parser.add_argument(
+        "--courses", default="音乐社:1,美术社:5", help="课程:容量，逗号分隔"
+    )
+    parser.add_argument(
+        "--course-type", default="2024-2025学年度下期选修课(初中)", help="课程类型"
+    )
+    parser.add_argument(
+        "--users", type=int, default=4, help="账号数，账号为 userN / 密码 passN"
+    )
+    parser.add_argument(
+        "--session-ttl", type=float, default=0, help="会话有效期（秒），0 表示不过期"
+    )
+    parser.add_argument(
+        "--full-link", action="store_true", help="课程已满时仍显示选择链接"
+    )
+    args = parser.parse_args(argv)
+    args.course_specs = parse_courses(args.courses)
+    args.open_at_ts = parse_open_at(args)
+    return args
+
+
+def make_server(args) -> ThreadingHTTPServer:
+    state = MockState(args)
+    handler = type("Handler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def main():
+    args = parse_args()
+    server = make_server(args)
+    opens = datetime.fromtimestamp(args.open_at_ts).strftime("%H:%M:%S.%f")[:-3]
+    print(
+        f"模拟服务器 http://{args.host}:{args.port}{PREFIX}  "
+        f"开放时刻(服务器时钟) {opens}  偏差 {args.skew:+.3f}s  "
+        f"延迟 {args.latency}±{args.jitter}ms"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
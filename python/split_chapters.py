@@ -9,18 +9,62 @@ pdf_split_chapters.py — 按书签/Outline 切分 PDF 章节
     python pdf_split_chapters.py input.pdf --list        # 只列出书签不切分
     python pdf_split_chapters.py input.pdf --min-pages 3 # 忽略不足3页的条目
     python pdf_split_chapters.py input.pdf --dry-run     # 演习模式
+    python pdf_split_chapters.py input.pdf --no-bookmarks # 不保留章节内书签/链接
+    python pdf_split_chapters.py input.pdf --ranges "1-12:前言,13-40,41-"
+    python pdf_split_chapters.py input.pdf --plan plan.json
+    python pdf_split_chapters.py input.pdf --max-size 50M  # 超过 50 MB 的章节拆成多个部分
+    python pdf_split_chapters.py input.pdf --linearize     # 输出线性化（Fast Web View）PDF
+    python pdf_split_chapters.py input.pdf --engine pypdf  # 指定 PDF 引擎（默认有 pikepdf 时用 pikepdf）
+    python pdf_split_chapters.py input.pdf --index chapters.jsonl  # 同时写出章节索引（含正文）
+    python pdf_split_chapters.py input.pdf --index library.db      # 索引写入 SQLite FTS5，可多本书共用
+    python pdf_split_chapters.py input.pdf --index library.db --index-workers 8  # 8 个进程提取正文
+    curl -s URL | python pdf_split_chapters.py - --archive tar -o - > out.tar
+    python pdf_split_chapters.py --serve 127.0.0.1:8765 --workers 4
+    python pdf_split_chapters.py --serve unix:/tmp/split.sock
+
+常驻服务（JSON over HTTP）:
+    GET  /health
+    POST /list   {"input": "book.pdf", "level": -1}
+    POST /plan   {"input": "book.pdf", "level": 0, "min_pages": 1, "max_size": "50M"}
+    POST /split  {"input": "book.pdf", "output_dir": "...", "linearize": false, "wait": false}
+                 可加 "index": "library.db" 同时写出章节索引
+    GET  /jobs/<id>
 """
 
+from __future__ import annotations
+
 import argparse
+import hashlib
+import importlib.util
+import io
+import ipaddress
+import json
 import os
 import re
+import shutil
+import socket
+import socketserver
+import stat
+import subprocess
 import sys
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
-try:
-    from pypdf import PdfReader, PdfWriter
-except ImportError:
-    sys.exit("[错误] 缺少依赖: pip install pypdf")
+from lazyimport import lazy_import
+
+# pypdf 在首次使用时才导入，--help 与参数错误无需等待；缺少依赖在 main() 中提示
+pypdf = lazy_import("pypdf")
 
 
 # ──────────────────────────────────────────────
@@ -37,7 +81,7 @@ def sanitize_filename(name: str, max_len: int = 80) -> str:
     return name[:max_len] or "untitled"
 
 
-def get_outline_items(reader: PdfReader) -> list[tuple[int, str, int]]:
+def get_outline_items(reader: pypdf.PdfReader) -> list[tuple[int, str, int]]:
     """
     递归遍历 PDF Outline，返回 [(level, title, page_index), ...]
     page_index 从 0 开始。
@@ -98,19 +142,1189 @@ def build_chapters(
     return chapters
 
 
+def _make_chapter(index: int, title: str, start: int, end: int) -> dict:
+    return {
+        "index": index,
+        "title": title,
+        "start": start,
+        "end": end,
+        "pages": end - start,
+    }
+
+
+def _check_plan(chapters: list[dict], total_pages: int) -> list[dict]:
+    """
+    校验显式章节计划：页码合法且互不重叠。
+    返回按起始页排序、重新编号的章节——chapter_locator() 按起始页二分查找，
+    乱序的计划会让书签与链接分配到错误的章节。
+    """
+    chapters = sorted(chapters, key=lambda c: c["start"])
+    prev_end = 0
+    for ch in chapters:
+        if not 0 <= ch["start"] < ch["end"] <= total_pages:
+            raise ValueError(
+                f"页范围 {ch['start'] + 1}-{ch['end']} 超出 1-{total_pages}"
+            )
+        if ch["start"] < prev_end:
+            raise ValueError(f"页范围 {ch['start'] + 1}-{ch['end']} 与前一章节重叠")
+        prev_end = ch["end"]
+    for i, ch in enumerate(chapters, start=1):
+        ch["index"] = i
+    return chapters
+
+
+def parse_ranges(spec: str, total_pages: int) -> list[dict]:
+    """
+    解析页范围描述，页码从 1 开始、两端包含：
+        "1-12:前言,13-40,41-"  →  3 个章节，"41-" 表示到最后一页
+    未给标题时使用 "pages_<起>-<止>"。
+    """
+    chapters = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        rng, _, title = part.partition(":")
+        first, dash, last = rng.strip().partition("-")
+        try:
+            start = int(first) - 1
+            end = (int(last) if last.strip() else total_pages) if dash else start + 1
+        except ValueError:
+            raise ValueError(f"无法解析页范围: {part!r}") from None
+        title = title.strip() or f"pages_{start + 1}-{end}"
+        chapters.append(_make_chapter(len(chapters) + 1, title, start, end))
+    return _check_plan(chapters, total_pages)
+
+
+def load_plan(source, total_pages: int) -> list[dict]:
+    """
+    读取 JSON 章节计划（路径或文件对象），格式：
+        [{"title": "第一章", "start": 1, "end": 20}, ...]
+    start/end 从 1 开始、两端包含；也接受 {"chapters": [...]} 包装或已解析的列表。
+    """
+    if isinstance(source, (list, dict)):
+        data = source
+    elif hasattr(source, "read"):
+        data = json.load(source)
+    else:
+        with open(source, encoding="utf-8") as f:
+            data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("chapters", [])
+    chapters = []
+    for entry in data:
+        try:
+            start = int(entry["start"]) - 1
+            end = int(entry.get("end") or total_pages)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"章节计划条目格式错误: {entry!r}") from None
+        title = str(entry.get("title") or f"pages_{start + 1}-{end}")
+        chapters.append(_make_chapter(len(chapters) + 1, title, start, end))
+    return _check_plan(chapters, total_pages)
+
+
+def parse_size(text) -> int:
+    """"50M" / "1.5G" / "800k" / "1048576" → 字节数（按 1024 进位）"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmg]?)i?b?\s*", str(text), re.I)
+    if match is None:
+        raise ValueError(f"无法解析大小: {text!r}")
+    value = float(match[1]) * 1024 ** " kmg".index(match[2].lower() or " ")
+    if value < 1:
+        raise ValueError(f"大小必须为正数: {text!r}")
+    return int(value)
+
+
+def format_size(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def _seekable_source(source, spool_size: int):
+    """
+    source 可为路径、"-"（stdin）或任意二进制文件对象，返回路径或可 seek 的文件对象。
+    不可 seek 的流先拷入 SpooledTemporaryFile，小文件全程在内存中。
+    """
+    if source == "-":
+        source = sys.stdin.buffer
+    if not hasattr(source, "read"):
+        return source
+    seekable = getattr(source, "seekable", None)
+    if seekable is not None and seekable():
+        return source
+    buf = tempfile.SpooledTemporaryFile(max_size=spool_size)
+    shutil.copyfileobj(source, buf, 1024 * 1024)
+    buf.seek(0)
+    return buf
+
+
+def open_reader(source, spool_size: int = 64 * 1024 * 1024) -> pypdf.PdfReader:
+    """用 pypdf 打开 PDF：source 可为路径、"-"（stdin）或任意二进制文件对象"""
+    source = _seekable_source(source, spool_size)
+    return pypdf.PdfReader(str(source) if isinstance(source, (str, Path)) else source)
+
+
+class ArchiveSink:
+    """
+    把章节依次写入单个 tar/zip 流。
+    目标可以是不可 seek 的 stdout：tar 用流模式 "w|"，zip 自动使用数据描述符。
+    """
+
+    def __init__(self, fileobj, fmt: str):
+        self.fmt = fmt
+        if fmt == "tar":
+            self._archive = tarfile.open(fileobj=fileobj, mode="w|")
+        elif fmt == "zip":
+            # PDF 流本身已压缩，再 deflate 收益很小
+            self._archive = zipfile.ZipFile(fileobj, "w", zipfile.ZIP_STORED)
+        else:
+            raise ValueError(f"不支持的归档格式: {fmt}")
+
+    def add(self, name: str, data: bytes):
+        if self.fmt == "tar":
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._archive.addfile(info, io.BytesIO(data))
+        else:
+            self._archive.writestr(name, data)
+
+    def close(self):
+        self._archive.close()
+
+
+class SplitError(Exception):
+    """章节计划无法生成（库接口抛出，CLI 转为错误退出）"""
+
+
+def plan_chapters(
+    book,
+    *,
+    level: int | None = 0,
+    min_pages: int = 1,
+    ranges: str | None = None,
+    plan=None,
+    outline_items: list[tuple[int, str, int]] | None = None,
+    max_size: int | None = None,
+) -> list[dict]:
+    """
+    库接口：生成章节计划，book 为 open_book() 的结果或 pypdf PdfReader。
+    ranges / plan（路径、文件对象或已解析的列表）优先于书签；
+    否则按 level（None=所有层级）与 min_pages 从书签生成。
+    outline_items 可传入已提取的书签，避免重复遍历。
+    max_size（字节）：按估算体积把超出的章节拆成多个部分，见 split_by_size()。
+    """
+    book = as_book(book)
+    total = book.page_count
+    if ranges or plan is not None:
+        try:
+            chapters = parse_ranges(ranges, total) if ranges else load_plan(plan, total)
+        except (OSError, ValueError) as e:
+            raise SplitError(f"章节计划无效: {e}") from e
+        if not chapters:
+            raise SplitError("章节计划为空")
+        if max_size:
+            chapters = split_by_size(book, chapters, max_size, outline_items)
+        return chapters
+
+    if outline_items is None:
+        outline_items = book.outline_items()
+    if not outline_items:
+        raise SplitError(
+            "PDF 没有书签/Outline，无法自动按章节切分。\n"
+            "       → 可改用 --ranges 或 --plan 手动指定页范围。"
+        )
+
+    items = filter_by_level(outline_items, level)
+    if not items:
+        raise SplitError(
+            f"层级 {-1 if level is None else level} 下没有书签条目。\n"
+            f"       → 运行 --list 查看可用层级。"
+        )
+
+    chapters = build_chapters(items, total, min_pages)
+    if not chapters:
+        raise SplitError(
+            f"过滤后（min-pages={min_pages}）没有可切分的章节。\n"
+            f"       → 降低 --min-pages 阈值或运行 --list 检查书签。"
+        )
+    if max_size:
+        chapters = split_by_size(book, chapters, max_size, outline_items)
+    return chapters
+
+
+# ──────────────────────────────────────────────
+# 按体积切分
+# ──────────────────────────────────────────────
+
+# 输出文件的固定开销（文件头、目录、页树、trailer）与每个对象的
+# "N 0 obj … endobj" 包装及 xref 条目；均略微高估，宁可多拆也不超限
+FILE_OVERHEAD = 4096
+OBJECT_OVERHEAD = 48
+OUTLINE_ITEM_OVERHEAD = 160
+
+
+class _ByteCounter:
+    """只计数不保存的写入目标，用于测量对象序列化后的字节数"""
+
+    def __init__(self):
+        self.n = 0
+
+    def write(self, data: bytes) -> int:
+        self.n += len(data)
+        return len(data)
+
+
+def _child_refs(obj) -> list[pypdf.generic.IndirectObject]:
+    """对象内（含直接嵌套的字典/数组）引用的间接对象；不沿 /Parent 回到页树"""
+    refs, stack = [], [obj]
+    while stack:
+        o = stack.pop()
+        if isinstance(o, pypdf.generic.IndirectObject):
+            refs.append(o)
+        elif isinstance(o, pypdf.generic.DictionaryObject):
+            stack.extend(v for k, v in o.items() if k != "/Parent")
+        elif isinstance(o, pypdf.generic.ArrayObject):
+            stack.extend(o)
+    return refs
+
+
+class PageCostModel:
+    """
+    每页的资源闭包（该页引用到的全部间接对象）与每个对象的序列化字节数，
+    都只计算一次。闭包不进入其他页面与页树——pypdf 复制页面时也不会复制它们
+    （--no-bookmarks 下跨章链接会整页克隆目标页，此时估算偏小）。
+    共享对象（字体、图片等）的闭包按对象缓存，多页引用时不重复遍历。
+    对象图的遍历与测量由 Book 的引擎实现提供，对象 id 的类型随引擎而定。
+    """
+
+    def __init__(self, book):
+        self.book = as_book(book)
+        self.page_ids = self.book.page_ids()
+        self.sizes: dict = {}  # 对象 id → 序列化字节数（含对象包装）
+        self._closures: dict = {}  # 对象 id → 闭包（仅无环时缓存）
+        self._pages: dict[int, frozenset] = {}  # 页码 → 闭包
+
+    def _measure(self, oid, ref) -> None:
+        self.sizes[oid] = self.book.object_size(ref) + OBJECT_OVERHEAD
+
+    def _closure(self, ref, active: set) -> tuple[frozenset, bool]:
+        """返回 (闭包, 是否完整)；遇到正在遍历的祖先（环）时闭包不完整，不缓存"""
+        book = self.book
+        idnum = book.object_id(ref)
+        cached = self._closures.get(idnum)
+        if cached is not None:
+            return cached, True
+        ids, complete = {idnum}, True
+        active.add(idnum)
+        for child in book.object_refs(ref):
+            cid = book.object_id(child)
+            if cid in self.page_ids or cid in ids:
+                continue
+            if cid in active:
+                complete = False
+                continue
+            sub, ok = self._closure(child, active)
+            ids |= sub
+            complete &= ok
+        active.discard(idnum)
+        if idnum not in self.sizes:
+            self._measure(idnum, ref)
+        result = frozenset(ids)
+        if complete:
+            self._closures[idnum] = result
+        return result, complete
+
+    def page_closure(self, page_idx: int) -> frozenset:
+        cached = self._pages.get(page_idx)
+        if cached is not None:
+            return cached
+        book = self.book
+        ref = book.page_ref(page_idx)
+        ids = set()
+        for child in book.object_refs(ref):
+            if book.object_id(child) not in self.page_ids:
+                ids |= self._closure(child, set())[0]
+        oid = book.object_id(ref)
+        ids.add(oid)
+        if oid not in self.sizes:
+            self._measure(oid, ref)
+        result = self._pages[page_idx] = frozenset(ids)
+        return result
+
+    def cost(self, ids) -> int:
+        return sum(self.sizes.get(i, OBJECT_OVERHEAD) for i in ids)
+
+
+def split_by_size(
+    book,
+    chapters: list[dict],
+    max_size: int,
+    outline_items: list[tuple[int, str, int]] | None = None,
+    model: PageCostModel | None = None,
+) -> list[dict]:
+    """
+    按估算体积把章节拆成不超过 max_size 字节的部分，不做试写。
+    逐页累加资源闭包中尚未计入当前部分的对象（共享对象每个输出只算一次），
+    超出预算时从当前页开始新的部分。单页即超出预算时单独成一部分并标记 oversize。
+    未拆分的章节原样保留；拆出的部分共用原章节的 index 与 title，
+    另带 part / parts（从 1 开始）。所有条目都附 est_bytes。
+    """
+    model = model or PageCostModel(book)
+    outline_cost: dict[int, int] = {}
+    for _, title, page in outline_items or ():
+        outline_cost[page] = (
+            outline_cost.get(page, 0) + OUTLINE_ITEM_OVERHEAD + 4 * len(title)
+        )
+
+    result = []
+    for ch in chapters:
+        parts = []  # [(start, end, est_bytes)]
+        start, ids, est = ch["start"], set(), FILE_OVERHEAD
+        for p in range(ch["start"], ch["end"]):
+            closure = model.page_closure(p)
+            new = closure - ids
+            add = model.cost(new) + outline_cost.get(p, 0)
+            if p > start and est + add > max_size:
+                parts.append((start, p, est))
+                start, ids, est = p, set(), FILE_OVERHEAD
+                new = closure
+                add = model.cost(new) + outline_cost.get(p, 0)
+            ids |= new
+            est += add
+        parts.append((start, ch["end"], est))
+
+        if len(parts) == 1:
+            result.append({**ch, "est_bytes": est})
+            if est > max_size:
+                result[-1]["oversize"] = True
+            continue
+        for k, (s, e, size) in enumerate(parts, start=1):
+            part = {
+                **_make_chapter(ch["index"], ch["title"], s, e),
+                "part": k,
+                "parts": len(parts),
+                "est_bytes": size,
+            }
+            if size > max_size:
+                part["oversize"] = True
+            result.append(part)
+    return result
+
+
+# ──────────────────────────────────────────────
+# 书签 / 内部链接重映射
+# ──────────────────────────────────────────────
+
+
+def chapter_locator(chapters: list[dict]):
+    """
+    基于章节起始页构建区间索引，返回 locate(page_index) -> 章节下标 | None。
+    章节互不重叠且按起始页递增，二分查找即可，无需逐章扫描。
+    """
+    starts = [ch["start"] for ch in chapters]
+
+    def locate(page_idx: int) -> int | None:
+        i = bisect_right(starts, page_idx) - 1
+        if i >= 0 and page_idx < chapters[i]["end"]:
+            return i
+        return None
+
+    return locate
+
+
+def assign_outline(
+    items: list[tuple[int, str, int]], chapters: list[dict]
+) -> list[list[tuple[int, str, int]]]:
+    """
+    单次遍历全部书签，按所在页分配到各章节，页码改为章节内相对页。
+    返回与 chapters 一一对应的 [(level, title, local_page), ...] 列表。
+    """
+    locate = chapter_locator(chapters)
+    per_chapter: list[list[tuple[int, str, int]]] = [[] for _ in chapters]
+    for lvl, title, page in items:
+        i = locate(page)
+        if i is not None:
+            per_chapter[i].append((lvl, title, page - chapters[i]["start"]))
+    return per_chapter
+
+
+def outline_paths(
+    items: list[tuple[int, str, int]], chapters: list[dict]
+) -> list[list[str]]:
+    """
+    每个章节在书签树中的位置：起始页处从顶层到该章节的标题链，如
+    ["第一部分", "第二章", "2.3 小结"]。章节本身是书签条目时以它结尾；
+    显式页范围或拆分出的部分取起始页所在的书签链，末尾补上章节标题（与链尾相同时不重复）。
+    """
+    paths: list[list[str]] = [[] for _ in chapters]
+    stack: list[tuple[int, str]] = []  # 起始页之前的书签链 [(level, title)]
+    i = 0
+    for n in sorted(range(len(chapters)), key=lambda k: chapters[k]["start"]):
+        ch = chapters[n]
+        while i < len(items) and items[i][2] < ch["start"]:
+            lvl, title, _ = items[i]
+            while stack and stack[-1][0] >= lvl:
+                stack.pop()
+            stack.append((lvl, title))
+            i += 1
+        # 同在起始页上的书签（如“第一部分”与其下的“第一章”）依次入链，遇到章节本身即止
+        chain = list(stack)
+        for lvl, title, page in items[i:]:
+            if page != ch["start"]:
+                break
+            while chain and chain[-1][0] >= lvl:
+                chain.pop()
+            chain.append((lvl, title))
+            if title == ch["title"]:
+                break
+        path = [title for _, title in chain]
+        if not path or path[-1] != ch["title"]:
+            path.append(ch["title"])
+        paths[n] = path
+    return paths
+
+
+def add_sub_outline(writer: pypdf.PdfWriter, entries: list[tuple[int, str, int]]):
+    """按层级把章节内书签写回 writer，保持原有父子关系"""
+    stack: list[tuple[int, object]] = []  # [(level, outline_item), ...]
+    for lvl, title, local_page in entries:
+        while stack and stack[-1][0] >= lvl:
+            stack.pop()
+        parent = stack[-1][1] if stack else None
+        stack.append((lvl, writer.add_outline_item(title, local_page, parent=parent)))
+
+
+class LinkResolver:
+    """
+    解析页面中的内部跳转链接（/Dest 或 /GoTo 动作）到源文档页码。
+    页对象 → 页码映射与命名目标表只构建一次，所有章节共用。
+    """
+
+    def __init__(self, reader: pypdf.PdfReader):
+        self.reader = reader
+        self.page_ids = {
+            page.indirect_reference.idnum: i
+            for i, page in enumerate(reader.pages)
+            if page.indirect_reference is not None
+        }
+        self._named = None
+
+    @property
+    def named(self) -> dict:
+        # named_destinations 每次访问都会重新遍历名称树，这里缓存
+        if self._named is None:
+            try:
+                self._named = self.reader.named_destinations
+            except Exception:
+                self._named = {}
+        return self._named
+
+    def goto_dest(self, annot: pypdf.generic.DictionaryObject):
+        """返回内部链接的原始目标；非内部跳转链接返回 None"""
+        if annot.get("/Subtype") != "/Link":
+            return None
+        if "/Dest" in annot:
+            return annot["/Dest"]
+        action = annot.get("/A")
+        if action is not None:
+            action = action.get_object()
+            if action.get("/S") == "/GoTo" and "/D" in action:
+                return action["/D"]
+        return None
+
+    def resolve(self, dest) -> tuple[int, list] | None:
+        """目标 → (源页码, 视图参数)，无法解析时返回 None"""
+        dest = dest.get_object()
+        if isinstance(dest, pypdf.generic.DictionaryObject):
+            dest = dest.get("/D")
+        if dest is None:
+            return None
+        if not isinstance(dest, pypdf.generic.ArrayObject):
+            named = self.named.get(str(dest))
+            if named is None:
+                return None
+            dest = named.dest_array
+        if not dest:
+            return None
+        target = dest[0]
+        if isinstance(target, int):
+            page_idx = int(target)
+        else:
+            page_idx = self.page_ids.get(getattr(target, "idnum", None))
+        if page_idx is None:
+            return None
+        return page_idx, list(dest[1:])
+
+
+def _page_without_annots(page: pypdf.PageObject) -> pypdf.PageObject:
+    """
+    去掉 /Annots 的页面副本（仍指向原页对象，克隆结果与原页一致）。
+    链接由 copy_chapter_pages 自行重写；旧版 pypdf 即使 excluded_keys 含 /Annots
+    也会比对源页链接，每个带链接的页面记一条 "Annotation sizes differ" 警告。
+    """
+    copy = pypdf.PageObject(page.pdf, page.indirect_reference)  # 浅拷贝页面字典
+    copy.pop("/Annots", None)
+    return copy
+
+
+def copy_chapter_pages(
+    writer: pypdf.PdfWriter, reader: pypdf.PdfReader, ch: dict, links: LinkResolver
+) -> int:
+    """
+    复制章节页面，并重写章节内的跳转链接。
+    指向章节外的链接被丢弃——否则 pypdf 会把目标页整页克隆进输出文件。
+    返回丢弃的链接数。
+    """
+    new_pages = [
+        writer.add_page(_page_without_annots(reader.pages[p]))
+        for p in range(ch["start"], ch["end"])
+    ]
+    dropped = 0
+    for offset, new_page in enumerate(new_pages):
+        annots = reader.pages[ch["start"] + offset].get("/Annots")
+        if annots is None:
+            continue
+        new_annots = pypdf.generic.ArrayObject()
+        for ref in annots.get_object():
+            annot = ref.get_object()
+            if not isinstance(annot, pypdf.generic.DictionaryObject):
+                continue
+            dest = links.goto_dest(annot)
+            if dest is None:
+                cloned = annot.clone(writer)
+            else:
+                resolved = links.resolve(dest)
+                if resolved is None or not ch["start"] <= resolved[0] < ch["end"]:
+                    dropped += 1
+                    continue
+                target, view = resolved
+                cloned = annot.clone(writer, ignore_fields=("/Dest", "/A"))
+                cloned[pypdf.generic.NameObject("/Dest")] = pypdf.generic.ArrayObject(
+                    [new_pages[target - ch["start"]].indirect_reference, *view]
+                )
+            new_annots.append(cloned.indirect_reference or cloned)
+        if new_annots:
+            new_page[pypdf.generic.NameObject("/Annots")] = new_annots
+    return dropped
+
+
+# ──────────────────────────────────────────────
+# PDF 引擎
+# ──────────────────────────────────────────────
+
+ENGINES = ("auto", "pypdf", "pikepdf")
+
+
+class Book(ABC):
+    """
+    已打开的 PDF 及切分所需的全部操作：读取书签、按页范围写出章节（含章节内书签
+    与链接重写、线性化），以及体积估算（PageCostModel）用的对象图遍历。
+    各引擎对同一文件给出相同的书签与章节计划；对象句柄的类型由引擎决定。
+    """
+
+    engine = ""
+    page_count = 0
+    source = None  # open() 时的输入：路径或可 seek 的文件对象，提取正文时重新读取
+
+    @abstractmethod
+    def outline_items(self) -> list[tuple[int, str, int]]:
+        """全部层级书签 [(level, title, page_index), ...]，同 get_outline_items()"""
+
+    @abstractmethod
+    def write_chapter(self, ch: dict, stream, sub_outline=None, linearize=False) -> int:
+        """
+        把章节页面写入 stream，返回丢弃的跨章链接数。
+        sub_outline 为 None 时不保留书签、不重写链接（旧行为）；
+        为列表（可为空）时写入这些书签并重写章节内链接。
+        """
+
+    @abstractmethod
+    def page_ref(self, page_idx: int):
+        ...
+
+    @abstractmethod
+    def page_ids(self) -> set:
+        ...
+
+    @abstractmethod
+    def object_id(self, ref):
+        ...
+
+    @abstractmethod
+    def object_refs(self, ref) -> list:
+        """对象内引用的间接对象（不沿 /Parent 回到页树）"""
+
+    @abstractmethod
+    def object_size(self, ref) -> int:
+        """对象序列化后的字节数（不含 obj/endobj 包装）"""
+
+
+class PypdfBook(Book):
+    """pypdf 实现：纯 Python，无需额外依赖"""
+
+    engine = "pypdf"
+
+    def __init__(self, reader: pypdf.PdfReader):
+        self.reader = reader
+        self.page_count = len(reader.pages)
+        self._links = None
+        self._linearizer = None
+
+    @classmethod
+    def open(cls, source, spool_size: int = 64 * 1024 * 1024) -> "PypdfBook":
+        source = _seekable_source(source, spool_size)
+        book = cls(open_reader(source))
+        book.source = source
+        return book
+
+    def outline_items(self) -> list[tuple[int, str, int]]:
+        return get_outline_items(self.reader)
+
+    def write_chapter(self, ch: dict, stream, sub_outline=None, linearize=False) -> int:
+        writer = pypdf.PdfWriter()
+        dropped = 0
+        if sub_outline is not None:
+            if self._links is None:
+                self._links = LinkResolver(self.reader)
+            dropped = copy_chapter_pages(writer, self.reader, ch, self._links)
+            add_sub_outline(writer, sub_outline)
+        else:
+            for p in range(ch["start"], ch["end"]):
+                writer.add_page(self.reader.pages[p])
+        if linearize:
+            if self._linearizer is None:
+                self._linearizer = get_linearizer()
+            buf = io.BytesIO()
+            writer.write(buf)
+            stream.write(self._linearizer(buf.getvalue()))
+        else:
+            writer.write(stream)
+        return dropped
+
+    def page_ref(self, page_idx: int):
+        return self.reader.pages[page_idx].indirect_reference
+
+    def page_ids(self) -> set:
+        return {
+            page.indirect_reference.idnum
+            for page in self.reader.pages
+            if page.indirect_reference is not None
+        }
+
+    def object_id(self, ref):
+        return ref.idnum
+
+    def object_refs(self, ref) -> list:
+        return _child_refs(ref.get_object())
+
+    def object_size(self, ref) -> int:
+        counter = _ByteCounter()
+        ref.get_object().write_to_stream(counter)
+        return counter.n
+
+
+class PikepdfBook(Book):
+    """
+    pikepdf（libqpdf）实现：解析、页面复制与写出都在 C++ 中完成，大文件上明显更快，
+    线性化可直接随写出完成。页面复制规则与 pypdf 实现一致：
+    不复制 /Parent 与 /Annots，注释单独处理，跨章链接丢弃，避免把目标页整页带进输出。
+    """
+
+    engine = "pikepdf"
+
+    def __init__(self, pdf):
+        import pikepdf
+
+        self._pk = pikepdf
+        self.pdf = pdf
+        # pdf.pages[i] 每次都重新遍历页树，页面列表只取一次
+        self.pages = [page.obj for page in pdf.pages]
+        self.page_count = len(self.pages)
+        self._page_index = None  # objgen → 页码
+        self._named = None
+
+    @classmethod
+    def open(cls, source, spool_size: int = 64 * 1024 * 1024) -> "PikepdfBook":
+        import pikepdf
+
+        source = _seekable_source(source, spool_size)
+        book = cls(pikepdf.open(str(source) if isinstance(source, (str, Path)) else source))
+        book.source = source
+        return book
+
+    # ── 目标解析 ──
+
+    @property
+    def page_index(self) -> dict:
+        if self._page_index is None:
+            self._page_index = {page.objgen: i for i, page in enumerate(self.pages)}
+        return self._page_index
+
+    @property
+    def named(self) -> dict:
+        # 旧式 /Dests 字典与 /Names /Dests 名称树，键的写法与 pypdf named_destinations 一致
+        if self._named is None:
+            self._named = {}
+            root = self.pdf.Root
+            try:
+                if "/Dests" in root:
+                    for key, value in root.Dests.items():
+                        self._named[str(key)] = value
+                if "/Names" in root and "/Dests" in root.Names:
+                    for key, value in self._pk.NameTree(root.Names.Dests).items():
+                        self._named[str(key)] = value
+            except Exception:
+                pass
+        return self._named
+
+    def _resolve(self, dest) -> tuple[int, list] | None:
+        """目标 → (源页码, 视图参数)，与 LinkResolver.resolve() 规则相同"""
+        pk = self._pk
+        if isinstance(dest, pk.Dictionary):
+            dest = dest.get("/D")
+        if dest is None:
+            return None
+        if not isinstance(dest, pk.Array):
+            dest = self.named.get(str(dest))
+            if isinstance(dest, pk.Dictionary):
+                dest = dest.get("/D")
+            if not isinstance(dest, pk.Array):
+                return None
+        if len(dest) == 0:
+            return None
+        target = dest[0]
+        if isinstance(target, int):
+            page_idx = int(target)
+        elif isinstance(target, pk.Object) and target.is_indirect:
+            page_idx = self.page_index.get(target.objgen)
+        else:
+            page_idx = None
+        if page_idx is None:
+            return None
+        return page_idx, list(dest[1:])
+
+    def _goto_dest(self, annot):
+        if annot.get("/Subtype") != "/Link":
+            return None
+        if "/Dest" in annot:
+            return annot.Dest
+        action = annot.get("/A")
+        if action is not None and action.get("/S") == "/GoTo" and "/D" in action:
+            return action.D
+        return None
+
+    def outline_items(self) -> list[tuple[int, str, int]]:
+        items: list[tuple[int, str, int]] = []
+
+        def walk(nodes, level: int):
+            for node in nodes:
+                dest = node.destination
+                if dest is None and node.action is not None and node.action.get("/S") == "/GoTo":
+                    dest = node.action.get("/D")
+                resolved = self._resolve(dest) if dest is not None else None
+                # 与 pypdf 一致：无法解析的条目跳过，其子条目照常保留
+                if resolved is not None:
+                    page_idx = max(0, min(resolved[0], self.page_count - 1))
+                    items.append((level, (node.title or "(无标题)").strip(), page_idx))
+                walk(node.children, level + 1)
+
+        try:
+            # 不用 with：退出上下文时 pikepdf 会重写书签对象
+            walk(self.pdf.open_outline().root, level=0)
+        except Exception:
+            return items
+        return items
+
+    # ── 写出 ──
+
+    def _import(self, out, value):
+        """把源文档中的值复制进 out：间接对象交给 copy_foreign（同一输出内只复制一次）"""
+        pk = self._pk
+        if isinstance(value, pk.Object) and value.is_indirect:
+            return out.copy_foreign(value)
+        if isinstance(value, pk.Dictionary):
+            return pk.Dictionary({k: self._import(out, v) for k, v in value.items()})
+        if isinstance(value, pk.Array):
+            return pk.Array([self._import(out, v) for v in value])
+        return value
+
+    def _import_dict(self, out, obj, skip=()):
+        pk = self._pk
+        return pk.Dictionary(
+            {k: self._import(out, v) for k, v in obj.items() if k not in skip}
+        )
+
+    def write_chapter(self, ch: dict, stream, sub_outline=None, linearize=False) -> int:
+        pk = self._pk
+        out = pk.new()
+        keep_links = sub_outline is not None
+        skip = ("/Parent", "/Annots") if keep_links else ("/Parent",)
+        for p in range(ch["start"], ch["end"]):
+            out.pages.append(pk.Page(self._import_dict(out, self.pages[p], skip)))
+        new_pages = list(out.pages)
+
+        dropped = 0
+        for offset, new_page in enumerate(new_pages if keep_links else ()):
+            annots = self.pages[ch["start"] + offset].get("/Annots")
+            if annots is None:
+                continue
+            new_annots = pk.Array()
+            for annot in annots:
+                if not isinstance(annot, pk.Dictionary):
+                    continue
+                dest = self._goto_dest(annot)
+                if dest is None:
+                    cloned = self._import_dict(out, annot, ("/P",))
+                else:
+                    resolved = self._resolve(dest)
+                    if resolved is None or not ch["start"] <= resolved[0] < ch["end"]:
+                        dropped += 1
+                        continue
+                    target, view = resolved
+                    cloned = self._import_dict(out, annot, ("/P", "/Dest", "/A"))
+                    cloned.Dest = pk.Array(
+                        [new_pages[target - ch["start"]].obj, *view]
+                    )
+                if "/P" in annot:
+                    cloned.P = new_page.obj
+                new_annots.append(out.make_indirect(cloned))
+            if len(new_annots):
+                new_page.obj.Annots = new_annots
+
+        if sub_outline:
+            with out.open_outline() as outline:
+                stack: list[tuple[int, object]] = []
+                for lvl, title, local_page in sub_outline:
+                    while stack and stack[-1][0] >= lvl:
+                        stack.pop()
+                    item = pk.OutlineItem(title, local_page)
+                    (stack[-1][1].children if stack else outline.root).append(item)
+                    stack.append((lvl, item))
+        # 流数据原样复制，与 pypdf 输出一样不重新压缩
+        out.save(stream, linearize=linearize, compress_streams=False)
+        return dropped
+
+    # ── 体积估算 ──
+
+    def page_ref(self, page_idx: int):
+        return self.pages[page_idx]
+
+    def page_ids(self) -> set:
+        return set(self.page_index)
+
+    def object_id(self, ref):
+        return ref.objgen
+
+    def object_refs(self, ref) -> list:
+        pk = self._pk
+        refs, stack = [], [ref]
+        while stack:
+            o = stack.pop()
+            if o is not ref and isinstance(o, pk.Object) and o.is_indirect:
+                refs.append(o)
+            elif isinstance(o, (pk.Dictionary, pk.Stream)):
+                stack.extend(v for k, v in o.items() if k != "/Parent")
+            elif isinstance(o, pk.Array):
+                stack.extend(o)
+        return refs
+
+    def object_size(self, ref) -> int:
+        if isinstance(ref, self._pk.Stream):
+            # "stream\n" … "\nendstream"
+            return len(ref.read_raw_bytes()) + len(ref.stream_dict.unparse(resolved=True)) + 18
+        return len(ref.unparse(resolved=True))
+
+
+def have_pikepdf() -> bool:
+    return importlib.util.find_spec("pikepdf") is not None
+
+
+def _check_engine(engine: str) -> None:
+    if engine not in ENGINES:
+        raise SplitError(f"未知的 PDF 引擎: {engine}")
+    if engine == "pikepdf" and not have_pikepdf():
+        raise SplitError("pikepdf 引擎需要安装 pikepdf：pip install pikepdf")
+
+
+def open_book(source, engine: str = "auto", spool_size: int = 64 * 1024 * 1024) -> Book:
+    """
+    库接口：用指定引擎打开 PDF（路径、"-" 或二进制文件对象）。
+    auto 在装有 pikepdf 时使用 pikepdf，否则使用 pypdf。
+    """
+    if engine == "auto":
+        engine = "pikepdf" if have_pikepdf() else "pypdf"
+    _check_engine(engine)
+    if engine == "pikepdf":
+        return PikepdfBook.open(source, spool_size)
+    return PypdfBook.open(source, spool_size)
+
+
+def as_book(doc) -> Book:
+    """库函数同时接受 Book 与 pypdf PdfReader（旧接口）"""
+    return doc if isinstance(doc, Book) else PypdfBook(doc)
+
+
+# ──────────────────────────────────────────────
+# 线性化（Fast Web View）
+# ──────────────────────────────────────────────
+
+
+def get_linearizer():
+    """
+    返回 linearize(data: bytes) -> bytes，把完整 PDF 改写为线性化文件：
+    首页所需对象排在最前，附线性化参数字典与提示表（hint tables），
+    查看器只需下载开头一小段即可显示第一页。
+    pypdf 不能生成线性化文件，这里交给 qpdf：优先进程内的 pikepdf，
+    其次 qpdf 命令；都没有时抛 SplitError。流数据原样复制，不重新压缩。
+    """
+    try:
+        import pikepdf
+    except ImportError:
+        pikepdf = None
+
+    if pikepdf is not None:
+
+        def linearize(data: bytes) -> bytes:
+            with pikepdf.open(io.BytesIO(data)) as pdf:
+                out = io.BytesIO()
+                pdf.save(out, linearize=True, compress_streams=False)
+                return out.getvalue()
+
+        return linearize
+
+    qpdf = shutil.which("qpdf")
+    if qpdf is not None:
+
+        def linearize(data: bytes) -> bytes:
+            with tempfile.TemporaryDirectory(prefix="split_lin_") as tmp:
+                src, dst = Path(tmp) / "in.pdf", Path(tmp) / "out.pdf"
+                src.write_bytes(data)
+                proc = subprocess.run(
+                    [qpdf, "--linearize", "--compress-streams=n", str(src), str(dst)],
+                    capture_output=True,
+                    text=True,
+                )
+                # 退出码 3 表示有警告但已成功写出
+                if proc.returncode not in (0, 3):
+                    raise RuntimeError(f"qpdf 线性化失败: {proc.stderr.strip()}")
+                return dst.read_bytes()
+
+        return linearize
+
+    raise SplitError(
+        "线性化需要 pikepdf 或 qpdf。\n"
+        "       → pip install pikepdf，或安装 qpdf 命令行工具。"
+    )
+
+
+# ──────────────────────────────────────────────
+# 章节索引（sidecar）
+# ──────────────────────────────────────────────
+
+TEXT_CHUNK_PAGES = 8  # 每个文本提取任务的页数
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+PAGE_SEPARATOR = "\f"  # 章节正文中的分页符，与 pdftotext 一致
+
+_text_reader = None  # 文本提取工作进程内打开的 PdfReader
+
+
+def _init_text_reader(path: str) -> None:
+    global _text_reader
+    _text_reader = pypdf.PdfReader(path)
+
+
+def _page_text(page) -> str:
+    try:
+        return page.extract_text()
+    except Exception:
+        # 个别页面内容流损坏时只丢这一页的文本，不影响切分与其余条目
+        return ""
+
+
+def _extract_pages(start: int, end: int) -> list[str]:
+    """在工作进程中提取 [start, end) 页的文本"""
+    return [_page_text(_text_reader.pages[p]) for p in range(start, end)]
+
+
+class PageTextExtractor:
+    """
+    按页提取正文（pypdf extract_text，与切分引擎无关）。
+    输入为路径且 workers > 1 时，全部章节的页面按 TEXT_CHUNK_PAGES 分块一次性投递到
+    进程池，各工作进程自行打开源文件并行提取，主进程同时写出章节；
+    否则（单进程、stdin 等文件对象输入）在本进程内逐页提取。
+    """
+
+    def __init__(self, book: Book, workers: int = 1):
+        self.pool = None
+        self.reader = None
+        self._pending: dict[int, list] = {}
+        if isinstance(book.source, (str, Path)) and workers > 1:
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_text_reader,
+                initargs=(str(book.source),),
+            )
+        elif isinstance(book, PypdfBook):
+            self.reader = book.reader
+        elif book.source is not None:
+            self.reader = open_reader(book.source)
+        else:
+            raise SplitError("无法提取正文：该 Book 没有可重新读取的输入")
+
+    def prefetch(self, chapters: list[dict]) -> None:
+        """开始提取各章节的文本（仅进程池模式；单进程模式在 chapter_text() 时提取）"""
+        if self.pool is None:
+            return
+        for n, ch in enumerate(chapters):
+            self._pending[n] = [
+                self.pool.submit(_extract_pages, s, min(s + TEXT_CHUNK_PAGES, ch["end"]))
+                for s in range(ch["start"], ch["end"], TEXT_CHUNK_PAGES)
+            ]
+
+    def chapter_text(self, n: int, ch: dict) -> str:
+        """第 n 个章节的正文，各页以 PAGE_SEPARATOR 分隔"""
+        if n in self._pending:
+            pages = [text for f in self._pending.pop(n) for text in f.result()]
+        else:
+            pages = [_page_text(self.reader.pages[p]) for p in range(ch["start"], ch["end"])]
+        return PAGE_SEPARATOR.join(pages)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+
+class JsonlIndex:
+    """章节索引写成 JSON Lines：每行一个章节，每次切分重写整个文件"""
+
+    def __init__(self, path, source: str | None = None):
+        self.path = Path(path)
+        self.source = source
+        self.count = 0
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def add(self, record: dict):
+        self._file.write(
+            json.dumps({"source": self.source, **record}, ensure_ascii=False) + "\n"
+        )
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+class SqliteIndex:
+    """
+    章节索引写入 SQLite：chapters 表存元数据，chapters_fts（FTS5）存标题、书签路径与正文，
+    两表以 rowid = chapters.id 对应。同一个库可供多本书共用，重新切分时先删除该输入的旧记录。
+    全文表优先用 trigram 分词（中文无空格也能按子串检索），旧版 SQLite 退回 unicode61。
+    切分期间只在内存中缓存记录，close() 时在一个短事务里删除旧记录并写入，
+    不长时间占着写锁，其他进程可同时写同一个库。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS chapters (
+            id INTEGER PRIMARY KEY,
+            source TEXT,
+            chapter INTEGER,
+            part INTEGER,
+            title TEXT,
+            outline_path TEXT,
+            start_page INTEGER,
+            end_page INTEGER,
+            pages INTEGER,
+            file TEXT,
+            path TEXT,
+            bytes INTEGER,
+            sha256 TEXT
+        );
+        CREATE INDEX IF NOT EXISTS chapters_source ON chapters(source);
+    """
+    FTS = "CREATE VIRTUAL TABLE IF NOT EXISTS chapters_fts USING fts5(title, outline_path, text{})"
+
+    def __init__(self, path, source: str | None = None):
+        import sqlite3
+
+        self.path = Path(path)
+        self.source = source
+        self.count = 0
+        # 常驻服务的多个工作进程可能同时写同一个库
+        self._db = sqlite3.connect(self.path, timeout=30)
+        self._db.executescript(self.SCHEMA)
+        try:
+            try:
+                self._db.execute(self.FTS.format(", tokenize='trigram'"))
+            except sqlite3.OperationalError as e:
+                if "trigram" not in str(e):
+                    raise
+                self._db.execute(self.FTS.format(""))
+        except sqlite3.OperationalError as e:
+            self._db.close()
+            raise SplitError(f"SQLite 不支持 FTS5，请改用 .jsonl 索引: {e}") from e
+        self._rows: list[tuple[tuple, tuple]] = []
+
+    def add(self, record: dict):
+        outline_path = json.dumps(record["outline_path"], ensure_ascii=False)
+        self._rows.append(
+            (
+                (
+                    self.source, record["index"], record["part"], record["title"],
+                    outline_path, record["start"], record["end"], record["pages"],
+                    record["file"], record["path"], record["bytes"], record["sha256"],
+                ),
+                (record["title"], outline_path, record["text"]),
+            )
+        )
+        self.count += 1
+
+    def close(self):
+        try:
+            with self._db:  # 一个事务：成功则提交，出错回滚
+                if self.source is not None:
+                    self._db.execute(
+                        "DELETE FROM chapters_fts WHERE rowid IN "
+                        "(SELECT id FROM chapters WHERE source = ?)",
+                        (self.source,),
+                    )
+                    self._db.execute("DELETE FROM chapters WHERE source = ?", (self.source,))
+                for meta, fts in self._rows:
+                    cur = self._db.execute(
+                        "INSERT INTO chapters (source, chapter, part, title, outline_path,"
+                        " start_page, end_page, pages, file, path, bytes, sha256)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        meta,
+                    )
+                    self._db.execute(
+                        "INSERT INTO chapters_fts (rowid, title, outline_path, text)"
+                        " VALUES (?, ?, ?, ?)",
+                        (cur.lastrowid, *fts),
+                    )
+        finally:
+            self._rows = []
+            self._db.close()
+
+
+def open_index(path, source: str | None = None):
+    """按扩展名选择索引格式：.db / .sqlite / .sqlite3 为 SQLite（FTS5），其余为 JSONL"""
+    if Path(path).suffix.lower() in SQLITE_SUFFIXES:
+        return SqliteIndex(path, source)
+    return JsonlIndex(path, source)
+
+
 # ──────────────────────────────────────────────
 # 核心操作
 # ──────────────────────────────────────────────
 
 
-def list_outline(reader: PdfReader, level: int | None):
+def list_outline(book, level: int | None):
     """打印书签树"""
-    items = get_outline_items(reader)
+    book = as_book(book)
+    items = book.outline_items()
     if not items:
         print("[!] 该 PDF 没有书签/Outline")
         return
 
-    total = len(reader.pages)
+    total = book.page_count
     print(f"共 {total} 页，找到 {len(items)} 条书签：\n")
     print(f"{'层级':>4}  {'起始页':>6}  标题")
     print("─" * 60)
@@ -120,52 +1334,491 @@ def list_outline(reader: PdfReader, level: int | None):
         print(f"{lvl:>4}  {page + 1:>6}  {marker}{title}{flag}")
 
 
-def split_pdf(reader: PdfReader, chapters: list[dict], output_dir: Path, dry_run: bool):
-    """执行切分，dry_run=True 时只打印不写文件"""
-    output_dir.mkdir(parents=True, exist_ok=True)
+def execute_split(
+    book,
+    chapters: list[dict],
+    output_dir: Path,
+    *,
+    outline_items: list[tuple[int, str, int]] | None = None,
+    archive: ArchiveSink | None = None,
+    dry_run: bool = False,
+    overwrite: bool = False,
+    linearize: bool = False,
+    on_result=None,
+    index=None,
+    text_workers: int = 1,
+) -> list[dict]:
+    """
+    库接口：按章节计划写出文件，不打印、不退出，返回每个章节的结果：
+        {**chapter, 'file', 'path', 'status', 'dropped_links', 'bytes', 'error'}
+    status 取值 ok / skipped / failed / dry-run；bytes 为实际写出的字节数。
+    split_by_size() 拆出的部分（带 part / parts）文件名追加 _partK。
+    linearize=True 时输出线性化 PDF（pypdf 引擎见 get_linearizer()，缺少依赖时抛 SplitError）。
+    on_result(result) 在每个章节完成后立即回调，用于流式进度输出。
+    index 为 open_index() 的结果时，每个写出（或已存在而跳过）的章节同时加入索引：
+        {'index', 'part', 'title', 'outline_path', 'start', 'end', 'pages',
+         'file', 'path', 'bytes', 'sha256', 'text'}
+    start/end 为从 1 开始、两端包含的源页码，path 在归档模式下为归档内的文件名；
+    正文由 text_workers 个进程按页并行提取（见 PageTextExtractor），与写出同时进行。
+    """
+    book = as_book(book)
+    output_dir = Path(output_dir)
+    if linearize and not dry_run and book.engine == "pypdf":
+        get_linearizer()  # 开始写出前确认依赖可用
+    if archive is None and not dry_run:
+        output_dir.mkdir(parents=True, exist_ok=True)
 
-    pad = len(str(len(chapters)))  # 序号补零位数
-    ok = skipped = 0
+    keep_outline = outline_items is not None
+    if keep_outline and not dry_run:
+        sub_outlines = assign_outline(outline_items, chapters)
 
-    for ch in chapters:
-        filename = f"{ch['index']:0{pad}d}_{sanitize_filename(ch['title'])}.pdf"
-        out_path = output_dir / filename
-        label = (
-            f"  [{ch['index']:>{pad}}] "
-            f"页 {ch['start'] + 1:>4}–{ch['end']:>4}  "
-            f"({ch['pages']:>3}p)  {ch['title']}"
+    texts = None
+    if index is not None and not dry_run:
+        texts = PageTextExtractor(book, text_workers)
+        texts.prefetch(chapters)  # 工作进程提取正文的同时，主进程写出章节
+        paths = outline_paths(
+            outline_items if keep_outline else book.outline_items(), chapters
         )
 
-        if dry_run:
-            print(label, "→", filename, "[dry-run]")
-            ok += 1
-            continue
+    pad = len(str(max((ch["index"] for ch in chapters), default=0)))  # 序号补零位数
+    results = []
+
+    try:
+        for n, ch in enumerate(chapters):
+            stem = f"{ch['index']:0{pad}d}_{sanitize_filename(ch['title'])}"
+            if "part" in ch:
+                stem += f"_part{ch['part']:0{len(str(ch['parts']))}d}"
+            filename = f"{stem}.pdf"
+            out_path = output_dir / filename
+            result = {
+                **ch,
+                "file": filename,
+                "path": None if archive is not None else str(out_path),
+                "status": "ok",
+                "dropped_links": 0,
+                "bytes": None,
+                "error": None,
+            }
+
+            data = None  # 写出的字节，建索引时用于计算 sha256
+            if dry_run:
+                result["status"] = "dry-run"
+            elif archive is None and out_path.exists() and not overwrite:
+                result["status"] = "skipped"
+                if texts is not None:
+                    data = out_path.read_bytes()
+            else:
+                try:
+                    sub_outline = sub_outlines[n] if keep_outline else None
+                    if archive is not None or texts is not None:
+                        buf = io.BytesIO()
+                        result["dropped_links"] = book.write_chapter(
+                            ch, buf, sub_outline, linearize
+                        )
+                        data = buf.getvalue()
+                        if archive is not None:
+                            archive.add(filename, data)
+                        else:
+                            out_path.write_bytes(data)
+                        result["bytes"] = len(data)
+                    else:
+                        with open(out_path, "wb") as f:
+                            result["dropped_links"] = book.write_chapter(
+                                ch, f, sub_outline, linearize
+                            )
+                            result["bytes"] = f.tell()
+                except Exception as e:
+                    result["status"] = "failed"
+                    result["error"] = str(e)
+
+            if data is not None and result["status"] != "failed":
+                index.add(
+                    {
+                        "index": ch["index"],
+                        "part": ch.get("part"),
+                        "title": ch["title"],
+                        "outline_path": paths[n],
+                        "start": ch["start"] + 1,
+                        "end": ch["end"],
+                        "pages": ch["pages"],
+                        "file": filename,
+                        "path": result["path"] or filename,
+                        "bytes": len(data),
+                        "sha256": hashlib.sha256(data).hexdigest(),
+                        "text": texts.chapter_text(n, ch),
+                    }
+                )
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    finally:
+        if texts is not None:
+            texts.close()
+    return results
+
+
+def split_pdf(
+    book,
+    chapters: list[dict],
+    output_dir: Path,
+    dry_run: bool,
+    outline_items: list[tuple[int, str, int]] | None = None,
+    archive: ArchiveSink | None = None,
+    overwrite: bool = False,
+    linearize: bool = False,
+    index=None,
+    text_workers: int = 1,
+):
+    """
+    执行切分，dry_run=True 时只打印不写文件。
+    传入 outline_items（全部层级书签）时，为每个章节保留其子书签并重写内部链接。
+    传入 archive 时章节写入归档流，output_dir 仅用于显示。
+    传入 index 时同时写出章节索引，见 execute_split()。
+    """
+    pad = len(str(max((ch["index"] for ch in chapters), default=0)))
 
-        # 目标文件已存在时跳过（加 --overwrite 可覆盖，见 argparse）
-        if out_path.exists():
+    def report(r: dict):
+        label = (
+            f"  [{r['index']:>{pad}}] "
+            f"页 {r['start'] + 1:>4}–{r['end']:>4}  "
+            f"({r['pages']:>3}p)  {r['title']}"
+        )
+        if "part" in r:
+            label += f" ({r['part']}/{r['parts']})"
+        if r.get("oversize"):
+            print(
+                f"[警告] 第 {r['start'] + 1} 页单页估算 {format_size(r['est_bytes'])}，"
+                f"超过 --max-size，无法再拆分",
+                file=sys.stderr,
+            )
+        if r["status"] == "dry-run":
+            est = f"  (估算 {format_size(r['est_bytes'])})" if "est_bytes" in r else ""
+            print(label, "→", r["file"], "[dry-run]" + est)
+        elif r["status"] == "skipped":
             print(label, "→ [已存在，跳过]")
-            skipped += 1
-            continue
+        elif r["status"] == "failed":
+            print(label, f"→ [失败: {r['error']}]", file=sys.stderr)
+        else:
+            dropped = r["dropped_links"]
+            size = f"  {format_size(r['bytes'])}" if "est_bytes" in r else ""
+            print(
+                label, "→", r["file"] + size
+                + (f"  (丢弃 {dropped} 个跨章链接)" if dropped else "")
+            )
 
-        try:
-            writer = PdfWriter()
-            for p in range(ch["start"], ch["end"]):
-                writer.add_page(reader.pages[p])
-            with open(out_path, "wb") as f:
-                writer.write(f)
-            print(label, "→", filename)
-            ok += 1
-        except Exception as e:
-            print(label, f"→ [失败: {e}]", file=sys.stderr)
+    results = execute_split(
+        book,
+        chapters,
+        output_dir,
+        outline_items=outline_items,
+        archive=archive,
+        dry_run=dry_run,
+        overwrite=overwrite,
+        linearize=linearize,
+        on_result=report,
+        index=index,
+        text_workers=text_workers,
+    )
+    ok = sum(r["status"] in ("ok", "dry-run") for r in results)
+    skipped = sum(r["status"] == "skipped" for r in results)
 
     print()
     if dry_run:
         print(f"[dry-run] 共 {ok} 个章节（未写入任何文件）")
     else:
+        dest = "<stdout>" if str(output_dir) == "-" else output_dir
         print(
-            f"完成：{ok} 个章节已保存到 {output_dir}"
+            f"完成：{ok} 个章节已保存到 {dest}"
             + (f"，{skipped} 个已跳过" if skipped else "")
         )
+        if index is not None:
+            print(f"索引：{index.count} 条 → {index.path}")
+    return results
+
+
+# ──────────────────────────────────────────────
+# 常驻服务
+# ──────────────────────────────────────────────
+
+READER_CACHE_SIZE = 8
+MAX_FINISHED_JOBS = 1000
+
+
+@lru_cache(maxsize=READER_CACHE_SIZE)
+def _load_book(path: str, mtime_ns: int, size: int, engine: str):
+    # mtime/size 参与缓存键：文件被替换后自动失效
+    book = open_book(path, engine)
+    return book, book.outline_items()
+
+
+def cached_book(path, engine: str = "auto") -> tuple[Book, list[tuple[int, str, int]]]:
+    """按路径取 (book, 全部书签)，最近打开的书保存在进程内 LRU 缓存中"""
+    path = Path(path).resolve()
+    st = path.stat()
+    if engine == "auto":
+        engine = "pikepdf" if have_pikepdf() else "pypdf"
+    return _load_book(str(path), st.st_mtime_ns, st.st_size, engine)
+
+
+def _params_level(params: dict) -> int | None:
+    level = int(params.get("level", 0))
+    return None if level == -1 else level
+
+
+def _plan_from_params(params: dict):
+    book, outline = cached_book(params["input"], params.get("engine", "auto"))
+    chapters = plan_chapters(
+        book,
+        level=_params_level(params),
+        min_pages=int(params.get("min_pages", 1)),
+        ranges=params.get("ranges"),
+        plan=params.get("plan"),
+        outline_items=outline,
+        max_size=parse_size(params["max_size"]) if params.get("max_size") else None,
+    )
+    return book, outline, chapters
+
+
+def _split_job(params: dict) -> list[dict]:
+    """在工作进程中执行的切分任务（模块级函数，便于进程池序列化）"""
+    book, outline, chapters = _plan_from_params(params)
+    input_path = Path(params["input"])
+    output_dir = Path(
+        params.get("output_dir") or input_path.parent / f"{input_path.stem}_chapters"
+    )
+    dry_run = bool(params.get("dry_run"))
+    # 服务已按任务并行，索引正文在本工作进程内提取
+    index = None
+    if params.get("index") and not dry_run:
+        index = open_index(params["index"], str(input_path.resolve()))
+    try:
+        return execute_split(
+            book,
+            chapters,
+            output_dir,
+            outline_items=outline if params.get("bookmarks", True) else None,
+            dry_run=dry_run,
+            overwrite=bool(params.get("overwrite")),
+            linearize=bool(params.get("linearize")),
+            index=index,
+        )
+    finally:
+        if index is not None:
+            index.close()
+
+
+def _preload() -> None:
+    """工作进程预热：触发 pypdf 的延迟导入"""
+    pypdf.PdfReader
+
+
+class SplitService:
+    """
+    作业队列 + 预热进程池。
+    /list 与 /plan 在主进程内用 LRU 缓存直接回答；/split 投递到工作进程，
+    同一本书在同一工作进程内重复切分时也不再重新解析。
+    请求未指定 "engine" 时使用服务启动时的 --engine。
+    """
+
+    def __init__(self, workers: int, engine: str = "auto"):
+        self.engine = engine
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        # 提前拉起全部工作进程并导入 pypdf，首个请求无需等待进程启动与 pypdf 导入
+        for f in [self.pool.submit(_preload) for _ in range(workers)]:
+            f.result()
+        self.jobs: dict[str, dict] = {}
+        self.lock = threading.Lock()  # 保护 jobs，只在读写作业表时短暂持有
+        # 保护主进程内共享的 Book：冷启动解析大书可能要几百毫秒，不能挡住作业查询与完成回调
+        self.book_lock = threading.Lock()
+
+    def list(self, params: dict) -> dict:
+        with self.book_lock:
+            book, outline = cached_book(params["input"], params.get("engine", self.engine))
+            level = _params_level(params) if "level" in params else None
+            return {
+                "pages": book.page_count,
+                "engine": book.engine,
+                "items": [
+                    {"level": lvl, "title": title, "page": page + 1}
+                    for lvl, title, page in filter_by_level(outline, level)
+                ],
+            }
+
+    def plan(self, params: dict) -> dict:
+        with self.book_lock:
+            _, _, chapters = _plan_from_params({"engine": self.engine, **params})
+        return {"chapters": chapters}
+
+    def submit(self, params: dict) -> dict:
+        params = {"engine": self.engine, **params}
+        # 尽早暴露路径与引擎错误；只做检查不解析 PDF，解析留给工作进程
+        path = Path(params["input"])
+        path.stat()  # 不存在或无权访问时抛 OSError
+        if not path.is_file():
+            raise SplitError(f"不是文件: {path}")
+        _check_engine(params["engine"])
+        job_id = uuid.uuid4().hex[:12]
+        job = {"id": job_id, "status": "queued", "submitted": time.time(),
+               "params": params, "results": None, "error": None}
+        with self.lock:
+            self._prune()
+            self.jobs[job_id] = job
+        future = self.pool.submit(_split_job, params)
+        future.add_done_callback(lambda f: self._finish(job, f))
+        return job
+
+    def _finish(self, job: dict, future):
+        # 进程池不回报“开始执行”，queued 直接转为 done / failed
+        with self.lock:
+            try:
+                job["results"] = future.result()
+                job["status"] = "done"
+            except Exception as e:
+                job["error"] = str(e)
+                job["status"] = "failed"
+            job["finished"] = time.time()
+            if "event" in job:
+                job["event"].set()
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j["status"] in ("done", "failed")]
+        for job in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job["id"]]
+
+    def wait(self, job: dict) -> dict:
+        event = threading.Event()
+        with self.lock:
+            if job["status"] in ("done", "failed"):
+                return job
+            job["event"] = event
+        event.wait()
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def _job_view(job: dict) -> dict:
+    return {k: v for k, v in job.items() if k != "event"}
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    service: SplitService  # 由 serve() 注入
+
+    def address_string(self):
+        # Unix socket 下 client_address 不是 (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        print(f"[serve] {self.address_string()} {format % args}", file=sys.stderr)
+
+    def _reply(self, code: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"ok": True, "jobs": len(self.service.jobs)})
+        elif self.path.startswith("/jobs/"):
+            job = self.service.get(self.path.removeprefix("/jobs/"))
+            if job is None:
+                self._reply(404, {"error": "job not found"})
+            else:
+                self._reply(200, _job_view(job))
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(params, dict) or "input" not in params:
+                raise ValueError('请求体必须是包含 "input" 的 JSON 对象')
+            if self.path == "/list":
+                self._reply(200, self.service.list(params))
+            elif self.path == "/plan":
+                self._reply(200, self.service.plan(params))
+            elif self.path == "/split":
+                job = self.service.submit(params)
+                if params.get("wait"):
+                    self._reply(200, _job_view(self.service.wait(job)))
+                else:
+                    self._reply(202, _job_view(job))
+            else:
+                self._reply(404, {"error": "not found"})
+        except (ValueError, OSError, SplitError) as e:
+            self._reply(400, {"error": str(e)})
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+
+
+class _ThreadingHTTPServerV6(ThreadingHTTPServer):
+    address_family = socket.AF_INET6
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _is_loopback(host: str) -> bool:
+    """host 解析出的所有地址都是本机回环地址"""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except OSError:
+        return False
+    return all(ipaddress.ip_address(info[4][0]).is_loopback for info in infos)
+
+
+def _is_socket(path: str) -> bool:
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except OSError:
+        return False
+
+
+def serve(address: str, workers: int, engine: str = "auto"):
+    """
+    启动常驻服务：address 为 host:port 或 unix:/path/to.sock。
+    服务没有认证，请求可读写任意路径，因此 TCP 只允许监听本机回环地址；
+    需要跨用户或跨机器访问时改用权限受控的 unix socket 或在前面加反向代理。
+    """
+    if address.startswith("unix:"):
+        sock_path = address.removeprefix("unix:")
+        # 只清理上次遗留的 socket，同名的普通文件、目录等原样保留并报错
+        if _is_socket(sock_path):
+            os.unlink(sock_path)
+        elif os.path.lexists(sock_path):
+            raise SplitError(f"{sock_path} 已存在且不是 socket，不会覆盖")
+    else:
+        host, _, port = address.rpartition(":")
+        host = host.strip("[]") or "127.0.0.1"
+        if not _is_loopback(host):
+            raise SplitError(f"服务只能监听本机回环地址（127.0.0.1 / ::1 / localhost），不能是 {host}")
+    service = SplitService(workers, engine)
+    handler = type("Handler", (_ServiceHandler,), {"service": service})
+    if address.startswith("unix:"):
+        server = _UnixHTTPServer(sock_path, handler)
+    else:
+        server_class = _ThreadingHTTPServerV6 if ":" in host else ThreadingHTTPServer
+        server = server_class((host, int(port)), handler)
+    print(f"[serve] 监听 {address}，{workers} 个工作进程，引擎 {engine}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if address.startswith("unix:") and _is_socket(sock_path):
+            os.unlink(sock_path)
 
 
 # ──────────────────────────────────────────────
@@ -173,6 +1826,13 @@ def split_pdf(reader: PdfReader, chapters: list[dict], output_dir: Path, dry_run
 # ──────────────────────────────────────────────
 
 
+def _size_arg(text: str) -> int:
+    try:
+        return parse_size(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         prog="pdf_split_chapters",
@@ -183,14 +1843,16 @@ def parse_args():
     parser.add_argument(
         "input",
         metavar="INPUT.pdf",
-        help="输入 PDF 路径",
+        nargs="?",
+        help="输入 PDF 路径，- 表示从 stdin 读取",
     )
     parser.add_argument(
         "-o",
         "--output-dir",
         metavar="DIR",
         default=None,
-        help="输出目录（默认：与输入文件同目录下的 <stem>_chapters/）",
+        help="输出目录（默认：与输入文件同目录下的 <stem>_chapters/）；"
+        "配合 --archive 时为归档文件路径，- 表示 stdout",
     )
     parser.add_argument(
         "-l",
@@ -207,6 +1869,30 @@ def parse_args():
         default=1,
         help="忽略页数少于 N 的章节条目（默认 1）",
     )
+    plan = parser.add_mutually_exclusive_group()
+    plan.add_argument(
+        "--ranges",
+        metavar="SPEC",
+        help='按显式页范围切分，替代书签，如 "1-12:前言,13-40,41-"',
+    )
+    plan.add_argument(
+        "--plan",
+        metavar="PLAN.json",
+        help='按 JSON 章节计划切分：[{"title": ..., "start": 1, "end": 20}, ...]',
+    )
+    parser.add_argument(
+        "--max-size",
+        metavar="SIZE",
+        type=_size_arg,
+        default=None,
+        help="单个输出文件的体积上限，如 50M、2G；超出的章节按页拆成多个部分",
+    )
+    parser.add_argument(
+        "--archive",
+        choices=("tar", "zip"),
+        default=None,
+        help="把所有章节写入单个 tar/zip 归档（可流式输出到 stdout）",
+    )
     parser.add_argument(
         "--list",
         action="store_true",
@@ -217,96 +1903,215 @@ def parse_args():
         action="store_true",
         help="演习模式：打印计划但不写文件",
     )
+    parser.add_argument(
+        "--no-bookmarks",
+        action="store_true",
+        help="不保留章节内书签，也不重写内部链接（旧行为）",
+    )
     parser.add_argument(
         "--overwrite",
         action="store_true",
         help="覆盖已存在的输出文件",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="auto",
+        help="PDF 引擎：pikepdf（libqpdf，更快）或 pypdf；auto 在装有 pikepdf 时用 pikepdf",
+    )
+    parser.add_argument(
+        "--linearize",
+        action="store_true",
+        help="输出线性化（Fast Web View）PDF，浏览器下载首段即可显示第一页；需要 pikepdf 或 qpdf",
+    )
+    parser.add_argument(
+        "--index",
+        metavar="PATH",
+        default=None,
+        help="切分时同时写出章节索引（标题、书签路径、页范围、输出路径、大小、sha256 与正文）："
+        ".jsonl 每行一章、每次重写；.db/.sqlite 为 SQLite FTS5 全文索引，按输入文件替换旧记录",
+    )
+    parser.add_argument(
+        "--index-workers",
+        metavar="N",
+        type=int,
+        default=1,
+        help="--index 并行提取正文的进程数（默认 1，即在本进程内提取；大书可设为 CPU 核数）",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="ADDR",
+        default=None,
+        help="以常驻服务运行：host:port 或 unix:/path.sock；服务无认证、可读写任意路径，"
+        "TCP 只允许本机回环地址",
+    )
+    parser.add_argument(
+        "--workers",
+        metavar="N",
+        type=int,
+        default=os.cpu_count() or 2,
+        help="常驻服务的工作进程数（默认 CPU 核数）",
+    )
+    args = parser.parse_args()
+    if args.input is None and not args.serve:
+        parser.error("缺少输入 PDF 路径")
+    return args
 
 
 def main():
     args = parse_args()
+    if importlib.util.find_spec("pypdf") is None:
+        sys.exit("[错误] 缺少依赖: pip install pypdf")
+
+    if args.serve:
+        try:
+            serve(args.serve, max(1, args.workers), args.engine)
+        except SplitError as e:
+            sys.exit(f"[错误] {e}")
+        return
 
     # ── 输入校验 ──
-    input_path = Path(args.input)
-    if not input_path.exists():
-        sys.exit(f"[错误] 文件不存在: {input_path}")
-    if not input_path.is_file():
-        sys.exit(f"[错误] 不是文件: {input_path}")
-    if input_path.suffix.lower() != ".pdf":
-        print(f"[警告] 文件扩展名不是 .pdf，尝试继续…")
+    from_stdin = args.input == "-"
+    input_path = Path("stdin.pdf" if from_stdin else args.input)
+    if not from_stdin:
+        if not input_path.exists():
+            sys.exit(f"[错误] 文件不存在: {input_path}")
+        if not input_path.is_file():
+            sys.exit(f"[错误] 不是文件: {input_path}")
+        if input_path.suffix.lower() != ".pdf":
+            print(f"[警告] 文件扩展名不是 .pdf，尝试继续…", file=sys.stderr)
+
+    to_stdout = args.archive is not None and args.output_dir == "-"
+    if args.output_dir == "-" and not to_stdout:
+        sys.exit("[错误] 输出到 stdout 需要同时指定 --archive tar|zip")
+
+    # 归档写到 stdout 时，所有提示信息改走 stderr
+    binary_out = sys.stdout.buffer
+    with redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+        _run(args, input_path, from_stdin, binary_out)
 
+
+def _run(args, input_path: Path, from_stdin: bool, binary_out):
     # ── 读取 PDF ──
     try:
-        reader = PdfReader(str(input_path))
+        book = open_book("-" if from_stdin else input_path, args.engine)
+    except SplitError as e:
+        sys.exit(f"[错误] {e}")
     except Exception as e:
         sys.exit(f"[错误] 无法打开 PDF: {e}")
 
-    if len(reader.pages) == 0:
+    if book.page_count == 0:
         sys.exit("[错误] PDF 页数为 0")
 
     # ── --list 模式 ──
     level_arg = None if args.level == -1 else args.level
     if args.list:
-        list_outline(reader, level_arg)
+        list_outline(book, level_arg)
         return
 
-    # ── 提取书签 ──
-    all_items = get_outline_items(reader)
-    if not all_items:
-        sys.exit(
-            "[错误] PDF 没有书签/Outline，无法自动按章节切分。\n"
-            "       → 可改用文本正则识别（方案三），或手动指定页范围。"
-        )
+    # ── 提取书签 / 生成章节计划 ──
+    all_items = book.outline_items()
+    total = book.page_count
 
-    items = filter_by_level(all_items, level_arg)
-    if not items:
-        sys.exit(
-            f"[错误] 层级 {args.level} 下没有书签条目。\n"
-            f"       → 运行 --list 查看可用层级。"
+    try:
+        chapters = plan_chapters(
+            book,
+            level=level_arg,
+            min_pages=args.min_pages,
+            ranges=args.ranges,
+            plan=args.plan,
+            outline_items=all_items,
+            max_size=args.max_size,
         )
-
-    chapters = build_chapters(items, len(reader.pages), args.min_pages)
-    if not chapters:
-        sys.exit(
-            f"[错误] 过滤后（min-pages={args.min_pages}）没有可切分的章节。\n"
-            f"       → 降低 --min-pages 阈值或运行 --list 检查书签。"
+    except SplitError as e:
+        sys.exit(f"[错误] {e}")
+    if args.ranges:
+        plan_desc = "显式页范围"
+    elif args.plan:
+        plan_desc = f"计划 {args.plan}"
+    else:
+        plan_desc = f"层级={args.level}，min-pages={args.min_pages}"
+    if args.max_size:
+        parts = sum("part" in ch for ch in chapters)
+        plan_desc += f"，上限 {format_size(args.max_size)}" + (
+            f"，其中 {parts} 个为拆分出的部分" if parts else ""
         )
 
-    # ── 输出目录 ──
-    if args.output_dir:
+    # ── 输出目录 / 归档 ──
+    archive_target = None
+    if args.archive:
+        if args.output_dir and args.output_dir != "-":
+            archive_target = Path(args.output_dir)
+        elif not args.output_dir:
+            archive_target = input_path.parent / f"{input_path.stem}_chapters.{args.archive}"
+        output_dir = archive_target or Path("-")
+    elif args.output_dir:
         output_dir = Path(args.output_dir)
     else:
         output_dir = input_path.parent / f"{input_path.stem}_chapters"
 
-    # ── 执行 ──
-    print(f"输入：{input_path}  ({len(reader.pages)} 页)")
-    print(f"输出：{output_dir}")
-    print(
-        f"章节：{len(chapters)} 个（层级={args.level}，min-pages={args.min_pages}）\n"
-    )
-
-    # 临时把 overwrite 注入到 split_pdf（简单处理）
-    if args.overwrite:
-        # monkey-patch：让 split_pdf 直接覆盖
-        import builtins
+    if args.linearize and not args.dry_run and book.engine == "pypdf":
+        try:
+            get_linearizer()  # 开始写出前确认依赖可用
+        except SplitError as e:
+            sys.exit(f"[错误] {e}")
 
-        _orig_open = builtins.open
+    # ── 执行 ──
+    print(f"输入：{'<stdin>' if from_stdin else input_path}  ({total} 页，引擎 {book.engine})")
+    print(f"输出：{'<stdout>' if output_dir == Path('-') else output_dir}")
+    print(f"章节：{len(chapters)} 个（{plan_desc}）\n")
 
-        def _open_overwrite(path, mode="r", **kw):
-            return _orig_open(path, mode, **kw)
+    index = None
+    if args.index and not args.dry_run:
+        try:
+            index = open_index(args.index, None if from_stdin else str(input_path.resolve()))
+        except (OSError, SplitError) as e:
+            sys.exit(f"[错误] 无法创建索引 {args.index}: {e}")
 
-        # 直接在 split_pdf 里已经是写模式，overwrite 只需跳过"已存在"判断
-        for ch in chapters:
-            pad = len(str(len(chapters)))
-            filename = f"{ch['index']:0{pad}d}_{sanitize_filename(ch['title'])}.pdf"
-            out_path = output_dir / filename
-            # 提前删掉旧文件让 split_pdf 正常写入
-            if out_path.exists():
-                out_path.unlink()
+    try:
+        outline_items = None if args.no_bookmarks else all_items
+        if not args.archive or args.dry_run:
+            split_pdf(
+                book,
+                chapters,
+                output_dir,
+                dry_run=args.dry_run,
+                outline_items=outline_items,
+                overwrite=args.overwrite,
+                linearize=args.linearize,
+                index=index,
+                text_workers=max(1, args.index_workers),
+            )
+            return
 
-    split_pdf(reader, chapters, output_dir, dry_run=args.dry_run)
+        if archive_target is not None:
+            if archive_target.exists() and not args.overwrite:
+                sys.exit(f"[错误] 归档已存在: {archive_target}（加 --overwrite 覆盖）")
+            stream = open(archive_target, "wb")
+        else:
+            stream = binary_out
+        sink = ArchiveSink(stream, args.archive)
+        try:
+            split_pdf(
+                book,
+                chapters,
+                output_dir,
+                dry_run=False,
+                outline_items=outline_items,
+                archive=sink,
+                linearize=args.linearize,
+                index=index,
+                text_workers=max(1, args.index_workers),
+            )
+        finally:
+            sink.close()
+            if archive_target is not None:
+                stream.close()
+            else:
+                stream.flush()
+    finally:
+        if index is not None:
+            index.close()
 
 
 if __name__ == "__main__":
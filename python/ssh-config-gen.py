@@ -1,5 +1,1119 @@
 #!/usr/bin/env python3
+"""
+ssh-config-gen.py — 从 JSON / JSONL 主机清单生成 ssh config
 
+清单流式读取（不整体载入内存），支持主机组、组继承与通配默认值；
+输出单个文件或按组拆分的 Include 片段，原子写入，内容未变的文件不重写。
+
+用法:
+    python ssh-config-gen.py hosts.json                     # 输出到 stdout
+    python ssh-config-gen.py hosts.jsonl -o ~/.ssh/config.generated
+    python ssh-config-gen.py hosts.json --fragments ~/.ssh/config.d \\
+        --include-in ~/.ssh/config                          # 按组写片段并确保 Include
+    cat hosts.jsonl | python ssh-config-gen.py - --format jsonl
+    python ssh-config-gen.py hosts.json -o out.conf --force # 忽略缓存强制重新生成
+    python ssh-config-gen.py hosts.json -o out.conf --probe # 探测延迟，选最快的跳板机
+
+清单格式（JSON）:
+    {
+      "defaults": [{"match": "*", "options": {"user": "ops", "server_alive_interval": 30}},
+                   {"match": "*.db", "options": {"port": 2222}}],
+      "groups": {"prod": {"options": {"identity_file": "~/.ssh/prod"}},
+                 "web":  {"parent": "prod", "options": {"user": "deploy"}}},
+      "hosts": [{"host": "web-01", "hostname": "10.0.0.11", "groups": ["web"]},
+                {"host": "db-01.db", "hostname": "10.0.1.5", "proxy_jump": "bastion"}]
+    }
+    顶层也可以直接是记录数组。
+
+清单格式（JSONL，每行一条记录）:
+    {"type": "defaults", "match": "*", "options": {"user": "ops"}}
+    {"type": "group", "name": "web", "parent": "prod", "options": {"user": "deploy"}}
+    {"host": "web-01", "hostname": "10.0.0.11", "groups": ["web"]}
+
+选项优先级（后者覆盖前者）: 匹配的 defaults（按出现顺序）→ 主机所属各组（含父组，
+父组在前）→ 主机自身。选项名不区分大小写，可写 snake_case（identity_file）；
+值为 null 表示取消继承来的选项，列表展开为多行（IdentityFile、LocalForward 等）。
+defaults 与 groups 应出现在引用它们的主机之前，这样全程流式处理；
+引用了尚未定义的组的主机会暂存到清单末尾再处理。
+
+多跳板机（jump_candidates）:
+    "groups": {"prod": {"options": {"jump_candidates": ["bastion-sh", "bastion-bj",
+                                                        "ops@203.0.113.9:2222"]}}}
+    候选项可以是清单中的主机别名，或 [user@]host[:port]。不加 --probe 时取第一个
+    作为 ProxyJump；加 --probe 时并发 TCP 连接所有主机与跳板机测量往返时延，
+    取可达且延迟最低的跳板机（全部不可达时仍取第一个）。探测结果按 --probe-ttl
+    缓存，过期前重复运行不再连接。加 --prefer-direct 时，可直连的主机不走跳板机。
+    ProxyJump 与 jump_candidates 按上面的优先级互相覆盖：主机自身（或更具体的组）
+    写了 proxy_jump 时不再使用继承来的候选列表，反之亦然；同一层两者都写时以
+    proxy_jump 为准。
+"""
+
+import argparse
+import asyncio
+import codecs
+import fnmatch
+import hashlib
 import json
+import os
+import ipaddress
+import re
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+VERSION = 2                       # 输出格式版本，变更时缓存全部失效
+CACHE_NAME = ".ssh-config-gen.json"
+CHUNK_SIZE = 1 << 16
+SPOOL_SIZE = 1 << 20              # 片段内容超过该大小才落盘暂存
+FRAGMENT_SUFFIX = ".conf"
+DEFAULT_FRAGMENT = "hosts"
+HEADER = "# 由 ssh-config-gen.py 生成，请勿手动修改\n"
+
+# 主机记录中的保留字段，其余字段均视为 ssh 选项
+HOST_FIELDS = {"type", "host", "aliases", "groups", "group", "fragment", "options"}
+
+# 常用选项的规范写法；其余 snake_case 按单词首字母大写转换
+KNOWN_OPTIONS = {
+    name.lower(): name
+    for name in (
+        "HostName", "User", "Port", "IdentityFile", "IdentitiesOnly", "ProxyJump",
+        "ProxyCommand", "ForwardAgent", "LocalForward", "RemoteForward",
+        "DynamicForward", "ServerAliveInterval", "ServerAliveCountMax",
+        "StrictHostKeyChecking", "UserKnownHostsFile", "ControlMaster", "ControlPath",
+        "ControlPersist", "ConnectTimeout", "Compression", "LogLevel", "SendEnv",
+        "SetEnv", "CertificateFile", "AddKeysToAgent", "PreferredAuthentications",
+        "PubkeyAcceptedAlgorithms", "HostKeyAlias", "RequestTTY", "RemoteCommand",
+    )
+}
+# 这些选项在块内最先输出
+LEADING_OPTIONS = ("HostName", "User", "Port")
+# 取单个路径参数的选项，值含空白时加引号；其余选项的空白视为参数分隔，原样输出
+PATH_OPTIONS = {
+    "IdentityFile", "CertificateFile", "UserKnownHostsFile", "ControlPath", "IdentityAgent",
+}
+# 候选跳板机列表（非 ssh 选项），渲染前换成 ProxyJump
+JUMP_OPTION = "JumpCandidates"
+# 互相替代的选项：某一层设置其中一个时，丢弃更低层继承来的另一个
+EXCLUSIVE_OPTIONS = {"ProxyJump": JUMP_OPTION, JUMP_OPTION: "ProxyJump"}
+
+DEFAULT_PORT = 22
+DEFAULT_PROBE_CONCURRENCY = 1000
+DEFAULT_PROBE_TIMEOUT = 1.0       # 秒，含 DNS 解析与 TCP 握手
+DEFAULT_PROBE_TTL = 600           # 秒
+FD_RESERVE = 64                   # 提高并发时给其他文件描述符留的余量
+DNS_WORKERS = 64                  # 主机名解析线程数（IP 地址不解析）
+
+
+class InventoryError(Exception):
+    """清单格式或内容错误"""
+    pass
+
+
+# ──────────────────────────────────────────────
+# 流式读取
+# ──────────────────────────────────────────────
+
+
+class HashingReader:
+    """包装二进制流：读取时同步计算 sha256，并按 UTF-8 增量解码"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+
+    def read_text(self, size: int = CHUNK_SIZE) -> str:
+        data = self.raw.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._decoder.decode(data, final=not data)
+
+    def lines(self):
+        for raw_line in self.raw:
+            self.sha256.update(raw_line)
+            self.size += len(raw_line)
+            yield raw_line
+
+
+class JsonStream:
+    """
+    在分块读取的文本上逐个解码 JSON 值（json.JSONDecoder.raw_decode），
+    顶层数组与对象的成员逐个产出，单个成员之外不占内存。
+    """
+
+    def __init__(self, reader: HashingReader):
+        self.reader = reader
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.reader.read_text()
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符（EOF 返回空串）"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        got = self.peek()
+        if got != char:
+            raise InventoryError(f"JSON 格式错误: 期望 {char!r}，实际 {got or 'EOF'!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise InventoryError(f"JSON 格式错误: {e}") from None
+            # 数字可能恰好被截断在块尾，读到更多内容再确认
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def array_items(self):
+        """当前位置为 '[' 时，逐个产出数组元素"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            sep = self.peek()
+            self.pos += 1
+            if sep == "]":
+                return
+            if sep != ",":
+                raise InventoryError(f"JSON 格式错误: 数组中出现 {sep or 'EOF'!r}")
+
+    def object_items(self):
+        """当前位置为 '{' 时，逐个产出键；调用方负责消费该键对应的值"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            sep = self.peek()
+            self.pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise InventoryError(f"JSON 格式错误: 对象中出现 {sep or 'EOF'!r}")
+
+
+def _defaults_records(value):
+    """defaults 可以是单个选项字典，或 [{"match", "options"}] 列表"""
+    if isinstance(value, dict):
+        value = [{"match": "*", "options": value}] if "options" not in value else [value]
+    for item in value:
+        yield {"type": "defaults", **item}
+
+
+def _group_records(value: dict):
+    for name, spec in value.items():
+        yield {"type": "group", "name": name, **(spec or {})}
+
+
+def iter_json_records(reader: HashingReader):
+    """JSON 清单：顶层为记录数组，或含 defaults / groups / hosts 的对象"""
+    stream = JsonStream(reader)
+    first = stream.peek()
+    if first == "[":
+        yield from stream.array_items()
+    elif first == "{":
+        for key in stream.object_items():
+            if key == "hosts" and stream.peek() == "[":
+                yield from stream.array_items()
+                continue
+            value = stream.value()
+            if key == "defaults":
+                yield from _defaults_records(value)
+            elif key == "groups":
+                yield from _group_records(value)
+            elif key == "hosts":
+                raise InventoryError("hosts 必须是数组")
+            # 其他顶层键忽略（便于在清单里放注释、元数据）
+    else:
+        raise InventoryError("JSON 清单顶层必须是数组或对象")
+    if stream.peek():
+        raise InventoryError("JSON 清单结尾有多余内容")
+
+
+def iter_jsonl_records(reader: HashingReader):
+    for lineno, line in enumerate(reader.lines(), start=1):
+        line = line.strip()
+        if not line or line.startswith(b"#"):
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise InventoryError(f"第 {lineno} 行 JSON 格式错误: {e}") from None
+
+
+def detect_format(path: str, fmt: str) -> str:
+    if fmt != "auto":
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "json"
+
+
+# ──────────────────────────────────────────────
+# 继承与选项解析
+# ──────────────────────────────────────────────
+
+
+@lru_cache(maxsize=4096)
+def option_name(key: str) -> str:
+    """identity_file / IdentityFile / identityfile → IdentityFile"""
+    lower = key.replace("_", "").replace("-", "").lower()
+    if lower in KNOWN_OPTIONS:
+        return KNOWN_OPTIONS[lower]
+    if "_" in key or "-" in key:
+        return "".join(part[:1].upper() + part[1:] for part in re.split(r"[_-]", key))
+    return key[:1].upper() + key[1:]
+
+
+def normalize_options(options: dict) -> dict:
+    return {option_name(k): v for k, v in options.items()}
+
+
+def merge_options(base: dict, override: dict) -> dict:
+    """override 覆盖 base；值为 None 表示删除"""
+    merged = dict(base)
+    for key, other in EXCLUSIVE_OPTIONS.items():
+        if key in override and other not in override:
+            merged.pop(other, None)
+    for key, value in override.items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+_WS_RE = re.compile(r"\s")
+
+
+def compile_patterns(patterns: list[str]):
+    """通配模式 → 匹配函数；含 "*" 时返回 None 表示匹配所有主机"""
+    if "*" in patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns)).match
+
+
+class Inventory:
+    """
+    清单解析状态：defaults 与 groups 定义，以及组选项（含父组）的解析缓存。
+    同一组合（所属组 + 命中的 defaults）的继承结果只合并一次。
+    """
+
+    def __init__(self):
+        self.defaults: list[tuple[object, dict]] = []
+        self.groups: dict[str, dict] = {}
+        self._resolved: dict[str, dict] = {}
+        self._bases: dict[tuple, dict] = {}
+        self.hosts_seen = 0
+
+    def add_defaults(self, record: dict) -> None:
+        if self.hosts_seen:
+            raise InventoryError("defaults 必须出现在所有主机之前")
+        patterns = _as_list(record.get("match", "*"))
+        options = record.get("options")
+        if options is None:
+            options = {k: v for k, v in record.items() if k not in ("type", "match")}
+        self.defaults.append((compile_patterns(patterns), normalize_options(options)))
+
+    def add_group(self, record: dict) -> None:
+        name = record.get("name")
+        if not name:
+            raise InventoryError(f"组缺少 name: {record}")
+        parents = _as_list(record.get("parents", record.get("parent")))
+        options = record.get("options")
+        if options is None:
+            options = {
+                k: v for k, v in record.items()
+                if k not in ("type", "name", "parent", "parents")
+            }
+        self.groups[name] = {"parents": parents, "options": normalize_options(options)}
+        self._resolved.clear()
+        self._bases.clear()
+
+    def add(self, record: dict) -> dict | None:
+        """登记 defaults / group 记录；主机记录原样返回"""
+        if not isinstance(record, dict):
+            raise InventoryError(f"记录必须是对象: {record!r}")
+        kind = record.get("type", "host")
+        if kind == "defaults":
+            self.add_defaults(record)
+        elif kind == "group":
+            self.add_group(record)
+        elif kind == "host":
+            return record
+        else:
+            raise InventoryError(f"未知记录类型: {kind}")
+        return None
+
+    def missing_groups(self, groups: list[str]) -> list[str]:
+        return [g for g in groups if g not in self.groups]
+
+    @staticmethod
+    def host_groups(host: dict) -> list[str]:
+        return _as_list(host.get("groups", host.get("group")))
+
+    def group_options(self, name: str, chain: tuple = ()) -> dict:
+        if name in self._resolved:
+            return self._resolved[name]
+        if name in chain:
+            raise InventoryError(f"组继承存在循环: {' → '.join(chain + (name,))}")
+        group = self.groups.get(name)
+        if group is None:
+            raise InventoryError(f"未定义的组: {name}")
+        options: dict = {}
+        for parent in group["parents"]:
+            options = merge_options(options, self.group_options(parent, chain + (name,)))
+        options = merge_options(options, group["options"])
+        self._resolved[name] = options
+        return options
+
+    def _base(self, groups: tuple, matched: tuple) -> dict:
+        key = (groups, matched)
+        base = self._bases.get(key)
+        if base is None:
+            base = {}
+            for i in matched:
+                base = merge_options(base, self.defaults[i][1])
+            for group in groups:
+                base = merge_options(base, self.group_options(group))
+            self._bases[key] = base
+        return base
+
+    def resolve(self, host: dict, groups: list[str]) -> tuple[list[str], dict]:
+        """返回 (Host 行的别名列表, 合并后的选项)"""
+        alias = host.get("host")
+        if not alias or not isinstance(alias, str) or _WS_RE.search(alias):
+            raise InventoryError(f"主机缺少合法的 host 字段: {host}")
+        own = dict(host.get("options") or {})
+        own.update({k: v for k, v in host.items() if k not in HOST_FIELDS})
+        own = normalize_options(own)
+
+        names = [alias] + _as_list(host.get("aliases"))
+        hostname = own.get("HostName")
+        candidates = names + [hostname] if isinstance(hostname, str) else names
+        matched = tuple(
+            i for i, (match, _) in enumerate(self.defaults)
+            if match is None or any(match(n) for n in candidates)
+        )
+        return names, merge_options(self._base(tuple(groups), matched), own)
+
+
+def fragment_of(host: dict, groups: list[str]) -> str:
+    """主机所在片段：fragment 字段，否则第一个组，否则 hosts"""
+    name = host.get("fragment") or (groups or [DEFAULT_FRAGMENT])[0]
+    return _fragment_name(str(name))
+
+
+@lru_cache(maxsize=1024)
+def _fragment_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name).strip(".") or DEFAULT_FRAGMENT
+
+
+def _format_value(key: str, value) -> str:
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    text = str(value)
+    if "\n" in text or "\r" in text:
+        raise InventoryError(f"选项 {key} 的值不能包含换行: {text!r}")
+    if not text or (key in PATH_OPTIONS and any(c.isspace() for c in text)):
+        return '"' + text + '"'
+    return text
+
+
+def render_host(names: list[str], options: dict) -> str:
+    lines = [f"Host {' '.join(names)}"]
+    ordered = [k for k in LEADING_OPTIONS if k in options]
+    ordered += [k for k in options if k not in LEADING_OPTIONS]
+    for key in ordered:
+        for value in _as_list(options[key]):
+            lines.append(f"    {key} {_format_value(key, value)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def generate(records, sink, transform=None) -> int:
+    """
+    遍历记录、解析继承并写入 sink，返回主机数。
+    transform(host, names, options) 可在渲染前改写选项（返回新的 options）。
+    """
+    inventory = Inventory()
+    pending: list[dict] = []
+    count = 0
+
+    def emit(host: dict, groups: list[str]) -> None:
+        names, options = inventory.resolve(host, groups)
+        if transform is not None:
+            options = transform(host, names, options)
+        sink.add(fragment_of(host, groups), render_host(names, options))
+
+    for record in records:
+        host = inventory.add(record)
+        if host is None:
+            continue
+        inventory.hosts_seen += 1
+        groups = Inventory.host_groups(host)
+        if inventory.missing_groups(groups):
+            pending.append(host)  # 组稍后才定义，暂存到末尾
+            continue
+        emit(host, groups)
+        count += 1
+    for host in pending:
+        groups = Inventory.host_groups(host)
+        missing = inventory.missing_groups(groups)
+        if missing:
+            raise InventoryError(f"主机 {host.get('host')} 引用了未定义的组: {', '.join(missing)}")
+        emit(host, groups)
+        count += 1
+    return count
+
+
+# ──────────────────────────────────────────────
+# 输出（原子写入 + 内容哈希缓存）
+# ──────────────────────────────────────────────
+
+
+def atomic_write(path: Path, source, mode: int = 0o600) -> None:
+    """把 source（文件对象，从头读取）写到同目录临时文件后 os.replace"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        mode = path.stat().st_mode & 0o777
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            source.seek(0)
+            while chunk := source.read(CHUNK_SIZE):
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def file_sha256(path: Path) -> str | None:
+    if not path.is_file():
+        return None
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class _Spool:
+    """单个输出文件的暂存区：小内容留在内存，边写边算哈希"""
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self.sha256 = hashlib.sha256()
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.file.write(data)
+        self.sha256.update(data)
+
+
+class StreamSink:
+    """直接输出到 stdout，不缓存；按批写出以减少系统调用"""
+
+    BATCH = 256
+
+    def __init__(self, out):
+        self.out = out
+        self.pending = [HEADER]
+
+    def add(self, fragment: str, text: str) -> None:
+        self.pending.append(text)
+        if len(self.pending) >= self.BATCH:
+            self.out.write("".join(self.pending))
+            self.pending.clear()
+
+    def finish(self, previous: dict) -> dict:
+        self.out.write("".join(self.pending))
+        self.pending.clear()
+        self.out.flush()
+        return {}
+
+
+class FileSink:
+    """
+    输出到一个或多个文件。fragments_dir 为空时所有主机写入 path；
+    否则每个片段写入 fragments_dir/<片段名>.conf。
+    内容哈希与上次相同（且文件仍在）的文件不重写，上次有、本次没有的片段删除。
+    """
+
+    def __init__(self, path: Path | None = None, fragments_dir: Path | None = None):
+        self.path = path
+        self.fragments_dir = fragments_dir
+        self.spools: dict[str, _Spool] = {}
+
+    def _target(self, fragment: str) -> Path:
+        if self.fragments_dir is None:
+            return self.path
+        return self.fragments_dir / f"{fragment}{FRAGMENT_SUFFIX}"
+
+    def add(self, fragment: str, text: str) -> None:
+        key = fragment if self.fragments_dir is not None else ""
+        spool = self.spools.get(key)
+        if spool is None:
+            spool = self.spools[key] = _Spool()
+            spool.write(HEADER)
+        spool.write(text)
+
+    def finish(self, previous: dict) -> dict:
+        """写出有变化的文件，返回 {文件名: sha256} 与统计"""
+        if self.fragments_dir is None and not self.spools:
+            self.add("", "")  # 空清单也生成（只有文件头的）配置文件
+        outputs, written, unchanged = {}, [], []
+        for key, spool in self.spools.items():
+            target = self._target(key)
+            digest = spool.sha256.hexdigest()
+            outputs[target.name] = digest
+            old = previous.get(target.name)
+            if old is None or not target.is_file():
+                old = file_sha256(target)
+            if old == digest:
+                unchanged.append(target.name)
+            else:
+                atomic_write(target, spool.file)
+                written.append(target.name)
+            spool.file.close()
+        removed = []
+        if self.fragments_dir is not None:
+            for name in previous:
+                if name not in outputs and (self.fragments_dir / name).is_file():
+                    (self.fragments_dir / name).unlink()
+                    removed.append(name)
+        self.stats = {"written": written, "unchanged": unchanged, "removed": removed}
+        return outputs
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: Path, cache: dict) -> None:
+    buf = tempfile.SpooledTemporaryFile()
+    buf.write(json.dumps(cache, ensure_ascii=False, indent=1).encode("utf-8"))
+    atomic_write(path, buf, mode=0o644)
+
+
+def ensure_include(config_path: Path, fragments_dir: Path) -> bool:
+    """确保 config_path 开头有 Include 片段目录的语句，新增时返回 True"""
+    line = f"Include {fragments_dir.absolute()}/*{FRAGMENT_SUFFIX}"
+    text = config_path.read_text(encoding="utf-8") if config_path.exists() else ""
+    if any(l.strip() == line for l in text.splitlines()):
+        return False
+    # Include 写在所有 Host 块之前才对所有主机生效
+    buf = tempfile.SpooledTemporaryFile()
+    buf.write(f"{line}\n\n{text}".encode("utf-8"))
+    atomic_write(config_path, buf)
+    return True
+
+
+# ──────────────────────────────────────────────
+# 连通性探测与跳板机选择
+# ──────────────────────────────────────────────
+
+
+def parse_endpoint(spec: str) -> tuple[str, int]:
+    """[user@]host[:port] / [user@][v6addr]:port → (host, port)；多跳链只取第一跳"""
+    spec = spec.split(",", 1)[0].strip().rpartition("@")[2]
+    port = ""
+    if spec.startswith("["):
+        host, _, rest = spec[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else ""
+    elif spec.count(":") == 1:
+        host, _, port = spec.partition(":")
+    else:
+        host = spec  # 无端口，或不带括号的 IPv6 地址
+    return host, int(port) if port.isdigit() else DEFAULT_PORT
+
+
+def host_endpoint(names: list[str], options: dict) -> tuple[str, int] | None:
+    """主机实际连接的 (地址, 端口)；通配别名或 HostName 含 % 记号时无法探测"""
+    hostname = options.get("HostName", names[0])
+    if not isinstance(hostname, str) or any(c in hostname for c in "%*?!"):
+        return None
+    try:
+        port = int(options.get("Port", DEFAULT_PORT))
+    except (TypeError, ValueError):
+        return None
+    return hostname, port
+
+
+class ProbePlan:
+    """第一遍扫描清单时收集探测目标：各主机的地址与被引用的候选跳板机"""
+
+    def __init__(self):
+        self.endpoints: dict[str, tuple[str, int]] = {}  # 别名 → (地址, 端口)
+        self.candidates: set[str] = set()
+
+    def transform(self, host: dict, names: list[str], options: dict) -> dict:
+        endpoint = host_endpoint(names, options)
+        if endpoint is not None:
+            for name in names:
+                self.endpoints[name] = endpoint
+        self.candidates.update(_as_list(options.get(JUMP_OPTION)))
+        return options
+
+    def jump_endpoint(self, candidate: str) -> tuple[str, int]:
+        """候选跳板机是清单里的别名时用该主机的地址，否则按 [user@]host[:port] 解析"""
+        first = candidate.split(",", 1)[0].strip().rpartition("@")[2]
+        return self.endpoints.get(first) or parse_endpoint(first)
+
+    def targets(self) -> set[tuple[str, int]]:
+        targets = set(self.endpoints.values())
+        targets.update(self.jump_endpoint(c) for c in self.candidates)
+        return targets
+
+
+class _NullSink:
+    """丢弃输出，仅用于收集探测目标的第一遍扫描"""
+
+    def add(self, fragment: str, text: str) -> None:
+        pass
+
+
+class ProbeCache:
+    """探测结果缓存 {"host:port": [往返毫秒或 null, 探测时间戳]}，过期条目在保存时丢弃"""
+
+    def __init__(self, path: Path, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.entries = load_cache(path) if ttl > 0 else {}
+
+    @staticmethod
+    def _key(target: tuple[str, int]) -> str:
+        return f"{target[0]}:{target[1]}"
+
+    def get(self, target: tuple[str, int], now: float) -> tuple[bool, float | None]:
+        """返回 (是否命中, 往返毫秒)"""
+        entry = self.entries.get(self._key(target))
+        if not isinstance(entry, list) or len(entry) != 2 or now - entry[1] >= self.ttl:
+            return False, None
+        return True, entry[0]
+
+    def update(self, results: dict, now: float) -> None:
+        for target, rtt in results.items():
+            self.entries[self._key(target)] = [None if rtt is None else round(rtt, 3), now]
+
+    def save(self, now: float) -> None:
+        if self.ttl <= 0:
+            return
+        fresh = {
+            k: v for k, v in self.entries.items()
+            if isinstance(v, list) and len(v) == 2 and now - v[1] < self.ttl
+        }
+        save_cache(self.path, fresh)
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+async def probe_endpoint(host: str, port: int, timeout: float) -> float | None:
+    """
+    TCP 握手往返时延（毫秒），握手完成后立即 RST 关闭，不进入 ssh 协议。
+    主机名先解析，解析耗时不计入；解析 + 握手总耗时受 timeout 限制。
+    失败、被拒或超时返回 None。
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        if not _is_ip(host):
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout
+            )
+            host = infos[0][4][0]
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return None
+        start = time.perf_counter()
+        transport, _ = await asyncio.wait_for(
+            loop.create_connection(asyncio.Protocol, host, port), remaining
+        )
+        rtt = (time.perf_counter() - start) * 1000
+    except (OSError, asyncio.TimeoutError):
+        return None
+    transport.abort()
+    return rtt
+
+
+async def probe_all(
+    targets: list[tuple[str, int]], concurrency: int, timeout: float
+) -> dict[tuple[str, int], float | None]:
+    """固定数量的协程从同一迭代器取目标，并发数有上限且不为每个目标建任务"""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=DNS_WORKERS, thread_name_prefix="dns")
+    )
+    results: dict[tuple[str, int], float | None] = {}
+    pending = iter(targets)
+
+    async def worker() -> None:
+        for host, port in pending:
+            results[(host, port)] = await probe_endpoint(host, port, timeout)
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(targets)))))
+    return results
+
+
+def _fd_budget(want: int) -> int:
+    """按需提高文件描述符软限制，返回实际可用的并发连接数"""
+    try:
+        import resource
+    except ImportError:  # Windows 没有 resource 模块
+        return want
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    need = want + FD_RESERVE
+    if soft != resource.RLIM_INFINITY and soft < need:
+        target = need if hard == resource.RLIM_INFINITY else min(need, hard)
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError):
+            pass
+    if soft == resource.RLIM_INFINITY:
+        return want
+    return max(1, min(want, soft - FD_RESERVE))
+
+
+def probe_inventory(args, fmt: str, raw) -> tuple[ProbePlan, dict]:
+    """扫描清单收集目标，探测缓存中没有或已过期的地址，返回 (plan, {地址: 往返毫秒})"""
+    plan = ProbePlan()
+    _, records = _read_records(raw, fmt)
+    generate(records, _NullSink(), plan.transform)
+    targets = plan.targets()
+
+    now = time.time()
+    cache = ProbeCache(_probe_cache_path(args), args.probe_ttl)
+    rtts, stale = {}, []
+    for target in targets:
+        hit, rtt = cache.get(target, now)
+        if hit:
+            rtts[target] = rtt
+        else:
+            stale.append(target)
+
+    started = time.perf_counter()
+    if stale:
+        concurrency = _fd_budget(args.probe_concurrency)
+        results = asyncio.run(probe_all(stale, concurrency, args.probe_timeout))
+        rtts.update(results)
+        now = time.time()
+        cache.update(results, now)
+        cache.save(now)
+    elapsed = time.perf_counter() - started
+
+    reachable = sum(1 for rtt in rtts.values() if rtt is not None)
+    print(
+        f"[探测] {len(targets)} 个地址（缓存命中 {len(targets) - len(stale)}），"
+        f"可达 {reachable}，不可达 {len(targets) - reachable}，耗时 {elapsed * 1000:.0f}ms",
+        file=sys.stderr,
+    )
+    jumps = {c: rtts.get(plan.jump_endpoint(c)) for c in plan.candidates}
+    for candidate, rtt in sorted(jumps.items(), key=lambda kv: (kv[1] is None, kv[1] or 0)):
+        print(
+            f"  跳板机 {candidate}: {'不可达' if rtt is None else f'{rtt:.1f}ms'}",
+            file=sys.stderr,
+        )
+    return plan, rtts
+
+
+def jump_transform(plan: ProbePlan | None = None, rtts: dict | None = None, prefer_direct=False):
+    """
+    把 JumpCandidates 换成 ProxyJump 的 transform。
+    无探测结果时取第一个候选；有结果时取可达且延迟最低的（都不可达时仍取第一个）。
+    prefer_direct 时，探测可直连的主机去掉 ProxyJump。
+    合并后仍有 ProxyJump 说明它与候选列表写在同一层，保留明确指定的 ProxyJump。
+    """
+    chosen: dict[tuple, str] = {}  # 同一候选列表只排序一次
+
+    def best(candidates: tuple) -> str:
+        choice = chosen.get(candidates)
+        if choice is None:
+            ranked = [
+                (rtt, i) for i, c in enumerate(candidates)
+                if (rtt := rtts.get(plan.jump_endpoint(c))) is not None
+            ]
+            choice = chosen[candidates] = candidates[min(ranked)[1] if ranked else 0]
+        return choice
+
+    def transform(host: dict, names: list[str], options: dict) -> dict:
+        candidates = tuple(
+            c for c in _as_list(options.pop(JUMP_OPTION, None))
+            if c.split(",", 1)[0].strip().rpartition("@")[2] not in names  # 跳过自身
+        )
+        if not candidates or "ProxyJump" in options:
+            return options
+        if rtts is None:
+            options["ProxyJump"] = candidates[0]
+            return options
+        if prefer_direct:
+            endpoint = host_endpoint(names, options)
+            if endpoint is not None and rtts.get(endpoint) is not None:
+                options.pop("ProxyJump", None)
+                return options
+        options["ProxyJump"] = best(candidates)
+        return options
+
+    return transform
+
+
+# ──────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="从 JSON / JSONL 主机清单生成 ssh config",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("inventory", help="清单文件（- 表示 stdin）")
+    parser.add_argument(
+        "--format", choices=["auto", "json", "jsonl"], default="auto",
+        help="清单格式（默认按扩展名判断，.jsonl/.ndjson 为 JSONL）",
+    )
+    out = parser.add_mutually_exclusive_group()
+    out.add_argument("-o", "--output", help="输出文件（默认 stdout）")
+    out.add_argument("--fragments", metavar="DIR", help="按组输出 Include 片段到该目录")
+    parser.add_argument(
+        "--include-in", metavar="CONFIG",
+        help="确保该 ssh config 开头 Include 片段目录（需配合 --fragments）",
+    )
+    parser.add_argument("--force", action="store_true", help="忽略缓存，重新生成")
+    probe = parser.add_argument_group("跳板机探测")
+    probe.add_argument(
+        "--probe", action="store_true",
+        help="并发 TCP 连接所有主机与候选跳板机，按延迟选择 ProxyJump",
+    )
+    probe.add_argument(
+        "--probe-concurrency", type=int, default=DEFAULT_PROBE_CONCURRENCY,
+        help=f"同时进行的连接数（默认 {DEFAULT_PROBE_CONCURRENCY}，受文件描述符限制）",
+    )
+    probe.add_argument(
+        "--probe-timeout", type=float, default=DEFAULT_PROBE_TIMEOUT,
+        help=f"单个地址的超时秒数，含 DNS 解析（默认 {DEFAULT_PROBE_TIMEOUT}）",
+    )
+    probe.add_argument(
+        "--probe-ttl", type=float, default=DEFAULT_PROBE_TTL,
+        help=f"探测结果缓存秒数，0 表示不缓存（默认 {DEFAULT_PROBE_TTL}）",
+    )
+    probe.add_argument(
+        "--probe-cache", metavar="FILE",
+        help="探测结果缓存文件（默认 $XDG_CACHE_HOME/ssh-config-gen/probe.json）",
+    )
+    probe.add_argument(
+        "--prefer-direct", action="store_true", help="可直连的主机不走跳板机（需配合 --probe）"
+    )
+    args = parser.parse_args(argv)
+    if args.include_in and not args.fragments:
+        parser.error("--include-in 需要配合 --fragments 使用")
+    if args.prefer_direct and not args.probe:
+        parser.error("--prefer-direct 需要配合 --probe 使用")
+    if args.probe_concurrency < 1 or args.probe_timeout <= 0:
+        parser.error("--probe-concurrency 与 --probe-timeout 必须为正数")
+    return args
+
+
+def _cache_path(args) -> Path | None:
+    if args.fragments:
+        return Path(args.fragments).expanduser() / CACHE_NAME
+    if args.output:
+        out = Path(args.output).expanduser()
+        return out.with_name(f".{out.name}{CACHE_NAME}")
+    return None
+
+
+def _probe_cache_path(args) -> Path:
+    if args.probe_cache:
+        return Path(args.probe_cache).expanduser()
+    base = Path(os.environ.get("XDG_CACHE_HOME") or "~/.cache").expanduser()
+    return base / "ssh-config-gen" / "probe.json"
+
+
+def _read_records(raw, fmt: str):
+    reader = HashingReader(raw)
+    records = iter_jsonl_records(reader) if fmt == "jsonl" else iter_json_records(reader)
+    return reader, records
+
+
+def _settings(fmt: str) -> dict:
+    """影响输出内容的参数，任一变化都视为缓存失效"""
+    return {"version": VERSION, "format": fmt}
+
+
+def run(args, transform=None, settings_extra=None, raw=None, skip_unchanged=True) -> int:
+    """
+    生成配置。raw 为已打开的清单（二进制，从当前位置读），为空时按 args.inventory 打开；
+    skip_unchanged 为 False 时即使清单未变也重新生成（输出还取决于探测结果）。
+    """
+    fmt = detect_format(args.inventory, args.format)
+    from_stdin = args.inventory == "-"
+    cache_path = _cache_path(args)
+    cache = load_cache(cache_path) if cache_path and not args.force else {}
+    settings = {**_settings(fmt), **(settings_extra or {})}
+    if transform is None:
+        transform = jump_transform()
+
+    if args.include_in:
+        config_path = Path(args.include_in).expanduser()
+        if ensure_include(config_path, Path(args.fragments).expanduser()):
+            print(f"[提示] 已在 {config_path} 开头加入 Include", file=sys.stderr)
+
+    stat = None
+    if not from_stdin:
+        path = Path(args.inventory).expanduser()
+        if not path.is_file():
+            sys.exit(f"[错误] 清单文件不存在: {path}")
+        stat = path.stat()
+        cached_input = cache.get("input", {})
+        outputs_exist = all(
+            (cache_path.parent / name).is_file() for name in cache.get("outputs", {})
+        ) if cache_path else False
+        # 清单文件未变（大小与修改时间相同）时直接跳过，不解析
+        if (
+            skip_unchanged
+            and cache_path
+            and cache.get("settings") == settings
+            and cached_input.get("size") == stat.st_size
+            and cached_input.get("mtime_ns") == stat.st_mtime_ns
+            and cache.get("outputs")
+            and outputs_exist
+        ):
+            print("[跳过] 清单未变化", file=sys.stderr)
+            return 0
+
+    if args.fragments:
+        sink = FileSink(fragments_dir=Path(args.fragments).expanduser())
+    elif args.output:
+        sink = FileSink(path=Path(args.output).expanduser())
+    else:
+        sink = StreamSink(sys.stdout)
+
+    started = time.perf_counter()
+    source = raw or (sys.stdin.buffer if from_stdin else open(path, "rb"))
+    try:
+        reader, records = _read_records(source, fmt)
+        count = generate(records, sink, transform)
+    finally:
+        if raw is None and not from_stdin:
+            source.close()
+    previous = cache.get("outputs", {}) if cache.get("settings") == settings else {}
+    outputs = sink.finish(previous)
+    elapsed = time.perf_counter() - started
+
+    if cache_path:
+        cache = {
+            "settings": settings,
+            "input": {
+                "path": str(args.inventory),
+                "size": stat.st_size if stat else reader.size,
+                "mtime_ns": stat.st_mtime_ns if stat else None,
+                "sha256": reader.sha256.hexdigest(),
+            },
+            "outputs": outputs,
+        }
+        save_cache(cache_path, cache)
+        st = sink.stats
+        print(
+            f"[完成] {count} 台主机，写入 {len(st['written'])} 个文件，"
+            f"未变 {len(st['unchanged'])} 个，删除 {len(st['removed'])} 个，"
+            f"耗时 {elapsed * 1000:.0f}ms",
+            file=sys.stderr,
+        )
+        for name in st["written"]:
+            print(f"  写入 {name}", file=sys.stderr)
+        for name in st["removed"]:
+            print(f"  删除 {name}", file=sys.stderr)
+    return count
+
+
+def run_probe(args) -> int:
+    """--probe：读两遍清单（stdin 先暂存），第一遍收集并探测地址，第二遍生成"""
+    fmt = detect_format(args.inventory, args.format)
+    if args.inventory == "-":
+        raw = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        shutil.copyfileobj(sys.stdin.buffer, raw)
+    else:
+        path = Path(args.inventory).expanduser()
+        if not path.is_file():
+            sys.exit(f"[错误] 清单文件不存在: {path}")
+        raw = open(path, "rb")
+    with raw:
+        raw.seek(0)
+        plan, rtts = probe_inventory(args, fmt, raw)
+        raw.seek(0)
+        return run(
+            args,
+            transform=jump_transform(plan, rtts, args.prefer_direct),
+            settings_extra={"probe": True, "prefer_direct": args.prefer_direct},
+            raw=raw,
+            skip_unchanged=False,
+        )
+
+
+def main():
+    args = parse_args()
+    try:
+        if args.probe:
+            run_probe(args)
+        else:
+            run(args)
+    except InventoryError as e:
+        sys.exit(f"[错误] {e}")
+
 
-# read json config to generate ssh config
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+telegram_mock_server.py — 本地模拟 Telegram Bot API 服务器
+
+实现 upload_to_telegram.py 用到的 getMe / sendMessage / sendMediaGroup，
+统计收到的请求体字节数与图片来源（multipart 上传 / file:// 路径），
+用于在不连 Telegram 的情况下测试上传逻辑。
+
+加 --local 时模拟 telegram-bot-api --local：media 可以是 file:///绝对路径，
+服务器直接读取该文件（必须存在且可读），单个文件上限提高到 2000 MB；
+不加 --local 时 file:// 引用按官方服务器的行为报错。
+
+用法:
+    python telegram_mock_server.py --port 8081 --local
+    python telegram_mock_server.py --port 8082 --latency 200   # 模拟远程服务器
+    python telegram_mock_server.py --rate-limit 2              # 每秒超过 2 组返回 429
+    python telegram_mock_server.py --invalid-tokens 2:bad      # 该 token 返回 401
+
+配置 upload_to_telegram.py 使用模拟服务器：
+    python upload_to_telegram.py -t 123:abc -c -100123 -d imgs \\
+        --api_url http://127.0.0.1:8081 --local_api_url http://127.0.0.1:8081
+
+统计接口：
+    GET /stats   请求数、请求体字节数、getMe 次数、按来源统计的图片数等（JSON）
+"""
+
+import argparse
+import email.parser
+import email.policy
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PHOTO_SIZE_LIMIT = 10 * 1024 * 1024
+LOCAL_SIZE_LIMIT = 2000 * 1024 * 1024
+TOKEN_RE = re.compile(r"^/bot(\d+:[\w-]+)/(\w+)$")
+
+
+class MockState:
+    """服务器状态：请求统计与已发送的消息"""
+
+    def __init__(self, args):
+        self.local = args.local
+        self.latency = args.latency / 1000
+        self.rate_limit = args.rate_limit
+        self.invalid_tokens = set(filter(None, args.invalid_tokens.split(",")))
+        self.recent_groups = []  # 最近 1 秒内 sendMediaGroup 的时间
+        self.lock = threading.Lock()
+        self.message_id = 0
+        self.counts = {
+            "requests": 0,
+            "body_bytes": 0,
+            "get_me": 0,
+            "messages": 0,
+            "media_groups": 0,
+            "photos_uploaded": 0,
+            "photos_by_path": 0,
+            "errors": 0,
+            "rate_limited": 0,
+        }
+
+    def add(self, **deltas) -> None:
+        with self.lock:
+            for key, value in deltas.items():
+                self.counts[key] += value
+
+    def over_limit(self) -> bool:
+        """滑动 1 秒窗口内的 sendMediaGroup 数超过 rate_limit 时返回 True"""
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            self.recent_groups = [t for t in self.recent_groups if now - t < 1]
+            if len(self.recent_groups) >= self.rate_limit:
+                self.counts["rate_limited"] += 1
+                return True
+            self.recent_groups.append(now)
+            return False
+
+    def next_message_id(self) -> int:
+        with self.lock:
+            self.message_id += 1
+            return self.message_id
+
+
+class ApiError(Exception):
+    """按 Bot API 的格式返回的错误"""
+
+    def __init__(self, description: str, code: int = 400, retry_after: int | None = None):
+        super().__init__(description)
+        self.code = code
+        self.retry_after = retry_after
+
+
+def parse_form(content_type: str, body: bytes) -> tuple[dict, dict]:
+    """解析表单，返回 (普通字段, {字段名: 文件字节})"""
+    if content_type.startswith("multipart/form-data"):
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+        )
+        fields, files = {}, {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True) or b""
+            if part.get_filename() is not None:
+                files[name] = payload
+            else:
+                fields[name] = payload.decode("utf-8")
+        return fields, files
+    form = parse_qs(body.decode("utf-8"), keep_blank_values=True)
+    return {k: v[0] for k, v in form.items()}, {}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: MockState  # 由 make_server() 注入
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload: dict, code: int = 200) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, fields: dict, files: dict) -> None:
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            with self.state.lock:
+                self._reply({**self.state.counts, "local": self.state.local})
+            return
+        match = TOKEN_RE.match(url.path)
+        if match is None:
+            self._reply({"ok": False, "error_code": 404, "description": "Not Found"}, 404)
+            return
+        token, method = match.groups()
+        if method == "getMe":
+            self.state.add(get_me=1)
+        fields = {**{k: v[0] for k, v in parse_qs(url.query).items()}, **fields}
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        try:
+            result = self._call(token, method, fields, files)
+        except ApiError as e:
+            self.state.add(errors=1)
+            payload = {"ok": False, "error_code": e.code, "description": str(e)}
+            if e.retry_after is not None:
+                payload["parameters"] = {"retry_after": e.retry_after}
+            self._reply(payload, e.code)
+            return
+        self._reply({"ok": True, "result": result})
+
+    def _call(self, token: str, method: str, fields: dict, files: dict):
+        if token in self.state.invalid_tokens:
+            raise ApiError("Unauthorized", 401)
+        if method == "getMe":
+            bot_id = int(token.split(":")[0])
+            return {"id": bot_id, "is_bot": True, "first_name": "mock", "username": f"mock{bot_id}_bot"}
+        if "chat_id" not in fields:
+            raise ApiError("Bad Request: chat_id is empty")
+        if method == "sendMessage":
+            self.state.add(messages=1)
+            return {"message_id": self.state.next_message_id(), "text": fields.get("text", "")}
+        if method == "sendMediaGroup":
+            if self.state.over_limit():
+                raise ApiError("Too Many Requests: retry after 1", 429, retry_after=1)
+            media = json.loads(fields.get("media") or "[]")
+            if not 1 <= len(media) <= 10:
+                raise ApiError("Bad Request: media must include 1-10 items")
+            uploaded = by_path = 0
+            for item in media:
+                size = self._media_size(item.get("media", ""), files)
+                if item.get("media", "").startswith("file://"):
+                    by_path += 1
+                else:
+                    uploaded += 1
+                limit = LOCAL_SIZE_LIMIT if self.state.local else PHOTO_SIZE_LIMIT
+                if size > limit:
+                    raise ApiError("Bad Request: file is too big")
+            self.state.add(media_groups=1, photos_uploaded=uploaded, photos_by_path=by_path)
+            return [{"message_id": self.state.next_message_id()} for _ in media]
+        raise ApiError(f"Not Found: method {method} not found")
+
+    def _media_size(self, ref: str, files: dict) -> int:
+        if ref.startswith("attach://"):
+            data = files.get(ref[len("attach://"):])
+            if data is None:
+                raise ApiError("Bad Request: wrong file identifier/HTTP URL specified")
+            return len(data)
+        if ref.startswith("file://"):
+            path = ref[len("file://"):]
+            if not self.state.local or not os.path.isabs(path):
+                raise ApiError("Bad Request: wrong file identifier/HTTP URL specified")
+            try:
+                with open(path, "rb") as f:  # 与真实服务器一样要求文件可读
+                    return os.fstat(f.fileno()).st_size
+            except OSError:
+                raise ApiError("Bad Request: file not found") from None
+        raise ApiError("Bad Request: wrong file identifier/HTTP URL specified")
+
+    def do_GET(self):
+        self.state.add(requests=1)
+        self._handle({}, {})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        self.state.add(requests=1, body_bytes=len(body))
+        try:
+            fields, files = parse_form(self.headers.get("Content-Type", ""), body)
+        except (ValueError, UnicodeDecodeError):
+            self._reply({"ok": False, "error_code": 400, "description": "Bad Request"}, 400)
+            return
+        self._handle(fields, files)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="本地模拟 Telegram Bot API 服务器",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8081, help="监听端口")
+    parser.add_argument("--local", action="store_true", help="模拟 telegram-bot-api --local")
+    parser.add_argument("--latency", type=float, default=0, help="每个请求的处理延迟（毫秒）")
+    parser.add_argument(
+        "--rate-limit", type=int, default=0, help="每秒最多接受的 sendMediaGroup 数，0 为不限"
+    )
+    parser.add_argument(
+        "--invalid-tokens", default="", help="视为无效的 token，逗号分隔，所有方法返回 401"
+    )
+    return parser.parse_args(argv)
+
+
+def make_server(args) -> ThreadingHTTPServer:
+    state = MockState(args)
+    handler = type("Handler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def main():
+    args = parse_args()
+    server = make_server(args)
+    mode = "本地模式（接受 file://）" if args.local else "远程模式"
+    print(f"模拟 Bot API http://{args.host}:{args.port}  {mode}  延迟 {args.latency}ms")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
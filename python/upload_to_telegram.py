@@ -1,33 +1,93 @@
 import argparse
 import asyncio
+import ctypes
+import ctypes.util
+import hashlib
+import ipaddress
 import json
 import random
+import shutil
+import signal
+import socket
+import statistics
+import struct
+import sys
+import tempfile
 import zipfile
 from io import BytesIO
 import os
 import logging
 import configparser
 from pathlib import Path
-from functools import wraps
+from functools import lru_cache
+from urllib.parse import urlsplit
 import time
 
-import requests
+import httpkit
 
-import aiohttp
-from aiohttp import FormData
-import tqdm
+# aiohttp / tqdm 导入较慢，第一次用到时才加载，--help 与参数错误时不必加载
+aiohttp = httpkit.lazy_import("aiohttp")
+tqdm = httpkit.lazy_import("tqdm")
 
 IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp")
 
+# 官方服务器上传图片的大小上限；本地服务器（telegram-bot-api --local）提高到 2000 MB
+PHOTO_SIZE_LIMIT = 10 * 1024 * 1024
+LOCAL_SIZE_LIMIT = 2000 * 1024 * 1024
+# 压缩包成员交给本地服务器前的解压目录，优先放在内存文件系统
+DEFAULT_STAGING_DIR = "/dev/shm"
+# 本地服务器读不到 file:// 路径时的报错（服务器未开 --local 或不共享文件系统）
+LOCAL_FILE_ERRORS = ("wrong file identifier", "file not found", "file is not readable")
+
+# 监视模式：文件最后一次变化后静置多久才发送（防止发送写了一半的文件）、
+# 凑不满一组时最多等多久、inotify 不可用时的轮询间隔（秒）
+DEFAULT_SETTLE = 2.0
+DEFAULT_BATCH_WINDOW = 5.0
+DEFAULT_POLL_INTERVAL = 5.0
+
+# 自动调节（--auto_tune）：组大小、并发数与请求间隔（相邻两次 sendMediaGroup 开始的间隔）的边界
+MIN_GROUP_SIZE = 1
+MAX_GROUP_SIZE = 10  # sendMediaGroup 的上限
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_INTERVAL = 3.0  # 不自动调节时固定使用
+MIN_INTERVAL = 0.5
+MAX_INTERVAL = 60.0
+RATE_STEP = 0.1  # 加性增：每次把请求速率提高多少组/秒
+TUNE_WINDOW = 5  # 每连续成功多少次请求评估一次
+LATENCY_INFLATION = 1.5  # 单张延迟超过历史最好值的倍数时视为链路拥塞
+DEFAULT_TUNING_FILE = "~/.cache/upload_to_telegram/tuning.json"
+
+# getMe 验证结果缓存
+DEFAULT_TOKEN_CACHE = "~/.cache/upload_to_telegram/tokens.json"
+DEFAULT_TOKEN_TTL = 24 * 3600
+
+# inotify 常量（linux/inotify.h）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")
+
 
 def load_config(config_path):
-    """加载INI配置文件"""
+    """加载INI配置文件，返回 (api_urls, tokens, 本地服务器设置)"""
     config = configparser.ConfigParser()
     config.read(config_path)
 
     api_urls = config.get(
         "Telegram", "api_url", fallback="https://api.telegram.org"
     ).split(",")
+    local = {
+        "local_api_urls": [
+            u for u in config.get("Telegram", "local_api_url", fallback="").split(",") if u.strip()
+        ],
+        "detect_local": config.getboolean("Telegram", "detect_local", fallback=True),
+        "staging_dir": config.get("Telegram", "staging_dir", fallback=None),
+    }
     tokens = []
     for section in config.sections():
         if section.startswith("Token"):
@@ -43,35 +103,85 @@ def load_config(config_path):
     logging.info(f"加载配置文件完成: {len(api_urls)} 个 url")
     for api_url in api_urls:
         logging.info(f"\tapi_url: {api_url}")
-    return api_urls, [token["token"] for token in tokens]
+    return api_urls, [token["token"] for token in tokens], local
+
+
+def normalize_api_url(url):
+    """补全协议（默认 https），去掉结尾的 /"""
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    return url.rstrip("/")
+
+
+@lru_cache(maxsize=1)
+def local_addresses():
+    """本机的 IP 地址"""
+    try:
+        infos = socket.getaddrinfo(socket.gethostname(), None)
+    except OSError:
+        return frozenset()
+    return frozenset(info[4][0] for info in infos)
+
+
+def is_local_api_url(url):
+    """URL 指向回环地址或本机地址时视为本地服务器"""
+    host = urlsplit(url).hostname
+    if not host:
+        return False
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except OSError:
+        return False
+    for info in infos:
+        addr = info[4][0]
+        if ipaddress.ip_address(addr.split("%")[0]).is_loopback or addr in local_addresses():
+            return True
+    return False
 
 
 class UrlPool:
-    def __init__(self, urls):
+    def __init__(self, urls, local_urls=(), detect_local=True):
         """
         初始化URL池
         :param urls: API URL列表
+        :param local_urls: 明确声明为本地服务器（telegram-bot-api --local）的 URL，
+                           不在 urls 中时也加入池；NFS 等无法自动判断的部署用这个
+        :param detect_local: 自动把指向本机地址的 URL 视为本地服务器
         """
         self.urls = []
-        urls = [url.strip() for url in urls]
-        for url in urls:
-            if not url.startswith("https://"):
-                url = f"https://{url}"
-            if url.endswith("/"):
-                url = url.rstrip("/")
-            self.urls.append(url)
-        self.working_urls = [{"url": url, "count": 0} for url in self.urls]
+        for url in list(urls) + list(local_urls):
+            url = normalize_api_url(url)
+            if url not in self.urls:
+                self.urls.append(url)
+        local_urls = {normalize_api_url(url) for url in local_urls}
+        self.working_urls = [
+            {
+                "url": url,
+                "count": 0,
+                "local": url in local_urls or (detect_local and is_local_api_url(url)),
+            }
+            for url in self.urls
+        ]
         logging.info(f"初始化 API URL 池: {len(self.urls)} 个 URL")
+        for u in self.working_urls:
+            if u["local"]:
+                logging.info(f"\t本地服务器（按路径发送文件）: {u['url']}")
 
-    def get_url(self):
-        """获取使用次数最少的URL"""
-        if not self.working_urls:
+    def get_url(self, local_only=False):
+        """
+        获取使用次数最少的URL。有本地服务器时优先使用本地服务器，
+        local_only 时只返回本地服务器（没有则返回 None）
+        """
+        local = [u for u in self.working_urls if u["local"]]
+        pool = local if local or local_only else self.working_urls
+        if not pool:
             return None
 
         # 找到最低使用次数
-        min_count = min(u["count"] for u in self.working_urls)
+        min_count = min(u["count"] for u in pool)
         # 收集所有最低使用次数的URL
-        candidates = [u for u in self.working_urls if u["count"] == min_count]
+        candidates = [u for u in pool if u["count"] == min_count]
         # 随机选择一个
         selected = random.choice(candidates)
         return selected["url"]
@@ -88,33 +198,178 @@ class UrlPool:
         self.working_urls = [u for u in self.working_urls if u["url"] != url_str]
         logging.info(f"移除 URL {url_str}，剩余 URL 数量: {len(self.working_urls)}")
 
+    def is_local(self, url_str):
+        return any(u["local"] for u in self.working_urls if u["url"] == url_str)
+
+    def mark_remote(self, url_str):
+        """本地服务器读不到文件路径时，改回上传文件内容"""
+        for url in self.working_urls:
+            if url["url"] == url_str and url["local"]:
+                url["local"] = False
+                logging.warning(f"{url_str} 无法按路径读取文件，改为上传文件内容")
+
+    def max_file_size(self):
+        """当前可用 URL 能接受的最大文件大小"""
+        if any(u["local"] for u in self.working_urls):
+            return LOCAL_SIZE_LIMIT
+        return PHOTO_SIZE_LIMIT
+
+
+class StagingArea:
+    """
+    压缩包成员的暂存目录：本地服务器只能读文件路径，压缩包成员发送前先解压到这里，
+    发送成功后逐个删除，结束时整体删除。默认建在 /dev/shm（tmpfs）。
+    """
+
+    def __init__(self, base=None):
+        self.base = base
+        self.dir = None
+        self.count = 0
+
+    def extract(self, zip_ref, member):
+        if self.dir is None:
+            base = self.base
+            if base is None and os.path.isdir(DEFAULT_STAGING_DIR):
+                base = DEFAULT_STAGING_DIR
+            self.dir = tempfile.mkdtemp(prefix="tg-upload-", dir=base)
+            # 本地服务器通常以其他用户运行：目录只给执行权限，知道文件名才能读
+            os.chmod(self.dir, 0o711)
+        self.count += 1
+        path = os.path.join(self.dir, f"{self.count:06d}{os.path.splitext(member)[1].lower()}")
+        with zip_ref.open(member) as src, open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.chmod(path, 0o644)
+        return path
+
+    def close(self):
+        if self.dir is not None:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MediaFile:
+    """待发送的图片：目录中的文件（path）或压缩包成员（zip_ref + member），发送时才读取"""
+
+    def __init__(self, name, size, path=None, zip_ref=None, member=None):
+        self.name = name
+        self.size = size
+        self.path = path
+        self.zip_ref = zip_ref
+        self.member = member
+        self.staged = None  # 解压到暂存目录后的路径
+
+    def read(self):
+        if self.path is not None:
+            with open(self.path, "rb") as f:
+                return f.read()
+        with self.zip_ref.open(self.member) as f:
+            return f.read()
+
+    def local_uri(self, staging):
+        """本地服务器可直接读取的 file:// 路径，压缩包成员先解压到暂存目录"""
+        if self.path is not None:
+            return "file://" + os.path.abspath(self.path)
+        if self.staged is None:
+            self.staged = staging.extract(self.zip_ref, self.member)
+        return "file://" + self.staged
+
+    def cleanup(self):
+        if self.staged is not None:
+            try:
+                os.unlink(self.staged)
+            except FileNotFoundError:
+                pass
+            self.staged = None
+
+
+class TokenCache:
+    """
+    getMe 结果的磁盘缓存，按 token + API URL 记录上次验证的结果与时间，ttl 秒内不再重复验证。
+    文件中只保存 token 的哈希，不保存 token 本身。
+    """
+
+    def __init__(self, path, ttl):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.dirty = False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+            if not isinstance(self.entries, dict):
+                self.entries = {}
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _key(token, url):
+        return f"{hashlib.sha256(token.encode()).hexdigest()[:16]}@{url}"
+
+    def get(self, token, url):
+        entry = self.entries.get(self._key(token, url))
+        if not isinstance(entry, dict) or time.time() - entry.get("checked", 0) > self.ttl:
+            return None
+        return entry
+
+    def update(self, token, url, bot, valid=True):
+        self.entries[self._key(token, url)] = {"bot": bot, "valid": valid, "checked": time.time()}
+        self.dirty = True
+
+    def forget(self, token):
+        prefix = self._key(token, "")
+        for key in [k for k in self.entries if k.startswith(prefix)]:
+            del self.entries[key]
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)  # 可以只给文件名
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+class InvalidToken(Exception):
+    """getMe 明确返回失败（token 无效或已被吊销）"""
+
 
 class TokenPool:
-    def __init__(self, url_pool, tokens):
+    """
+    token 不在启动时逐个验证，而是第一次在某个 API URL 上使用前才调用 getMe，
+    结果写入 TokenCache；同一 token + URL 的并发验证只发一次请求。
+    """
+
+    def __init__(self, url_pool, tokens, cache=None):
         self.url_pool = url_pool
         self.tokens = [token.strip() for token in tokens]
-        self.working_tokens = []  # 现在存储字典格式 [{"token": str, "count": int}, ...]
-        self.current_index = 0
-        logging.info(f"初始化 token 池: {len(self.tokens)} 个 token")
-        self.test_tokens()
-        logging.info(f"测试 token 池完成: {len(self.working_tokens)} 个有效 token")
-
-    def test_tokens(self):
-        for token in tqdm.tqdm(self.tokens):
-            url = self.url_pool.get_url()
-            if test_token(url, token):
-                logging.info(f"token {token} 测试成功")
-                self.working_tokens.append(
-                    {"token": token, "count": 0}
-                )  # 初始化计数为0
-            else:
-                logging.error(f"token {token} 测试失败")
-            self.url_pool.increment_url(url)
+        # [{"token": str, "count": int}, ...]，未验证的 token 也在其中，使用前验证
+        self.working_tokens = [{"token": token, "count": 0} for token in self.tokens]
+        self.cache = cache
+        self.verified = set()  # 本次运行中已验证的 (token, url)
+        self.checks = {}  # (token, url) → 进行中的验证任务
+        logging.info(f"初始化 token 池: {len(self.tokens)} 个 token（首次使用时验证）")
 
-    def get_token(self):
-        if not self.working_tokens:
-            return None
+    async def get_token(self, url):
+        """取一个在 url 上验证过的 token；验证失败的 token 移出池子，全部失败时返回 None"""
+        while self.working_tokens:
+            token = self._pick()
+            try:
+                await self._verify(token, url)
+                return token
+            except InvalidToken as e:
+                logging.error(f"token {token} 测试失败: {e}")
+                self.remove_token(token, forget=False)
+        return None
 
+    def _pick(self):
         # 找到最低使用次数
         min_count = min(t["count"] for t in self.working_tokens)
         # 收集所有最低使用次数的token
@@ -123,6 +378,34 @@ class TokenPool:
         selected = random.choice(candidates)
         return selected["token"]
 
+    async def _verify(self, token, url):
+        key = (token, url)
+        if key in self.verified:
+            return
+        cached = self.cache.get(token, url) if self.cache is not None else None
+        if cached:
+            if not cached.get("valid", True):
+                raise InvalidToken(f"{url} 上次验证失败（缓存）")
+            self.verified.add(key)
+            return
+        task = self.checks.get(key)
+        if task is None:
+            task = self.checks[key] = asyncio.ensure_future(
+                test_token(url, token, self.url_pool.is_local(url))
+            )
+        try:
+            bot = await task
+        except InvalidToken:
+            if self.cache is not None:
+                self.cache.update(token, url, None, valid=False)
+            raise
+        finally:
+            self.checks.pop(key, None)
+        logging.info(f"token {token} 在 {url} 测试成功: @{bot}")
+        self.verified.add(key)
+        if self.cache is not None:
+            self.cache.update(token, url, bot)
+
     def increment_token(self, token_str):
         """增加指定token的使用计数"""
         for token in self.working_tokens:
@@ -130,120 +413,316 @@ class TokenPool:
                 token["count"] += 1
                 break
 
-    def remove_token(self, token_str):
-        """移除指定token"""
+    def remove_token(self, token_str, forget=True):
+        """移除指定token；forget 为 True 时同时清除它的验证缓存，下次运行重新验证"""
         self.working_tokens = [
             t for t in self.working_tokens if t["token"] != token_str
         ]
+        self.verified = {k for k in self.verified if k[0] != token_str}
+        if forget and self.cache is not None:
+            self.cache.forget(token_str)
         logging.info(
             f"移除 token {token_str}，剩余 token 数量: {len(self.working_tokens)}"
         )
 
 
-async def wait_for_seconds(seconds):
-    await asyncio.sleep(seconds)
+# 所有 Bot API 请求共用一个连接池；重试由 send_* 的 retrying 整体进行（每次重建表单），
+# 这里不再重试。本地服务器（local）直连，不走代理
+HTTP = httpkit.HttpClient(
+    limit_per_host=DEFAULT_MAX_CONCURRENCY + 2,
+    retry=httpkit.Retry(attempts=1),
+    metrics=httpkit.HttpMetrics(),
+)
 
 
-def get_proxy_from_env():
-    """从环境变量获取代理设置"""
-    https_proxy = os.environ.get("https_proxy") or os.environ.get("HTTPS_PROXY")
-    if https_proxy:
-        logging.info(f"使用系统代理: {https_proxy}")
-        return https_proxy
-    return None
+async def test_token(url, bot_token, local=False):
+    """
+    调用 getMe，返回机器人用户名；服务器明确拒绝时抛 InvalidToken，
+    网络错误原样抛出（与 token 无关，交给调用方的重试处理）。
+    """
+    response = await HTTP.request("GET", f"{url}/bot{bot_token}/getMe", direct=local)
+    json_data = response.json()
+    if not json_data.get("ok"):
+        raise InvalidToken(json_data.get("description", "未知错误"))
+    return json_data["result"].get("username")
 
 
-def test_token(url, bot_token):
-    url = f"{url}/bot{bot_token}/getMe"
-    proxy = get_proxy_from_env()
-    try:
-        response = requests.get(url, proxies={"https": proxy} if proxy else None)
-        json_data = response.json()
-        logging.info(f"使用 {url} 测试 token 返回: {json_data}")
-        if json_data.get("ok"):
-            return True
+class AutoTuner:
+    """
+    组大小、并发数与请求间隔的 AIMD 闭环调节，输入为每次请求的图片数、耗时与结果。
+    被限流：并发减半、间隔加倍且不小于 retry_after；其他失败另把组大小减一。
+    连续 TUNE_WINDOW 次成功：单张延迟明显高于历史最好值时并发减一，
+    否则依次尝试加大组、提高请求速率（RATE_STEP）、增加并发，每次只调一项。
+    所有请求（含重试）发出前经 wait_turn 按间隔排队。
+    enabled 为 False 时参数固定不变，只做统计。
+    """
+
+    KNOBS = ("group_size", "interval", "concurrency")
+
+    def __init__(
+        self,
+        group_size=4,
+        concurrency=1,
+        interval=DEFAULT_INTERVAL,
+        enabled=False,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+    ):
+        self.group_size = group_size
+        self.concurrency = concurrency
+        self.interval = interval
+        self.enabled = enabled
+        self.max_concurrency = max_concurrency
+        self.best_latency = None  # 单张图片的历史最好延迟
+        self.next_knob = 0
+        self.last_decrease = 0.0
+        self.next_start = 0.0
+        self.started = time.monotonic()
+        self.images = 0
+        self.requests = 0
+        self.errors = 0
+        self._reset_window()
+
+    def _reset_window(self):
+        self.window = []  # [(图片数, 耗时)]
+        self.window_started = time.monotonic()
+
+    def describe(self):
+        return f"组 {self.group_size} 张，并发 {self.concurrency}，间隔 {self.interval:.1f}s"
+
+    def state(self):
+        return {
+            "group_size": self.group_size,
+            "concurrency": self.concurrency,
+            "interval": self.interval,
+        }
+
+    def restore(self, state):
+        """载入保存的参数，并限制在边界内"""
+        self.group_size = min(max(int(state.get("group_size", self.group_size)), MIN_GROUP_SIZE), MAX_GROUP_SIZE)
+        self.concurrency = min(max(int(state.get("concurrency", self.concurrency)), 1), self.max_concurrency)
+        self.interval = min(max(float(state.get("interval", self.interval)), MIN_INTERVAL), MAX_INTERVAL)
+
+    async def wait_turn(self):
+        """等到距上一次请求开始已满 interval 秒"""
+        loop = asyncio.get_running_loop()
+        start = max(loop.time(), self.next_start)
+        self.next_start = start + self.interval
+        if start > loop.time():
+            await asyncio.sleep(start - loop.time())
+
+    def record(self, images, latency, ok, retry_after=None):
+        now = time.monotonic()
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+            # 在上次降速之前就发出的请求反映的是旧参数，不再重复降速
+            if self.enabled and now - latency >= self.last_decrease:
+                before = self.describe()
+                self.concurrency = max(1, self.concurrency // 2)
+                self.interval = min(MAX_INTERVAL, max(self.interval * 2, retry_after or 0))
+                if not retry_after:
+                    # 限流按请求数计，缩小组只会更慢；其他失败（超时等）才缩小请求
+                    self.group_size = max(MIN_GROUP_SIZE, self.group_size - 1)
+                self.last_decrease = now
+                reason = f"被限流 retry_after={retry_after}" if retry_after else "请求失败"
+                logging.info(f"[调节] {reason}: {before} → {self.describe()}")
+            self._reset_window()
+            return
+        self.images += images
+        self.window.append((images, latency))
+        if len(self.window) >= TUNE_WINDOW:
+            self._evaluate()
+
+    def _evaluate(self):
+        images = sum(n for n, _ in self.window)
+        elapsed = time.monotonic() - self.window_started
+        per_image = statistics.median(t / max(n, 1) for n, t in self.window)
+        if self.best_latency is None or per_image < self.best_latency:
+            self.best_latency = per_image
+        before = self.describe()
+        if not self.enabled:
+            reason = None
+        elif per_image > self.best_latency * LATENCY_INFLATION and self.concurrency > 1:
+            self.concurrency -= 1
+            reason = "延迟上升"
         else:
-            return False
-    except Exception as e:
-        logging.error(f"使用 {url} 测试 token 失败: {e}")
+            reason = "全部成功" if self._increase() else None
+        logging.info(
+            f"[调节] {images / elapsed if elapsed > 0 else 0:.1f} 张/秒，"
+            f"单张延迟 {per_image * 1000:.0f}ms（最好 {self.best_latency * 1000:.0f}ms）"
+            + (f"，{reason}: {before} → {self.describe()}" if reason else f"，保持 {before}")
+        )
+        self._reset_window()
+
+    def _increase(self):
+        """加性增：从上次调过的下一项开始，找一项还没到边界的调整"""
+        for i in range(len(self.KNOBS)):
+            knob = self.KNOBS[(self.next_knob + i) % len(self.KNOBS)]
+            if knob == "group_size" and self.group_size < MAX_GROUP_SIZE:
+                self.group_size += 1
+            elif knob == "interval" and self.interval > MIN_INTERVAL:
+                self.interval = max(MIN_INTERVAL, 1 / (1 / self.interval + RATE_STEP))
+            elif knob == "concurrency" and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+            else:
+                continue
+            self.next_knob = (self.next_knob + i + 1) % len(self.KNOBS)
+            return True
         return False
 
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.images / elapsed if elapsed > 0 else 0
+        return (
+            f"共 {self.images} 张，{self.requests} 次请求，失败 {self.errors} 次，"
+            f"平均 {rate:.2f} 张/秒，最终参数: {self.describe()}"
+        )
+
 
-def retry_async(max_retries=3, delay=3):
-    """异步重试装饰器"""
+def tuning_key(url_pool):
+    """调节结果按 API URL 保存：有本地服务器时用本地服务器，否则用第一个 URL"""
+    for u in url_pool.working_urls:
+        if u["local"]:
+            return u["url"]
+    return url_pool.urls[0]
+
+
+def load_tuning(path, key):
+    try:
+        with open(os.path.expanduser(path), encoding="utf-8") as f:
+            return json.load(f).get(key)
+    except (OSError, ValueError, AttributeError):
+        return None
 
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            retries = 0
-            while retries < max_retries:
-                try:
-                    return await func(*args, **kwargs)
-                except Exception as e:
-                    retries += 1
-                    if retries == max_retries:
-                        logging.error(f"重试{max_retries}次后仍然失败: {str(e)}")
-                        raise
-                    logging.warning(
-                        f"操作失败，{delay}秒后进行第{retries}次重试: {str(e)}"
-                    )
-                    await asyncio.sleep(delay)
-            return None
 
-        return wrapper
+def save_tuning(path, key, tuner):
+    path = os.path.expanduser(path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            data = {}
+    except (OSError, ValueError):
+        data = {}
+    data[key] = {**tuner.state(), "updated": time.strftime("%Y-%m-%d %H:%M:%S")}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)  # 可以只给文件名
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    logging.info(f"[调节] 已保存 {key} 的参数到 {path}: {tuner.describe()}")
+
 
-    return decorator
+class GroupSender:
+    """
+    按 tuner 当前的并发数在后台发送媒体组（请求间隔由 tuner.wait_turn 控制）。并发大于 1 时，
+    频道中媒体组的先后顺序可能与文件顺序不同。
+    skip_errors 为 False 时，某组重试后仍失败会在之后的 submit / drain 中抛出。
+    """
+
+    def __init__(self, url_pool, token_pool, channel_id, tuner, staging=None, skip_errors=False):
+        self.url_pool = url_pool
+        self.token_pool = token_pool
+        self.channel_id = channel_id
+        self.tuner = tuner
+        self.staging = staging
+        self.skip_errors = skip_errors
+        self.inflight = set()
+        self.error = None
 
+    @property
+    def group_size(self):
+        return self.tuner.group_size
+
+    async def submit(self, media_files, group_index):
+        """等到有空闲并发后，在后台发送这一组"""
+        while len(self.inflight) >= self.tuner.concurrency:
+            await asyncio.wait(self.inflight, return_when=asyncio.FIRST_COMPLETED)
+        self._raise_error()
+        task = asyncio.create_task(self._send(media_files, group_index))
+        self.inflight.add(task)
+        task.add_done_callback(self.inflight.discard)
+
+    async def _send(self, media_files, group_index):
+        try:
+            await send_media_group(
+                self.url_pool,
+                self.token_pool,
+                self.channel_id,
+                media_files,
+                group_index,
+                self.staging,
+                self.tuner,
+            )
+            logging.info(f"发送媒体组 {group_index}（{len(media_files)} 张）完成")
+        except Exception as e:
+            usable = bool(self.token_pool.working_tokens) and self.url_pool.get_url() is not None
+            if self.skip_errors and usable:
+                logging.error(f"媒体组 {group_index} 发送失败，跳过: {e}")
+            elif self.error is None:
+                self.error = e
 
-@retry_async(max_retries=3, delay=3)
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    async def drain(self):
+        """等待所有在途的组发送完"""
+        if self.inflight:
+            await asyncio.gather(*self.inflight)
+        self._raise_error()
+
+
+@httpkit.retrying(httpkit.Retry(attempts=3, delay=3))
 async def send_message(url_pool, token_pool, channel_id, message):
     """发送消息（带重试）"""
     api_url = url_pool.get_url()
-    bot_token = token_pool.get_token()
+    bot_token = await token_pool.get_token(api_url)
+    if bot_token is None:
+        raise Exception("没有可用的 token")
     url = f"{api_url}/bot{bot_token}/sendMessage"
-    form_data = FormData()
+    form_data = aiohttp.FormData()
     form_data.add_field("chat_id", str(channel_id))
     form_data.add_field("text", message)
 
-    proxy = get_proxy_from_env()
-    async with aiohttp.ClientSession() as session:
-        if proxy:
-            connector = aiohttp.TCPConnector(ssl=False)
-            session._connector = connector
-            async with session.post(url, data=form_data, proxy=proxy) as response:
-                json_data = await response.json()
-                if json_data.get("ok"):
-                    logging.info(f"发送消息成功")
-                    token_pool.increment_token(bot_token)
-                    url_pool.increment_url(api_url)
-                    return True
-                else:
-                    error_msg = json_data.get("description", "未知错误")
-                    logging.error(f"发送消息失败: {error_msg}")
-                    if "Too Many Requests" in error_msg:
-                        await asyncio.sleep(5)  # 特殊处理请求限制错误
-                    token_pool.remove_token(bot_token)
-                    raise Exception(f"发送失败: {error_msg}")
-        else:
-            async with session.post(url, data=form_data) as response:
-                json_data = await response.json()
-                if json_data.get("ok"):
-                    logging.info(f"发送消息成功")
-                    token_pool.increment_token(bot_token)
-                    url_pool.increment_url(api_url)
-                    return True
-                else:
-                    error_msg = json_data.get("description", "未知错误")
-                    logging.error(f"发送消息失败: {error_msg}")
-                    token_pool.remove_token(bot_token)
-                    raise Exception(f"发送失败: {error_msg}")
-
-
-@retry_async(max_retries=3, delay=3)
-async def send_media_group(url_pool, token_pool, channel_id, media_files, group_index):
-    """发送媒体组（带重试）"""
-    api_url = url_pool.get_url()
-    bot_token = token_pool.get_token()
+    local = url_pool.is_local(api_url)
+    response = await HTTP.request("POST", url, data=form_data, direct=local)
+    json_data = response.json()
+    if json_data.get("ok"):
+        logging.info(f"发送消息成功")
+        token_pool.increment_token(bot_token)
+        url_pool.increment_url(api_url)
+        return True
+
+    error_msg = json_data.get("description", "未知错误")
+    logging.error(f"发送消息失败: {error_msg}")
+    if json_data.get("error_code") == 429 or "Too Many Requests" in error_msg:
+        # 限流与 token 是否有效无关，等服务器要求的时间后重试
+        await asyncio.sleep((json_data.get("parameters") or {}).get("retry_after") or 5)
+    else:
+        token_pool.remove_token(bot_token)
+    raise Exception(f"发送失败: {error_msg}")
+
+
+@httpkit.retrying(httpkit.Retry(attempts=3, delay=3))
+async def send_media_group(
+    url_pool, token_pool, channel_id, media_files, group_index, staging, tuner=None
+):
+    """
+    发送媒体组（带重试）。本地服务器按 file:// 路径引用文件，不上传文件内容；
+    超过官方大小限制的图片只发往本地服务器。每次请求的结果与耗时报告给 tuner。
+    """
+    if tuner is not None:
+        await tuner.wait_turn()
+    need_local = any(f.size > PHOTO_SIZE_LIMIT for f in media_files)
+    api_url = url_pool.get_url(local_only=need_local)
+    if api_url is None:
+        raise Exception(f"媒体组 {group_index} 含超过 {PHOTO_SIZE_LIMIT >> 20} MB 的图片，没有可用的本地服务器")
+    local = url_pool.is_local(api_url)
+    bot_token = await token_pool.get_token(api_url)
+    if bot_token is None:
+        raise Exception("没有可用的 token")
     url = f"{api_url}/bot{bot_token}/sendMediaGroup"
     media_list = []
 
@@ -252,50 +731,54 @@ async def send_media_group(url_pool, token_pool, channel_id, media_files, group_
     form_data.add_field("chat_id", str(channel_id))
 
     # 构造媒体组数据
-    for i, (filename, image_data) in enumerate(media_files):
+    for i, media_file in enumerate(media_files):
+        if local:
+            media_list.append({"type": "photo", "media": media_file.local_uri(staging)})
+            continue
         file_key = f"file{i}"
         media_item = {"type": "photo", "media": f"attach://{file_key}"}
         media_list.append(media_item)
         # 添加文件到表单数据
         form_data.add_field(
-            file_key, image_data, filename=filename, content_type="image/jpeg"
+            file_key, media_file.read(), filename=media_file.name, content_type="image/jpeg"
         )
 
     form_data.add_field("media", json.dumps(media_list))
 
-    proxy = get_proxy_from_env()
-    async with aiohttp.ClientSession() as session:
-        if proxy:
-            connector = aiohttp.TCPConnector(ssl=False)
-            session._connector = connector
-            async with session.post(url, data=form_data, proxy=proxy) as response:
-                json_data = await response.json()
-                if json_data.get("ok"):
-                    # logging.info(f"发送媒体组 {group_index} 成功")
-                    token_pool.increment_token(bot_token)
-                    url_pool.increment_url(api_url)
-                    return True
-                else:
-                    error_msg = json_data.get("description", "未知错误")
-                    logging.error(f"发送媒体组 {group_index} 失败: {error_msg}")
-                    if "Too Many Requests" in error_msg:
-                        await asyncio.sleep(5)
-                    token_pool.remove_token(bot_token)
-                    raise Exception(f"发送失败: {error_msg}")
-        else:
-            async with session.post(url, data=form_data) as response:
-                json_data = await response.json()
-                if json_data.get("ok"):
-                    # logging.info(f"发送媒体组 {group_index} 成功")
-                    token_pool.increment_token(bot_token)
-                    url_pool.increment_url(api_url)
-                    return True
-                else:
-                    error_msg = json_data.get("description", "未知错误")
-                    logging.error(f"发送媒体组 {group_index} 失败: {error_msg}")
-                    token_pool.remove_token(bot_token)
-                    raise Exception(f"发送失败: {error_msg}")
+    started = time.monotonic()
+    try:
+        response = await HTTP.request("POST", url, data=form_data, direct=local)
+        json_data = response.json()
+    except Exception:
+        if tuner is not None:
+            tuner.record(len(media_files), time.monotonic() - started, ok=False)
+        raise
+    latency = time.monotonic() - started
 
+    if json_data.get("ok"):
+        # logging.info(f"发送媒体组 {group_index} 成功")
+        if tuner is not None:
+            tuner.record(len(media_files), latency, ok=True)
+        token_pool.increment_token(bot_token)
+        url_pool.increment_url(api_url)
+        for media_file in media_files:
+            media_file.cleanup()
+        return True
+
+    error_msg = json_data.get("description", "未知错误")
+    logging.error(f"发送媒体组 {group_index} 失败: {error_msg}")
+    retry_after = (json_data.get("parameters") or {}).get("retry_after")
+    if tuner is not None:
+        tuner.record(len(media_files), latency, ok=False, retry_after=retry_after)
+    if json_data.get("error_code") == 429 or "Too Many Requests" in error_msg:
+        # 限流与 token 是否有效无关，等服务器要求的时间后重试
+        await asyncio.sleep(retry_after or 5)
+    elif local and any(e in error_msg.lower() for e in LOCAL_FILE_ERRORS):
+        # 路径问题与 token 无关，下次重试改为上传文件内容
+        url_pool.mark_remote(api_url)
+    else:
+        token_pool.remove_token(bot_token)
+    raise Exception(f"发送失败: {error_msg}")
 
 async def send_images_from_dir(
     url_pool,
@@ -305,109 +788,116 @@ async def send_images_from_dir(
     group_size=4,
     start_index=0,
     end_index=0,
+    tuner=None,
 ):
     media_files = []
     group_index = 0
     idx = 0
+    # start_index / end_index 按初始组大小换算成图片序号
+    sender = GroupSender(url_pool, token_pool, channel_id, tuner or AutoTuner(group_size))
 
     # 递归获取所有子目录中的图片文件
     all_files = []
+    max_size = url_pool.max_file_size()
     for root, _, files in os.walk(image_dir):
         for file in files:
             if file.lower().endswith(IMAGE_EXTENSIONS):
                 full_path = os.path.join(root, file)
                 if os.path.isfile(full_path):
-                    all_files.append((full_path, file))
+                    size = os.path.getsize(full_path)
+                    if size > max_size:
+                        logging.warning(f"跳过超过 {max_size >> 20} MB 的图片: {full_path}")
+                        continue
+                    all_files.append((full_path, file, size))
     
     await send_message(
         url_pool, token_pool, channel_id, f"开始上传图片，共 {len(all_files)} 张"
     )
 
-    for full_path, file_name in tqdm.tqdm(all_files):
+    for full_path, file_name, size in tqdm.tqdm(all_files):
         if idx >= start_index * group_size and (
             end_index == 0 or idx <= end_index * group_size
         ):
         #     logging.info(f"处理文件: {full_path}")
-            with open(full_path, "rb") as image_file:
-                media_files.append((file_name, image_file.read()))
-                if len(media_files) >= group_size:
-                    await send_media_group(
-                        url_pool,
-                        token_pool,
-                        channel_id,
-                        media_files,
-                        group_index,
-                    )
-                    media_files = []
-                    group_index += 1
-                    logging.info(f"发送媒体组 {group_index} 完成")
-                    await wait_for_seconds(3)
+            # 只记录路径，发送时才读取：本地服务器按路径引用，不读文件内容
+            media_files.append(MediaFile(file_name, size, path=full_path))
+            if len(media_files) >= sender.group_size:
+                await sender.submit(media_files, group_index)
+                media_files = []
+                group_index += 1
                 if group_index % 10 == 0:
-                        await send_message(
+                    await send_message(
                         url_pool,
                         token_pool,
                         channel_id,
-                        f"发送媒体组 {group_index}/{len(all_files) // group_size} 完成",
-                        )
+                        f"发送媒体组 {group_index} 完成，{idx + 1}/{len(all_files)} 张",
+                    )
         idx += 1
 
     if media_files:
-        await send_media_group(
-            url_pool, token_pool, channel_id, media_files, group_index
-        )
+        await sender.submit(media_files, group_index)
+    await sender.drain()
+    if media_files:
         await send_message(
             url_pool, token_pool, channel_id, f"从目录 {image_dir} 上传图片完成"
         )
 
 
 async def send_images_from_zip(
-    url_pool, token_pool, channel_id, zip_file, group_size=4, start_index=1, end_index=0
+    url_pool,
+    token_pool,
+    channel_id,
+    zip_file,
+    group_size=4,
+    start_index=1,
+    end_index=0,
+    staging_dir=None,
+    tuner=None,
 ):
     media_files = []
     group_index = 0
     idx = 0
-    with zipfile.ZipFile(zip_file, "r") as zip_ref:
+    max_size = url_pool.max_file_size()
+    tuner = tuner or AutoTuner(group_size)
+    with zipfile.ZipFile(zip_file, "r") as zip_ref, StagingArea(staging_dir) as staging:
+        sender = GroupSender(url_pool, token_pool, channel_id, tuner, staging)
         await send_message(
             url_pool,
             token_pool,
             channel_id,
             f"开始上传图片，共 {len(zip_ref.namelist())} 张",
         )
-        fitting_files = [
-            file_name
-            for file_name in zip_ref.namelist()
-            if file_name.lower().endswith(IMAGE_EXTENSIONS)
-        ]
-        for file_name in tqdm.tqdm(fitting_files):
+        fitting_files = []
+        for info in zip_ref.infolist():
+            if info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                if info.file_size > max_size:
+                    logging.warning(f"跳过超过 {max_size >> 20} MB 的图片: {info.filename}")
+                    continue
+                fitting_files.append(info)
+        for info in tqdm.tqdm(fitting_files):
             if idx >= start_index * group_size and (
                 end_index == 0 or idx <= end_index * group_size
             ):
-                with zip_ref.open(file_name) as image_file:
-                    media_files.append((file_name, image_file.read()))
-                    if len(media_files) >= group_size:
-                        await send_media_group(
+                media_files.append(
+                    MediaFile(
+                        info.filename, info.file_size, zip_ref=zip_ref, member=info.filename
+                    )
+                )
+                if len(media_files) >= sender.group_size:
+                    await sender.submit(media_files, group_index)
+                    media_files = []
+                    group_index += 1
+                    if group_index % 10 == 0:
+                        await send_message(
                             url_pool,
                             token_pool,
                             channel_id,
-                            media_files,
-                            group_index,
+                            f"发送媒体组 {group_index} 完成，{idx + 1}/{len(fitting_files)} 张",
                         )
-                        media_files = []
-                        group_index += 1
-                        logging.info(f"发送媒体组 {group_index} 完成")
-                        await wait_for_seconds(3)
                 idx += 1
-                if group_index % 10 == 0:
-                    await send_message(
-                        url_pool,
-                        token_pool,
-                        channel_id,
-                        f"发送媒体组 {group_index}/{len(fitting_files) % group_size} 完成",
-                    )
-    if media_files:
-        await send_media_group(
-            url_pool, token_pool, channel_id, media_files, group_index
-        )
+        if media_files:
+            await sender.submit(media_files, group_index)
+        await sender.drain()
     await send_message(
         url_pool,
         token_pool,
@@ -416,6 +906,287 @@ async def send_images_from_zip(
     )
 
 
+class InotifyUnavailable(Exception):
+    """当前系统不能使用 inotify（非 Linux、监视数达到上限等）"""
+    pass
+
+
+class Inotify:
+    """通过 ctypes 调用 libc 的 inotify，fd 为非阻塞，可交给事件循环的 add_reader"""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise InotifyUnavailable("inotify 仅支持 Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise InotifyUnavailable(os.strerror(ctypes.get_errno()))
+        self.dirs = {}  # wd → 目录路径
+
+    def add_watch(self, path):
+        wd = self._add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            # ENOSPC: 超过 fs.inotify.max_user_watches
+            raise InotifyUnavailable(f"{path}: {os.strerror(ctypes.get_errno())}")
+        self.dirs[wd] = path
+
+    def read_events(self):
+        """读出当前所有事件，返回 [(目录, 文件名, mask)]；队列溢出时目录为 None"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    events.append((None, "", mask))
+                elif mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                elif wd in self.dirs:
+                    events.append((self.dirs[wd], name, mask))
+
+    def close(self):
+        os.close(self.fd)
+
+
+def is_watched_image(name):
+    # 以 . 开头的多为同步工具的临时文件（rsync 的 .name.XXXXXX）
+    return not name.startswith(".") and name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+class DirectoryWatcher:
+    """
+    监视目录树中新落地的图片，静置 settle 秒且大小、修改时间不再变化后放入 ready 队列。
+    Linux 上用 inotify（写完关闭或移入时才登记，子目录新建时补上监视），
+    不可用时退回定期轮询目录树。
+    """
+
+    def __init__(self, root, settle=DEFAULT_SETTLE, poll_interval=DEFAULT_POLL_INTERVAL, poll=False):
+        self.root = os.path.abspath(root)
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.force_poll = poll
+        self.ready = asyncio.Queue()
+        self.pending = {}  # 路径 → (最后变化时间, 大小, 修改时间)
+        self.seen = set()  # 已放入 ready 的 (路径, 大小, 修改时间)
+        self.inotify = None
+        self._tasks = []
+
+    async def start(self, include_existing=False):
+        loop = asyncio.get_running_loop()
+        if not self.force_poll:
+            try:
+                self.inotify = Inotify()
+                self._watch_tree(self.root, include_existing)
+                loop.add_reader(self.inotify.fd, self._on_inotify)
+                logging.info(f"使用 inotify 监视目录 {self.root}（{len(self.inotify.dirs)} 个目录）")
+            except InotifyUnavailable as e:
+                logging.warning(f"inotify 不可用（{e}），改为每 {self.poll_interval} 秒轮询")
+                if self.inotify is not None:
+                    self.inotify.close()
+                    self.inotify = None
+        if self.inotify is None:
+            if self.force_poll:
+                logging.info(f"每 {self.poll_interval} 秒轮询目录 {self.root}")
+            self._scan(self.root, mark_seen=not include_existing)
+            self._tasks.append(asyncio.create_task(self._poll_loop()))
+        self._tasks.append(asyncio.create_task(self._settle_loop()))
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        if self.inotify is not None:
+            asyncio.get_running_loop().remove_reader(self.inotify.fd)
+            self.inotify.close()
+            self.inotify = None
+
+    def _watch_tree(self, top, include_files):
+        """
+        给 top 及其子目录加监视。include_files 时登记其中已有的图片，
+        否则记为已处理（事件队列溢出后重新扫描时不会误发）
+        """
+        for root, dirs, files in os.walk(top):
+            self.inotify.add_watch(root)
+            for name in files:
+                if is_watched_image(name):
+                    if include_files:
+                        self._touch(os.path.join(root, name))
+                    else:
+                        self._scan_file(os.path.join(root, name), mark_seen=True)
+
+    def _scan(self, top, mark_seen=False):
+        """轮询：登记目录树中没见过的图片；mark_seen 时只记为已处理（启动时忽略已有文件）"""
+        for root, _, files in os.walk(top):
+            for name in files:
+                if is_watched_image(name):
+                    self._scan_file(os.path.join(root, name), mark_seen)
+
+    def _scan_file(self, path, mark_seen):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        key = (path, st.st_size, st.st_mtime_ns)
+        if mark_seen:
+            self.seen.add(key)
+        elif key not in self.seen and path not in self.pending:
+            self.pending[path] = (time.monotonic(), st.st_size, st.st_mtime_ns)
+
+    def _touch(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        self.pending[path] = (time.monotonic(), st.st_size, st.st_mtime_ns)
+
+    def _on_inotify(self):
+        for directory, name, mask in self.inotify.read_events():
+            if directory is None:
+                # 事件队列溢出，可能漏掉文件：全量扫描一次补上
+                logging.warning("inotify 事件队列溢出，重新扫描目录")
+                self._scan(self.root)
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # 新目录：加监视并登记加监视前已经写入的文件
+                    try:
+                        self._watch_tree(path, include_files=True)
+                    except InotifyUnavailable as e:
+                        logging.error(f"无法监视新目录: {e}")
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and is_watched_image(name):
+                self._touch(path)
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self._scan(self.root)
+
+    async def _settle_loop(self):
+        while True:
+            await asyncio.sleep(self.settle / 2)
+            now = time.monotonic()
+            for path, (changed, size, mtime) in list(self.pending.items()):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    del self.pending[path]  # 已被删除或移走
+                    continue
+                if (st.st_size, st.st_mtime_ns) != (size, mtime):
+                    self.pending[path] = (now, st.st_size, st.st_mtime_ns)
+                elif now - changed >= self.settle:
+                    del self.pending[path]
+                    key = (path, size, mtime)
+                    if key not in self.seen:
+                        self.seen.add(key)
+                        self.ready.put_nowait(path)
+
+
+async def watch_and_send(
+    url_pool,
+    token_pool,
+    channel_id,
+    image_dir,
+    group_size=4,
+    settle=DEFAULT_SETTLE,
+    batch_window=DEFAULT_BATCH_WINDOW,
+    poll_interval=DEFAULT_POLL_INTERVAL,
+    include_existing=False,
+    poll=False,
+    tuner=None,
+):
+    """
+    常驻监视 image_dir，新图片静置后按 group_size 成组发送；
+    凑不满一组时，第一张等待超过 batch_window 秒就把已有的先发出去。
+    收到 SIGTERM / SIGINT 时停止监视、等已提交的组发完后正常返回，
+    调用方的 finally（保存调节结果与 getMe 缓存）照常执行。
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    stop_signals = []
+
+    def on_signal(sig):
+        # 第二次收到信号时再次取消，打断正在进行的 drain
+        stop_signals.append(sig)
+        task.cancel()
+
+    handled = []
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, on_signal, sig)
+            handled.append(sig)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows 或非主线程：保持默认行为
+    watcher = DirectoryWatcher(image_dir, settle, poll_interval, poll)
+    await watcher.start(include_existing)
+    sender = GroupSender(
+        url_pool, token_pool, channel_id, tuner or AutoTuner(group_size), skip_errors=True
+    )
+    max_size = url_pool.max_file_size()
+    media_files = []
+    first_at = None
+    group_index = 0
+    try:
+        while True:
+            timeout = None
+            if media_files:
+                timeout = max(0, batch_window - (loop.time() - first_at))
+            try:
+                path = await asyncio.wait_for(watcher.ready.get(), timeout)
+            except asyncio.TimeoutError:
+                path = None
+            if path is not None:
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                if size > max_size:
+                    logging.warning(f"跳过超过 {max_size >> 20} MB 的图片: {path}")
+                    continue
+                media_files.append(MediaFile(os.path.basename(path), size, path=path))
+                first_at = first_at or loop.time()
+                if len(media_files) < sender.group_size:
+                    continue
+            if not media_files:
+                continue
+
+            size = sender.group_size
+            group, media_files = media_files[:size], media_files[size:]
+            first_at = loop.time() if media_files else None
+            await sender.submit(group, group_index)
+            group_index += 1
+    except asyncio.CancelledError:
+        if not stop_signals:
+            raise
+        task.uncancel()
+        logging.info(
+            f"收到 {signal.Signals(stop_signals[0]).name}，停止监视"
+            f"（未成组的 {len(media_files)} 张图片不再发送）"
+        )
+    finally:
+        watcher.close()
+        try:
+            await sender.drain()
+        except asyncio.CancelledError:
+            if len(stop_signals) < 2:
+                raise
+            task.uncancel()
+            logging.warning("再次收到信号，不再等待发送中的组")
+        finally:
+            for sig in handled:
+                loop.remove_signal_handler(sig)
+
+
 async def main():
     parser = argparse.ArgumentParser(description="上传图片到 Telegram 频道")
     parser.add_argument("-t", "--bot_token", type=str, help="Telegram 机器人 token")
@@ -428,7 +1199,9 @@ async def main():
         type=str,
         help="Telegram API URL",
     )
-    parser.add_argument("--group_size", default=4, type=int, help="媒体组大小")
+    parser.add_argument(
+        "--group_size", type=int, help="媒体组大小（默认 4；--auto_tune 时为初始值）"
+    )
     parser.add_argument("--start_index", default=0, type=int, help="开始序号")
     parser.add_argument("--end_index", default=0, type=int, help="结束序号")
     parser.add_argument("--config", type=str, help="Path to config file")
@@ -436,7 +1209,81 @@ async def main():
         "--max_retries", type=int, default=3, help="发送失败时的最大重试次数"
     )
     parser.add_argument(
-        "--retry_delay", type=int, default=3, help="重试之间的延迟时间（秒）"
+        "--retry_delay", type=int, default=3, help="首次重试前的等待时间（秒），之后每次加倍"
+    )
+    parser.add_argument(
+        "--local_api_url",
+        type=str,
+        help="本地 Bot API 服务器（telegram-bot-api --local）URL，逗号分隔；"
+        "按文件路径发送，不上传文件内容",
+    )
+    parser.add_argument(
+        "--no_detect_local",
+        action="store_true",
+        help="不自动把指向本机的 api_url 视为本地服务器",
+    )
+    parser.add_argument(
+        "--auto_tune",
+        action="store_true",
+        help="运行中按吞吐、错误与延迟自动调节组大小、并发数与组间间隔，结果按 API URL 保存",
+    )
+    parser.add_argument(
+        "--max_concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="自动调节时同时发送的媒体组数上限（大于 1 时频道中的顺序可能打乱）",
+    )
+    parser.add_argument(
+        "--tuning_file",
+        default=DEFAULT_TUNING_FILE,
+        help="自动调节结果的保存位置",
+    )
+    parser.add_argument(
+        "--token_cache",
+        default=DEFAULT_TOKEN_CACHE,
+        help="getMe 验证结果的缓存文件（只保存 token 的哈希）",
+    )
+    parser.add_argument(
+        "--token_ttl",
+        type=float,
+        default=DEFAULT_TOKEN_TTL,
+        help="token 验证结果的有效期（秒），0 表示每次运行都重新验证",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="常驻监视 -d 目录，新图片落地后自动成组发送（Linux 用 inotify）",
+    )
+    parser.add_argument(
+        "--watch_existing", action="store_true", help="监视模式下也发送启动时已有的图片"
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=DEFAULT_SETTLE,
+        help="图片最后一次写入后静置多少秒才发送",
+    )
+    parser.add_argument(
+        "--batch_window",
+        type=float,
+        default=DEFAULT_BATCH_WINDOW,
+        help="凑不满一组时最多等待的秒数",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="不使用 inotify，定期轮询目录（网络文件系统上 inotify 收不到其他机器的写入）",
+    )
+    parser.add_argument(
+        "--poll_interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="轮询间隔（秒）",
+    )
+    parser.add_argument(
+        "--staging_dir",
+        type=str,
+        help=f"压缩包成员给本地服务器读取前的解压目录（默认 {DEFAULT_STAGING_DIR}）",
     )
     args = parser.parse_args()
 
@@ -446,25 +1293,36 @@ async def main():
     if not args.zip_file and not args.image_dir:
         parser.error("请提供 -z（zip_file） 或 -d（image_dir） 参数")
 
+    if args.watch and not args.image_dir:
+        parser.error("--watch 需要配合 -d（image_dir） 使用")
+
+    if args.group_size is not None and not MIN_GROUP_SIZE <= args.group_size <= MAX_GROUP_SIZE:
+        parser.error(f"--group_size 必须在 {MIN_GROUP_SIZE}-{MAX_GROUP_SIZE} 之间")
+
     #     if not await test_token(args.api_url, args.bot_token):
     #         parser.error("token 测试失败，请检查 token 是否正确")
 
     api_urls = None
     tokens = None
+    local = {"local_api_urls": [], "detect_local": True, "staging_dir": None}
 
     # 加载配置文件
-    if Path(args.config).exists():
-        config_api_urls, config_tokens = load_config(args.config)
+    if args.config and Path(args.config).exists():
+        config_api_urls, config_tokens, local = load_config(args.config)
         api_urls = config_api_urls
-        tokens = (
-            config_tokens
-            if not args.bot_token
-            else [{"name": "CLI Token", "id": "cli", "token": args.bot_token}]
-        )
+        tokens = config_tokens if not args.bot_token else args.bot_token.split(",")
     else:
         api_urls = args.api_url.split(",")
         tokens = args.bot_token.split(",") if args.bot_token else []
 
+    # 命令行参数优先于配置文件
+    if args.local_api_url:
+        local["local_api_urls"] = args.local_api_url.split(",")
+    if args.no_detect_local:
+        local["detect_local"] = False
+    if args.staging_dir:
+        local["staging_dir"] = args.staging_dir
+
     if len(tokens) == 0:
         parser.error("没有找到有效的 token")
 
@@ -472,12 +1330,45 @@ async def main():
         parser.error("没有找到有效的 api_url")
 
     logging.info(f"加载的 api_url: {api_urls}")
-    url_pool = UrlPool(api_urls)
-    token_pool = TokenPool(url_pool, tokens)
+    url_pool = UrlPool(api_urls, local["local_api_urls"], local["detect_local"])
+    token_cache = TokenCache(args.token_cache, args.token_ttl) if args.token_ttl > 0 else None
+    token_pool = TokenPool(url_pool, tokens, token_cache)
 
     # 设置重试装饰器的参数
-    send_message.__wrapped__.__defaults__ = (args.max_retries, args.retry_delay)
-    send_media_group.__wrapped__.__defaults__ = (args.max_retries, args.retry_delay)
+    for func in (send_message, send_media_group):
+        func.retry.attempts = max(1, args.max_retries)
+        func.retry.delay = args.retry_delay
+
+    tuner = AutoTuner(
+        args.group_size or 4,
+        enabled=args.auto_tune,
+        max_concurrency=max(1, args.max_concurrency),
+    )
+    # 并发发送的组各占一条连接，另留两条给 getMe 与 sendMessage
+    HTTP.limit_per_host = tuner.max_concurrency + 2
+    if args.auto_tune:
+        key = tuning_key(url_pool)
+        saved = load_tuning(args.tuning_file, key)
+        if saved:
+            tuner.restore(saved)
+            if args.group_size:
+                tuner.group_size = args.group_size
+        source = f"沿用 {key} 上次的结果" if saved else "默认值"
+        logging.info(f"[调节] 初始参数: {tuner.describe()}（{source}）")
+    try:
+        await upload(args, url_pool, token_pool, local, tuner)
+    finally:
+        logging.info(f"[调节] {tuner.summary()}")
+        if args.auto_tune:
+            save_tuning(args.tuning_file, tuning_key(url_pool), tuner)
+        if token_cache is not None:
+            token_cache.save()
+        await HTTP.close()
+        if HTTP.metrics.requests:
+            logging.info(f"[HTTP] {HTTP.metrics.summary()}")
+
+
+async def upload(args, url_pool, token_pool, local, tuner):
 
     if args.zip_file:
         await asyncio.gather(
@@ -486,30 +1377,54 @@ async def main():
                 token_pool,
                 args.channel_id,
                 args.zip_file,
-                args.group_size,
+                tuner.group_size,
                 args.start_index,
                 args.end_index,
+                local["staging_dir"],
+                tuner,
             )
         )
 
-    if args.image_dir:
+    if args.image_dir and args.watch:
+        await watch_and_send(
+            url_pool,
+            token_pool,
+            args.channel_id,
+            args.image_dir,
+            tuner.group_size,
+            args.settle,
+            args.batch_window,
+            args.poll_interval,
+            args.watch_existing,
+            args.poll,
+            tuner,
+        )
+        logging.info("已停止监视")
+        return
+    elif args.image_dir:
         await asyncio.gather(
             send_images_from_dir(
                 url_pool,
                 token_pool,
                 args.channel_id,
                 args.image_dir,
-                args.group_size,
+                tuner.group_size,
                 args.start_index,
                 args.end_index,
+                tuner,
             )
         )
 
     logging.info("所有图片上传完成")
 
 
-if __name__ == "__main__":
+def cli():
+    """命令行入口（console script: upload-to-telegram）"""
     logging.basicConfig(
         level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
     )
     asyncio.run(main())
+
+
+if __name__ == "__main__":
+    cli()
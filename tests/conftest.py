@@ -0,0 +1,67 @@
+"""split_chapters 测试用的合成 PDF"""
+
+from pathlib import Path
+
+import pytest
+
+
+def make_pdf(
+    path: Path,
+    pages: int,
+    outline: list[tuple[int, str, int]] = (),
+    links: bool = False,
+    padding: int = 0,
+) -> Path:
+    """
+    生成 pages 页、每页一行文字的 PDF。outline 为 [(level, title, page_index), ...]，
+    按文档顺序排列，level 决定父子关系；links=True 时每页加一个指向下一页的链接。
+    padding > 0 时各页内容流附带 0~padding 字节不等的注释，页面体积各不相同。
+    """
+    pypdf = pytest.importorskip("pypdf")
+    from pypdf.annotations import Link
+    from pypdf.generic import DictionaryObject, NameObject, StreamObject
+
+    writer = pypdf.PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for i in range(pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        content = StreamObject()
+        filler = "%" + "x" * (i * 37 % padding) + "\n" if padding else ""
+        content.set_data(f"{filler}BT /F1 12 Tf 72 720 Td (page {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+    if links:
+        for i in range(pages):
+            writer.add_annotation(
+                i, Link(rect=(50, 50, 150, 70), target_page_index=(i + 1) % pages)
+            )
+
+    parents: list = []
+    for level, title, page in outline:
+        del parents[level:]
+        item = writer.add_outline_item(title, page, parent=parents[-1] if parents else None)
+        parents.append(item)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+@pytest.fixture
+def book_pdf(tmp_path):
+    """60 页，两层书签：A（第 1 页，含 A.1 于第 11 页）、B（第 41 页）"""
+    return make_pdf(
+        tmp_path / "book.pdf",
+        60,
+        [(0, "A", 0), (1, "A.1", 10), (0, "B", 40), (1, "B.1", 50)],
+        links=True,
+    )
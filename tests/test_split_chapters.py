@@ -0,0 +1,171 @@
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+import split_chapters as sc
+
+
+def test_parse_ranges_out_of_order_is_sorted():
+    chapters = sc.parse_ranges("41-60:B,1-40:A", 60)
+    assert [(c["index"], c["title"], c["start"], c["end"]) for c in chapters] == [
+        (1, "A", 0, 40),
+        (2, "B", 40, 60),
+    ]
+
+
+def test_load_plan_out_of_order_is_sorted():
+    plan = [{"title": "B", "start": 41}, {"title": "A", "start": 1, "end": 40}]
+    chapters = sc.load_plan(plan, 60)
+    assert [c["title"] for c in chapters] == ["A", "B"]
+    assert [c["index"] for c in chapters] == [1, 2]
+
+
+def test_overlapping_plan_rejected():
+    with pytest.raises(ValueError):
+        sc.parse_ranges("30-60,1-40", 60)
+
+
+def test_assign_outline_with_out_of_order_ranges():
+    items = [(0, "A", 0), (0, "B", 40)]
+    chapters = sc.parse_ranges("41-60:B,1-40:A", 60)
+    assert sc.assign_outline(items, chapters) == [[(0, "A", 0)], [(0, "B", 0)]]
+
+
+@pytest.mark.parametrize("engine", ["pypdf", "pikepdf"])
+def test_out_of_order_ranges_keep_bookmarks(book_pdf, tmp_path, engine):
+    if engine == "pikepdf":
+        pytest.importorskip("pikepdf")
+    pypdf = pytest.importorskip("pypdf")
+    book = sc.open_book(book_pdf, engine)
+    outline = book.outline_items()
+    chapters = sc.plan_chapters(book, ranges="41-60:B,1-40:A", outline_items=outline)
+    results = sc.execute_split(book, chapters, tmp_path / "out", outline_items=outline)
+
+    assert [r["file"] for r in results] == ["1_A.pdf", "2_B.pdf"]
+    second = pypdf.PdfReader(results[1]["path"])
+    titles = [item.title for item in second.outline if not isinstance(item, list)]
+    assert titles == ["B"]
+    assert len(second.pages) == 20
+
+
+def test_plan_json_file_out_of_order(book_pdf, tmp_path):
+    plan = tmp_path / "plan.json"
+    plan.write_text(
+        json.dumps([{"title": "后", "start": 31}, {"title": "前", "start": 1, "end": 30}]),
+        encoding="utf-8",
+    )
+    book = sc.open_book(book_pdf, "pypdf")
+    chapters = sc.plan_chapters(book, plan=str(plan))
+    assert [(c["title"], c["start"]) for c in chapters] == [("前", 0), ("后", 30)]
+
+
+@pytest.mark.parametrize("address", ["0.0.0.0:0", "[::]:0", "192.0.2.1:0"])
+def test_serve_rejects_non_loopback(address):
+    with pytest.raises(sc.SplitError):
+        sc.serve(address, workers=1)
+
+
+def test_loopback_hosts():
+    assert sc._is_loopback("127.0.0.1")
+    assert sc._is_loopback("localhost")
+    assert not sc._is_loopback("0.0.0.0")
+
+
+def test_submit_checks_input_without_parsing(tmp_path):
+    service = sc.SplitService(workers=1)
+    try:
+        with pytest.raises(OSError):
+            service.submit({"input": str(tmp_path / "missing.pdf")})
+        with pytest.raises(sc.SplitError):
+            service.submit({"input": str(tmp_path)})
+        (tmp_path / "x.pdf").write_bytes(b"%PDF-1.4")
+        with pytest.raises(sc.SplitError):
+            service.submit({"input": str(tmp_path / "x.pdf"), "engine": "nope"})
+        assert sc._load_book.cache_info().currsize == 0
+    finally:
+        service.close()
+
+
+def _index_record(n: int) -> dict:
+    return {
+        "index": n, "part": None, "title": f"第{n}章", "outline_path": [f"第{n}章"],
+        "start": n, "end": n + 1, "pages": 1, "file": f"{n}.pdf", "path": f"/out/{n}.pdf",
+        "bytes": 100, "sha256": "0" * 64, "text": f"正文 {n}",
+    }
+
+
+def test_sqlite_index_does_not_hold_write_lock(tmp_path):
+    pytest.importorskip("sqlite3")
+    db = tmp_path / "library.db"
+    first = sc.open_index(db, "a.pdf")
+    first.add(_index_record(1))
+    # 另一个写入者在第一个切分进行中写入同一个库，不应报 database is locked
+    second = sc.SqliteIndex(db, "b.pdf")
+    second.add(_index_record(1))
+    second.close()
+    first.add(_index_record(2))
+    first.close()
+    again = sc.open_index(db, "a.pdf")
+    again.add(_index_record(3))
+    again.close()
+
+    import sqlite3
+
+    con = sqlite3.connect(db)
+    rows = con.execute("SELECT source, chapter FROM chapters ORDER BY source, chapter").fetchall()
+    hits = con.execute(
+        "SELECT count(*) FROM chapters_fts WHERE chapters_fts MATCH ?", ('"正文 3"',)
+    ).fetchone()
+    con.close()
+    assert rows == [("a.pdf", 3), ("b.pdf", 1)]
+    assert hits == (1,)
+
+
+def test_index_workers_flag(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["split_chapters", "book.pdf", "--index", "x.db"])
+    assert sc.parse_args().index_workers == 1
+
+
+def test_pypdf_split_logs_no_warnings(book_pdf, tmp_path, caplog, recwarn):
+    book = sc.open_book(book_pdf, "pypdf")
+    outline = book.outline_items()
+    chapters = sc.plan_chapters(book, level=0, outline_items=outline)
+    with caplog.at_level(logging.WARNING):
+        results = sc.execute_split(book, chapters, tmp_path / "out", outline_items=outline)
+    assert [r["status"] for r in results] == ["ok", "ok"]
+    assert [r.getMessage() for r in caplog.records] == []
+    assert [str(w.message) for w in recwarn] == []
+
+
+def test_serve_keeps_non_socket_file(tmp_path):
+    path = tmp_path / "split.sock"
+    path.write_text("keep me")
+    with pytest.raises(sc.SplitError):
+        sc.serve(f"unix:{path}", workers=1)
+    assert path.read_text() == "keep me"
+
+
+def test_job_lookup_not_blocked_by_book_parse(book_pdf, monkeypatch):
+    parsed = threading.Event()
+    real = sc.cached_book
+
+    def slow_cached_book(*args, **kwargs):
+        parsed.set()
+        time.sleep(0.5)
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(sc, "cached_book", slow_cached_book)
+    service = sc.SplitService(workers=1)
+    try:
+        lister = threading.Thread(target=service.list, args=({"input": str(book_pdf)},))
+        lister.start()
+        assert parsed.wait(5)
+        t0 = time.perf_counter()
+        assert service.get("missing") is None
+        assert time.perf_counter() - t0 < 0.2
+        lister.join()
+    finally:
+        service.close()